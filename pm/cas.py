@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of feature payloads.
+
+A payload (one feature JSON document) is stored under a key that is the SHA-256 of everything
+it was computed from:
+
+    {"module": ..., "subject": {"host_id": ..., "phage_id": ...},
+     "inputs": {name: sha256 of the input file}, "params": {...},
+     "versions": {tool/DB version strings}, "code": code_version(module sources)}
+
+so a changed input, parameter, tool/DB version or module source gives a new key, and
+returning to an earlier configuration (profile switch, reverted `sourmash_scaled`, ...) finds
+the payloads computed then. Keys never go stale; entries no longer looked up are only removed
+by eviction: with `$PM_FEATURE_CACHE_MAX_ENTRIES`, each store drops the oldest-written entries
+beyond that many (a hit does not refresh an entry, so lookups stay read-only).
+
+Entries live in one SQLite database at `$PM_FEATURE_CACHE` (the workflow sets it with
+`params.feature_cache`, off by default: keep it on a local disk, as SQLite's WAL mode does not
+work over NFS), with the key document kept next to each payload for audit. Lookups and hits
+are pm.profiling counters (`feature_cache_lookups`, `feature_cache_hits`) in each job's trace;
+`python -m pm.cas <db>` prints entries per module. Only `ok` payloads are stored: mocked,
+unavailable and error results are always recomputed. Like pm.hash_cache the cache is best
+effort; a database error means computing the feature.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from pm import profiling
+from pm.hash_cache import sha256_files
+
+ENV_VAR = "PM_FEATURE_CACHE"
+MAX_ENTRIES_ENV_VAR = "PM_FEATURE_CACHE_MAX_ENTRIES"
+STORABLE_STATUSES = ("ok",)
+_SQL_CHUNK = 500
+
+
+def canonical_json(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def code_version(*paths: str | Path) -> str:
+    """Short digest of the source files a module's results depend on."""
+    digests = sha256_files(str(p) for p in paths)
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(f"{Path(p).name}:{digests[str(p)]}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def key_document(module: str, subject: Mapping[str, Any], inputs: Mapping[str, Optional[str]],
+                 params: Mapping[str, Any], versions: Mapping[str, Any], code: str) -> Dict[str, Any]:
+    return {"module": module, "subject": dict(subject), "inputs": dict(inputs), "params": dict(params),
+            "versions": dict(versions), "code": code}
+
+
+def cache_key(doc: Mapping[str, Any]) -> str:
+    return hashlib.sha256(canonical_json(doc).encode("utf-8")).hexdigest()
+
+
+class FeatureCache:
+    """Payloads by key in SQLite; at most `max_entries` of them (None: unbounded)."""
+
+    def __init__(self, path: str | Path, max_entries: Optional[int] = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(self.path), timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, module TEXT, payload TEXT, "
+                    "key_doc TEXT, created TEXT)")
+        return con
+
+    def get_many(self, module: str, keys: Mapping[str, str]) -> Dict[str, Dict[str, Any]]:
+        """{name: payload} for the names whose key (`keys` maps name -> key) is cached; read-only."""
+        found: Dict[str, Dict[str, Any]] = {}
+        by_key: Dict[str, list] = {}
+        for name, key in keys.items():
+            by_key.setdefault(key, []).append(name)
+        wanted = list(by_key)
+        try:
+            con = self._connect()
+            try:
+                for i in range(0, len(wanted), _SQL_CHUNK):
+                    chunk = wanted[i:i + _SQL_CHUNK]
+                    rows = con.execute(f"SELECT key, payload FROM entries WHERE key IN ({','.join('?' * len(chunk))})",
+                                       chunk)
+                    for key, payload in rows:
+                        doc = json.loads(payload)
+                        for name in by_key[key]:
+                            found[name] = doc
+            finally:
+                con.close()
+        except sqlite3.Error:
+            return {}
+        return found
+
+    def put_many(self, module: str, entries: Iterable[tuple]) -> int:
+        """Store (key, key_doc, payload) triples; payloads with a non-storable status are skipped.
+
+        Rowids grow with every write (a replaced key gets a new one), so the oldest-written
+        entries beyond `max_entries` are the rows below the newest rowid minus `max_entries`.
+        """
+        now = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+        # Payloads keep their key order so a hit writes the same bytes as a fresh computation.
+        rows = [(key, module, json.dumps(payload), canonical_json(doc), now)
+                for key, doc, payload in entries if payload.get("status") in STORABLE_STATUSES]
+        if not rows:
+            return 0
+        try:
+            con = self._connect()
+            try:
+                with con:
+                    con.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+                    if self.max_entries is not None:
+                        con.execute("DELETE FROM entries WHERE rowid <= (SELECT MAX(rowid) FROM entries) - ?",
+                                    (self.max_entries,))
+            finally:
+                con.close()
+        except sqlite3.Error:
+            return 0
+        return len(rows)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Entries per module, with the oldest and newest write times."""
+        con = self._connect()
+        try:
+            rows = con.execute("SELECT module, COUNT(*), MIN(created), MAX(created) FROM entries "
+                               "GROUP BY module ORDER BY module").fetchall()
+            return {module: {"entries": n, "oldest": oldest, "newest": newest} for module, n, oldest, newest in rows}
+        finally:
+            con.close()
+
+
+def open_cache(path: Optional[str | Path] = None) -> Optional[FeatureCache]:
+    """Cache at `path`, else at `$PM_FEATURE_CACHE`; None when neither is set."""
+    path = path or os.environ.get(ENV_VAR)
+    max_entries = os.environ.get(MAX_ENTRIES_ENV_VAR)
+    return FeatureCache(path, int(max_entries) if max_entries else None) if path else None
+
+
+class CachedPayloads:
+    """Look up a batch of payloads for one module, then store the ones computed on a miss.
+
+        cached = CachedPayloads(cache, "similarity", code, params, versions)
+        for pid in phage_ids:
+            cached.add(pid, {"host_id": h, "phage_id": pid}, {"host_sig": sha, "phage_sig": sha2})
+        payloads = cached.lookup()            # hits only
+        ... compute cached.missing(), then cached.store(computed)
+    """
+
+    def __init__(self, cache: Optional[FeatureCache], module: str, code: str, params: Mapping[str, Any],
+                 versions: Mapping[str, Any]):
+        self.cache = cache
+        self.module = module
+        self.code = code
+        self.params = dict(params)
+        self.versions = dict(versions)
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.keys: Dict[str, str] = {}
+        self.hits: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, subject: Mapping[str, Any], inputs: Mapping[str, Optional[str]]) -> None:
+        """Register one payload; it is not cacheable when any input hash is unknown."""
+        if self.cache is None or any(v is None for v in inputs.values()):
+            return
+        doc = key_document(self.module, subject, inputs, self.params, self.versions, self.code)
+        self.docs[name] = doc
+        self.keys[name] = cache_key(doc)
+
+    def lookup(self) -> Dict[str, Dict[str, Any]]:
+        if self.cache is not None and self.keys:
+            self.hits = self.cache.get_many(self.module, self.keys)
+            profiling.count("feature_cache_lookups", len(self.keys))
+            profiling.count("feature_cache_hits", len(self.hits))
+        return dict(self.hits)
+
+    def missing(self, names: Iterable[str]) -> list:
+        return [n for n in names if n not in self.hits]
+
+    def store(self, payloads: Mapping[str, Dict[str, Any]]) -> int:
+        if self.cache is None:
+            return 0
+        return self.cache.put_many(self.module, ((self.keys[n], self.docs[n], p) for n, p in payloads.items()
+                                                 if n in self.keys and n not in self.hits))
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get(ENV_VAR)
+    if not path or not Path(path).exists():
+        raise SystemExit("usage: python -m pm.cas <feature_cache.sqlite> (or set PM_FEATURE_CACHE)")
+    print(json.dumps(FeatureCache(path).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
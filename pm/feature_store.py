@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Binary per-host feature store replacing one JSON file per host x phage pair.
+
+One store holds one module's features for one host, in a directory of five files:
+
+    values.npy    float64 matrix, one row per phage x the module's numeric columns
+    kinds.npy     uint8 matrix of the same shape, what each value was (index into VALUE_KINDS)
+    status.npy    uint8 status code per row (index into STATUSES)
+    index.json    phage_id order, column names, per-host constants (tool, tool_version, metric),
+                  reasons for the rows that have one, and values that were not JSON numbers
+    extras.json   non-scalar fields per phage (structural `top_targets`), only where non-empty
+
+A value's kind keeps null apart from a stored NaN, and numbers of the column's type (int for
+`int_columns`, float otherwise) apart from other values (`"0.5"`, `"n/a"`, an int in a float
+column): those are kept verbatim for `payload()`, with `float(value)` in the matrix when it parses. `valid()` is true exactly where `float(value)` succeeds, which is what the
+scoring functions test on the JSON documents.
+
+The `.npy` files are opened with `mmap_mode="r"`, so reading a column is zero-copy. `payload()`
+rebuilds a row's JSON document exactly as documented in `docs/architecture/04_feature_contracts.md`
+(field order included), which is what `scripts/modules/feature_store_export.py` writes.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from pm.utils import ensure_dir
+
+FORMAT_VERSION = 2
+STATUSES = ("ok", "mocked", "skipped", "unavailable", "error")
+# null: JSON null; number: a number of the column's type (NaN included); coerced: another value
+# float() accepts; raw: a value float() rejects (matrix holds NaN).
+VALUE_KINDS = ("null", "number", "coerced", "raw")
+FILES = ("values.npy", "kinds.npy", "status.npy", "index.json", "extras.json")
+
+# Per module: JSON field order, numeric matrix columns (ints restored on export), per-host
+# constants and non-scalar extras.
+SCHEMAS: Dict[str, Dict[str, List[str]]] = {
+    "similarity": {
+        "fields": ["host_id", "phage_id", "metric", "value", "tool", "tool_version", "status", "reason"],
+        "columns": ["value"],
+        "int_columns": [],
+        "constants": ["metric", "tool", "tool_version"],
+        "extras": [],
+    },
+    "structural": {
+        "fields": ["host_id", "phage_id", "hit_count", "best_evalue", "best_bitscore", "qcov_mean", "tcov_mean",
+                   "top_targets", "tool", "tool_version", "status", "reason"],
+        "columns": ["hit_count", "best_evalue", "best_bitscore", "qcov_mean", "tcov_mean"],
+        "int_columns": ["hit_count"],
+        "constants": ["tool", "tool_version"],
+        "extras": ["top_targets"],
+    },
+}
+
+
+def store_dir(root: str | Path, module: str, host_id: str) -> Path:
+    return Path(root) / module / host_id
+
+
+def store_files(root: str | Path, module: str, host_id: str) -> List[str]:
+    d = store_dir(root, module, host_id)
+    return [str(d / name) for name in FILES]
+
+
+class FeatureStoreWriter:
+    """Collect one host's payload dicts (the JSON contract) row by row into the binary layout."""
+
+    def __init__(self, module: str, host_id: str, phage_ids: Sequence[str]):
+        if module not in SCHEMAS:
+            raise ValueError(f"Unknown feature module {module!r}; expected one of {sorted(SCHEMAS)}")
+        self.module = module
+        self.schema = SCHEMAS[module]
+        self.host_id = host_id
+        self.phage_ids = list(phage_ids)
+        self._row = {pid: i for i, pid in enumerate(self.phage_ids)}
+        self.values = np.full((len(self.phage_ids), len(self.schema["columns"])), np.nan)
+        self.kinds = np.zeros(self.values.shape, dtype=np.uint8)
+        self.status = np.full(len(self.phage_ids), STATUSES.index("unavailable"), dtype=np.uint8)
+        self.filled = np.zeros(len(self.phage_ids), dtype=bool)
+        self.constants: Optional[Dict[str, Any]] = None
+        self.reasons: Dict[str, str] = {}
+        self.raw: Dict[str, Dict[str, Any]] = {}
+        self.extras: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, payload: Mapping[str, Any]) -> None:
+        pid = payload["phage_id"]
+        i = self._row[pid]
+        constants = {k: payload.get(k) for k in self.schema["constants"]}
+        if self.constants is None:
+            self.constants = constants
+        elif constants != self.constants:
+            raise ValueError(f"{self.module} store for {self.host_id}: {pid} has {constants}, expected {self.constants}")
+        for j, col in enumerate(self.schema["columns"]):
+            v = payload.get(col)
+            kind = _value_kind(v, int if col in self.schema["int_columns"] else float)
+            self.kinds[i, j] = VALUE_KINDS.index(kind)
+            if kind in ("number", "coerced"):
+                self.values[i, j] = float(v)
+            if kind in ("coerced", "raw"):
+                self.raw.setdefault(pid, {})[col] = v
+        status = payload.get("status") or "ok"
+        if status not in STATUSES:
+            raise ValueError(f"Unknown feature status {status!r}; expected one of {list(STATUSES)}")
+        self.status[i] = STATUSES.index(status)
+        if payload.get("reason") is not None:
+            self.reasons[pid] = payload["reason"]
+        extras = {k: payload[k] for k in self.schema["extras"] if payload.get(k)}
+        if extras:
+            self.extras[pid] = extras
+        self.filled[i] = True
+
+    def save(self, out_dir: str | Path) -> Path:
+        """Write the store; index.json is replaced last, so readers never see a partial store."""
+        if not self.filled.all():
+            missing = [pid for pid, ok in zip(self.phage_ids, self.filled) if not ok]
+            raise ValueError(f"{self.module} store for {self.host_id} is missing {len(missing)} phages, e.g. {missing[:3]}")
+        out = ensure_dir(out_dir)
+        for name, arr in (("values.npy", self.values), ("kinds.npy", self.kinds), ("status.npy", self.status)):
+            tmp = out / f".{name}.tmp"
+            with tmp.open("wb") as f:
+                np.save(f, arr, allow_pickle=False)
+            tmp.replace(out / name)
+        (out / ".extras.json.tmp").write_text(json.dumps(self.extras))
+        (out / ".extras.json.tmp").replace(out / "extras.json")
+        index = {
+            "format": FORMAT_VERSION,
+            "module": self.module,
+            "host_id": self.host_id,
+            "columns": self.schema["columns"],
+            "statuses": list(STATUSES),
+            "phage_ids": self.phage_ids,
+            "constants": self.constants or {k: None for k in self.schema["constants"]},
+            "reasons": self.reasons,
+            "raw": self.raw,
+        }
+        (out / ".index.json.tmp").write_text(json.dumps(index))
+        (out / ".index.json.tmp").replace(out / "index.json")
+        return out
+
+
+class FeatureStore:
+    """Read-only view of one host's store; the matrix and status codes are memory-mapped."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.index = json.loads((self.path / "index.json").read_text())
+        if self.index.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature store format in {self.path}: {self.index.get('format')}")
+        self.module = self.index["module"]
+        self.schema = SCHEMAS[self.module]
+        self.host_id = self.index["host_id"]
+        self.phage_ids: List[str] = self.index["phage_ids"]
+        self.values = _load_mapped(self.path / "values.npy")
+        self.kinds = _load_mapped(self.path / "kinds.npy")
+        self.status = _load_mapped(self.path / "status.npy")
+        self._columns = {c: j for j, c in enumerate(self.index["columns"])}
+        self._row: Optional[Dict[str, int]] = None
+        self._extras: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.phage_ids)
+
+    def row(self, phage_id: str) -> Optional[int]:
+        if self._row is None:
+            self._row = {pid: i for i, pid in enumerate(self.phage_ids)}
+        return self._row.get(phage_id)
+
+    def rows(self, phage_ids: Iterable[str]) -> np.ndarray:
+        """Row per requested phage, -1 where the phage is not in the store."""
+        found = (self.row(pid) for pid in phage_ids)
+        return np.array([-1 if i is None else i for i in found], dtype=np.int64)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self._columns[name]]
+
+    def valid(self, name: str) -> np.ndarray:
+        """Per row, whether the column's value converts with float() (NaN included, null not)."""
+        kinds = self.kinds[:, self._columns[name]]
+        return (kinds == VALUE_KINDS.index("number")) | (kinds == VALUE_KINDS.index("coerced"))
+
+    def payload(self, phage_id: str) -> Optional[Dict[str, Any]]:
+        """The row's JSON document (None if the phage is not in the store)."""
+        i = self.row(phage_id)
+        if i is None:
+            return None
+        if self._extras is None:
+            self._extras = json.loads((self.path / "extras.json").read_text())
+        raw = self.index["raw"].get(phage_id, {})
+        values = {}
+        for col, j in self._columns.items():
+            kind = VALUE_KINDS[int(self.kinds[i, j])]
+            v = float(self.values[i, j])
+            if kind == "null":
+                values[col] = None
+            elif kind == "number":
+                values[col] = int(v) if col in self.schema["int_columns"] else v
+            else:
+                values[col] = raw[col]
+        extras = self._extras.get(phage_id, {})
+        doc: Dict[str, Any] = {}
+        for field in self.schema["fields"]:
+            if field == "host_id":
+                doc[field] = self.host_id
+            elif field == "phage_id":
+                doc[field] = phage_id
+            elif field == "status":
+                doc[field] = STATUSES[int(self.status[i])]
+            elif field == "reason":
+                doc[field] = self.index["reasons"].get(phage_id)
+            elif field in values:
+                doc[field] = values[field]
+            elif field in self.schema["extras"]:
+                doc[field] = extras.get(field, [])
+            else:
+                doc[field] = self.index["constants"].get(field)
+        return doc
+
+    def payloads(self) -> Iterator[Dict[str, Any]]:
+        for pid in self.phage_ids:
+            yield self.payload(pid)
+
+
+def _value_kind(value: Any, number_type: type) -> str:
+    if value is None:
+        return "null"
+    if type(value) is number_type:
+        return "number"
+    try:
+        float(value)
+    except Exception:
+        return "raw"
+    return "coerced"
+
+
+def _load_mapped(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # A store with no rows has an empty data segment, which cannot be mapped.
+        return np.load(path)
+
+
+def open_store(root: Optional[str | Path], module: str, host_id: str) -> Optional[FeatureStore]:
+    if root is None:
+        return None
+    d = store_dir(root, module, host_id)
+    return FeatureStore(d) if (d / "index.json").exists() else None
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Named Foldseek speed/sensitivity tiers.
+
+A tier is a small mapping of search settings; `config.yaml` may override or extend the
+built-in tiers under `foldseek_tiers`, and `params.foldseek_tier` selects one.
+
+    sensitivity        -s                  prefilter sensitivity (Foldseek default 9.5)
+    max_seqs           --max-seqs          prefilter hits passed to alignment per query
+    prefilter_mode     --prefilter-mode    0 k-mer/ungapped, 1 ungapped, 2 no prefilter
+    exhaustive_search  --exhaustive-search skip the prefilter and align all pairs
+    evalue             -e                  reporting cutoff inside Foldseek
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional
+
+DEFAULT_TIER = "default"
+DEFAULT_TIERS: Dict[str, Dict[str, Any]] = {
+    "fast": {"sensitivity": 4.0, "max_seqs": 100},
+    "default": {"sensitivity": 9.5, "max_seqs": 1000},
+    "exhaustive": {"exhaustive_search": True, "max_seqs": 10000},
+}
+
+_FLAGS = {
+    "sensitivity": "-s",
+    "max_seqs": "--max-seqs",
+    "prefilter_mode": "--prefilter-mode",
+    "exhaustive_search": "--exhaustive-search",
+    "evalue": "-e",
+}
+
+
+def available_tiers(config: Optional[Mapping[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+    tiers = {name: dict(settings) for name, settings in DEFAULT_TIERS.items()}
+    for name, settings in ((config or {}).get("foldseek_tiers") or {}).items():
+        tiers[name] = {**tiers.get(name, {}), **(settings or {})}
+    return tiers
+
+
+def resolve_tier(config: Optional[Mapping[str, Any]] = None, name: Optional[str] = None) -> Dict[str, Any]:
+    """Settings of `name` (default: `params.foldseek_tier`); unknown names raise ValueError."""
+    if name is None:
+        name = ((config or {}).get("params") or {}).get("foldseek_tier") or DEFAULT_TIER
+    tiers = available_tiers(config)
+    if name not in tiers:
+        raise ValueError(f"Unknown foldseek tier {name!r}; expected one of {sorted(tiers)}")
+    return tiers[name]
+
+
+def search_args(settings: Mapping[str, Any]) -> List[str]:
+    """`foldseek search` arguments for a tier's settings."""
+    args: List[str] = []
+    for key, value in settings.items():
+        if key not in _FLAGS:
+            raise ValueError(f"Unknown foldseek tier setting {key!r}; expected one of {sorted(_FLAGS)}")
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        args += [_FLAGS[key], str(value)]
+    return args
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Memoized SHA-256 of files for provenance hashing (`pm.utils.sha256_file`).
+
+Digests are keyed on the file's stat signature (absolute path, size, mtime_ns, inode): a file
+is only read again when one of those changed. Two layers:
+
+- an in-process dict, so the same file hashed by many meta rules of one Snakemake process (or
+  many hosts of one script) is read once;
+- a persistent SQLite table at `$PM_HASH_CACHE` (with `params.hash_cache` the workflow points
+  it at `<cache>/hash_cache.sqlite`), so unchanged inputs are not re-read across runs and jobs.
+
+With `PM_HASH_CACHE` unset or empty only the in-process layer is used; that is the default,
+because the table is in SQLite's WAL mode, whose shared-memory index does not work on network
+filesystems (NFS): enable it only for a cache directory on a local disk. The persistent cache is
+best effort: a locked or unreadable database just means hashing the file.
+
+Entries are not stored for files modified within `RACY_SECONDS` of being hashed: a rewrite in
+the same mtime tick with the same size would otherwise go unnoticed (as with git's racily clean
+index entries). Such files are hashed again next time.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ENV_VAR = "PM_HASH_CACHE"
+RACY_SECONDS = 2.0
+_SQL_CHUNK = 500
+
+Signature = Tuple[int, int, int]
+
+_memo: Dict[str, Tuple[Signature, str]] = {}
+_memo_lock = threading.Lock()
+
+
+def hash_file(path: str | Path) -> str:
+    """Uncached SHA-256 hex digest of a file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _signature(st: os.stat_result) -> Signature:
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class HashCache:
+    """SQLite-backed digest table; one short-lived connection per batch of lookups/stores."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(self.path), timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, "
+                    "mtime_ns INTEGER, inode INTEGER, sha256 TEXT)")
+        return con
+
+    def lookup(self, sigs: Dict[str, Signature]) -> Dict[str, str]:
+        """Digests for the paths whose stored signature matches."""
+        found: Dict[str, str] = {}
+        paths = list(sigs)
+        try:
+            con = self._connect()
+            try:
+                for i in range(0, len(paths), _SQL_CHUNK):
+                    chunk = paths[i:i + _SQL_CHUNK]
+                    rows = con.execute(f"SELECT path, size, mtime_ns, inode, sha256 FROM hashes "
+                                       f"WHERE path IN ({','.join('?' * len(chunk))})", chunk)
+                    for path, size, mtime_ns, inode, digest in rows:
+                        if sigs[path] == (size, mtime_ns, inode):
+                            found[path] = digest
+            finally:
+                con.close()
+        except sqlite3.Error:
+            pass
+        return found
+
+    def store(self, entries: Dict[str, Tuple[Signature, str]]) -> None:
+        if not entries:
+            return
+        try:
+            con = self._connect()
+            try:
+                with con:
+                    con.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)",
+                                    [(p, *sig, digest) for p, (sig, digest) in entries.items()])
+            finally:
+                con.close()
+        except sqlite3.Error:
+            pass
+
+
+def default_cache() -> Optional[HashCache]:
+    path = os.environ.get(ENV_VAR)
+    return HashCache(path) if path else None
+
+
+def sha256_files(paths: Iterable[str | Path], workers: Optional[int] = None,
+                 cache: Optional[HashCache] = None) -> Dict[str, Optional[str]]:
+    """SHA-256 per path (keys as given, None for missing files); cold files hashed across threads."""
+    paths = [str(p) for p in paths]
+    cache = cache if cache is not None else default_cache()
+    out: Dict[str, Optional[str]] = {}
+    sigs: Dict[str, Signature] = {}
+    keys: Dict[str, List[str]] = {}
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            out[p] = None
+            continue
+        key = os.path.abspath(p)
+        sigs[key] = _signature(st)
+        keys.setdefault(key, []).append(p)
+
+    todo: Dict[str, Signature] = {}
+    with _memo_lock:
+        for key, sig in sigs.items():
+            hit = _memo.get(key)
+            if hit is not None and hit[0] == sig:
+                for p in keys[key]:
+                    out[p] = hit[1]
+            else:
+                todo[key] = sig
+    if todo and cache is not None:
+        for key, digest in cache.lookup(todo).items():
+            with _memo_lock:
+                _memo[key] = (todo[key], digest)
+            for p in keys[key]:
+                out[p] = digest
+            del todo[key]
+    if not todo:
+        return out
+
+    # hashlib releases the GIL on large updates, so threads overlap reads and digesting.
+    cold = list(todo)
+    n = min(len(cold), workers or min(8, os.cpu_count() or 1))
+    if n <= 1:
+        digests = [hash_file(k) for k in cold]
+    else:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            digests = list(pool.map(hash_file, cold))
+
+    now_ns = time.time_ns()
+    fresh: Dict[str, Tuple[Signature, str]] = {}
+    for key, digest in zip(cold, digests):
+        sig = todo[key]
+        for p in keys[key]:
+            out[p] = digest
+        if now_ns - sig[1] >= RACY_SECONDS * 1e9:
+            fresh[key] = (sig, digest)
+    with _memo_lock:
+        _memo.update(fresh)
+    if cache is not None:
+        cache.store(fresh)
+    return out
+
+
+def sha256_file(path: str | Path) -> str:
+    """Memoized SHA-256 of one existing file (FileNotFoundError otherwise, like open())."""
+    digest = sha256_files([path], workers=1).get(str(path))
+    if digest is None:
+        raise FileNotFoundError(f"No such file: {path}")
+    return digest
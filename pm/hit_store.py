@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Columnar store for Foldseek hits (compressed `.npz`, dictionary-encoded protein IDs).
+
+Columns (one row per hit, in original file order):
+    query, target, phage   uint32 codes into the `*_names` vocabularies
+    evalue, bitscore, qcov, tcov   float64, NaN where the TSV value was missing/unparseable
+
+Summaries are computed with a vectorized group-by over phage codes, so re-summarising under a
+different e-value or coverage cutoff only re-reads this file, never Foldseek.
+"""
+from __future__ import annotations
+
+import zipfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from pm.utils import ensure_dir
+
+TOP_N = 5
+MISSING_EVALUE_KEY = 1e9
+_NAN = float("nan")
+
+
+class HitStoreWriter:
+    """Append hits row by row; memory is a few compact typed arrays, not Python dicts."""
+
+    def __init__(self) -> None:
+        self._vocab: Dict[str, Dict[str, int]] = {"query": {}, "target": {}, "phage": {}}
+        self._codes = {name: array("I") for name in self._vocab}
+        self._floats = {name: array("d") for name in ("evalue", "bitscore", "qcov", "tcov")}
+
+    def add(self, query: str, target: str, phage_id: str, evalue: Optional[float], bitscore: Optional[float],
+            qcov: Optional[float], tcov: Optional[float]) -> None:
+        qv, tv, pv = self._vocab["query"], self._vocab["target"], self._vocab["phage"]
+        self._codes["query"].append(qv.setdefault(query, len(qv)))
+        self._codes["target"].append(tv.setdefault(target, len(tv)))
+        self._codes["phage"].append(pv.setdefault(phage_id, len(pv)))
+        f = self._floats
+        f["evalue"].append(_NAN if evalue is None else evalue)
+        f["bitscore"].append(_NAN if bitscore is None else bitscore)
+        f["qcov"].append(_NAN if qcov is None else qcov)
+        f["tcov"].append(_NAN if tcov is None else tcov)
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        ensure_dir(path.parent)
+        arrays = {name: np.frombuffer(col, dtype=np.uint32) if len(col) else np.zeros(0, dtype=np.uint32)
+                  for name, col in self._codes.items()}
+        arrays.update({name: np.frombuffer(col, dtype=np.float64) if len(col) else np.zeros(0, dtype=np.float64)
+                       for name, col in self._floats.items()})
+        for name, vocab in self._vocab.items():
+            arrays[f"{name}_names"] = np.array(list(vocab), dtype=np.str_)
+        # Same container as np.savez_compressed, but at a fast deflate level: float columns barely
+        # compress, while the default level dominated store build time on large hit files.
+        tmp = path.with_name(path.name + ".tmp")
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            for name, arr in arrays.items():
+                with zf.open(f"{name}.npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, np.asanyarray(arr), allow_pickle=False)
+        tmp.replace(path)
+        return path
+
+
+class HitStore:
+    def __init__(self, path: str | Path) -> None:
+        with np.load(path) as data:
+            self.columns = {name: data[name] for name in data.files}
+
+    def __len__(self) -> int:
+        return len(self.columns["query"])
+
+    def summarise(self, phage_ids: Iterable[str], evalue_max: Optional[float] = None,
+                  min_qcov: Optional[float] = None, min_tcov: Optional[float] = None) -> Dict[str, Dict[str, object]]:
+        """Per-phage summaries (same fields/values as the streaming summariser) after filtering."""
+        c = self.columns
+        phage_names = [str(x) for x in c["phage_names"]]
+        position = {pid: i for i, pid in enumerate(phage_names)}
+        evalue, bitscore, qcov, tcov = c["evalue"], c["bitscore"], c["qcov"], c["tcov"]
+
+        mask = np.ones(len(self), dtype=bool)
+        # NaN compares False, so rows lacking the filtered value are dropped by a cutoff.
+        if evalue_max is not None:
+            mask &= evalue <= evalue_max
+        if min_qcov is not None:
+            mask &= qcov >= min_qcov
+        if min_tcov is not None:
+            mask &= tcov >= min_tcov
+        rows = np.flatnonzero(mask)
+        phage = c["phage"][rows].astype(np.int64)
+        n_groups = len(phage_names)
+
+        counts = np.bincount(phage, minlength=n_groups)
+        best_e = np.full(n_groups, np.nan)
+        best_b = np.full(n_groups, np.nan)
+        np.fmin.at(best_e, phage, evalue[rows])
+        np.fmax.at(best_b, phage, bitscore[rows])
+        # bincount accumulates in row order, matching a running sum over the file.
+        q_ok, t_ok = ~np.isnan(qcov[rows]), ~np.isnan(tcov[rows])
+        q_sum = np.bincount(phage[q_ok], weights=qcov[rows][q_ok], minlength=n_groups)
+        q_n = np.bincount(phage[q_ok], minlength=n_groups)
+        t_sum = np.bincount(phage[t_ok], weights=tcov[rows][t_ok], minlength=n_groups)
+        t_n = np.bincount(phage[t_ok], minlength=n_groups)
+
+        # Top-N per phage: order by (phage, evalue key, original row) and take each group's head.
+        key = np.where(np.isnan(evalue[rows]), MISSING_EVALUE_KEY, evalue[rows])
+        order = np.lexsort((rows, key, phage))
+        sorted_phage = phage[order]
+        starts = np.searchsorted(sorted_phage, np.arange(n_groups))
+        rank = np.arange(len(order)) - starts[sorted_phage]
+        head = order[rank < TOP_N]
+        top: Dict[int, List[Dict[str, object]]] = {}
+        q_names, t_names = c["query_names"], c["target_names"]
+        for i in head:
+            r = rows[i]
+            top.setdefault(int(phage[i]), []).append({
+                "query": str(q_names[c["query"][r]]),
+                "target": str(t_names[c["target"][r]]),
+                "evalue": _opt(evalue[r]),
+                "bitscore": _opt(bitscore[r]),
+                "qcov": _opt(qcov[r]),
+                "tcov": _opt(tcov[r]),
+            })
+
+        out: Dict[str, Dict[str, object]] = {}
+        for pid in phage_ids:
+            g = position.get(pid)
+            if g is None or counts[g] == 0:
+                out[pid] = {"hit_count": 0, "best_evalue": None, "best_bitscore": None,
+                            "qcov_mean": None, "tcov_mean": None, "top_targets": []}
+                continue
+            out[pid] = {
+                "hit_count": int(counts[g]),
+                "best_evalue": _opt(best_e[g]),
+                "best_bitscore": _opt(best_b[g]),
+                "qcov_mean": float(q_sum[g] / q_n[g]) if q_n[g] else None,
+                "tcov_mean": float(t_sum[g] / t_n[g]) if t_n[g] else None,
+                "top_targets": top.get(g, []),
+            }
+        return out
+
+
+def _opt(x: float) -> Optional[float]:
+    x = float(x)
+    return None if np.isnan(x) else x
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Parsed, validated and indexed phage/host manifests.
+
+Each manifest TSV is read once into a `Manifest`: rows in file order plus a dict index by ID,
+so `manifest.get(phage_id, "fasta")` is O(1) instead of a linear scan per lookup (the Snakefile
+does one per job when building the DAG). Loads are memoized on the file's path, size and
+mtime_ns, so repeated `load_*` calls within a process return the same object until the file
+changes.
+
+Validation: the header must contain the ID column and any required columns; IDs must be
+non-empty, unique and free of `/` and whitespace (they become path components and wildcards).
+Problems are reported together, with line numbers, as one ManifestError.
+"""
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+PHAGE_ID_COLUMN = "phage_id"
+HOST_ID_COLUMN = "host_id"
+PHAGE_REQUIRED = ("fasta",)
+
+_cache: Dict[Tuple[str, str, Tuple[str, ...]], Tuple[Tuple[int, int], "Manifest"]] = {}
+
+
+class ManifestError(ValueError):
+    pass
+
+
+class Manifest:
+    """Rows of one manifest in file order, indexed by their ID column."""
+
+    def __init__(self, path: str | Path, id_column: str, columns: Sequence[str], rows: List[Dict[str, str]]):
+        self.path = Path(path)
+        self.id_column = id_column
+        self.columns = list(columns)
+        self.rows = rows
+        self.ids: List[str] = [r[id_column] for r in rows]
+        self._index: Dict[str, Dict[str, str]] = {r[id_column]: r for r in rows}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self.rows)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._index
+
+    def row(self, item_id: str) -> Dict[str, str]:
+        try:
+            return self._index[item_id]
+        except KeyError:
+            raise KeyError(f"{self.id_column} {item_id!r} not found in {self.path}") from None
+
+    def get(self, item_id: str, column: str) -> str:
+        if column not in self.columns:
+            raise ManifestError(f"{self.path} has no {column!r} column (columns: {self.columns})")
+        return self.row(item_id)[column]
+
+    def column(self, column: str) -> Dict[str, str]:
+        """{id: value} for one column."""
+        if column not in self.columns:
+            raise ManifestError(f"{self.path} has no {column!r} column (columns: {self.columns})")
+        return {item_id: r[column] for item_id, r in self._index.items()}
+
+    def missing(self, ids: Sequence[str]) -> List[str]:
+        return [i for i in ids if i not in self._index]
+
+
+def parse_manifest(path: str | Path, id_column: str, required: Sequence[str] = ()) -> Manifest:
+    """Read and validate a manifest TSV (uncached; see `load_manifest`)."""
+    path = Path(path)
+    with path.open(newline="") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        columns = list(reader.fieldnames or [])
+        absent = [c for c in (id_column, *required) if c not in columns]
+        if absent:
+            raise ManifestError(f"{path}: missing column(s) {absent} (header: {columns})")
+        rows: List[Dict[str, str]] = []
+        errors: List[str] = []
+        first_seen: Dict[str, int] = {}
+        for line, row in enumerate(reader, start=2):
+            item_id = (row.get(id_column) or "").strip()
+            if not item_id:
+                if any((v or "").strip() for v in row.values() if isinstance(v, str)):
+                    errors.append(f"line {line}: empty {id_column}")
+                continue
+            if "/" in item_id or any(ch.isspace() for ch in item_id):
+                errors.append(f"line {line}: invalid {id_column} {item_id!r}")
+            elif item_id in first_seen:
+                errors.append(f"line {line}: duplicate {id_column} {item_id!r} (first on line {first_seen[item_id]})")
+            else:
+                first_seen[item_id] = line
+            for c in required:
+                if not (row.get(c) or "").strip():
+                    errors.append(f"line {line}: empty {c!r} for {item_id}")
+            row[id_column] = item_id
+            rows.append(dict(row))
+    if errors:
+        shown = "\n  ".join(errors[:20]) + (f"\n  ... and {len(errors) - 20} more" if len(errors) > 20 else "")
+        raise ManifestError(f"{path}: {len(errors)} problem(s):\n  {shown}")
+    return Manifest(path, id_column, columns, rows)
+
+
+def load_manifest(path: str | Path, id_column: str, required: Sequence[str] = ()) -> Manifest:
+    """Memoized `parse_manifest`; re-parsed only when the file's size or mtime changes."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), id_column, tuple(required))
+    sig = (st.st_size, st.st_mtime_ns)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    manifest = parse_manifest(path, id_column, required)
+    _cache[key] = (sig, manifest)
+    return manifest
+
+
+def load_phages(path: str | Path) -> Manifest:
+    return load_manifest(path, PHAGE_ID_COLUMN, PHAGE_REQUIRED)
+
+
+def load_hosts(path: str | Path, required: Optional[Sequence[str]] = None) -> Manifest:
+    """Host manifest; genome/proteome columns are only required where a caller needs them."""
+    return load_manifest(path, HOST_ID_COLUMN, tuple(required or ()))
+
+
+def select_phage_ids(ids_csv: Optional[str], manifest: Optional[str | Path],
+                     rows: Optional[str] = None) -> List[str]:
+    """Phage IDs from a comma-separated list, or from a phage manifest (optionally rows `START:STOP`).
+
+    The Snakefile passes the manifest: one argument listing a whole library passes the kernel's
+    128 KiB per-argument limit (E2BIG) at ~14k phages.
+    """
+    if ids_csv:
+        return [x.strip() for x in ids_csv.split(",") if x.strip()]
+    if manifest is None:
+        raise ManifestError("phage IDs or a phage manifest are required")
+    ids = load_phages(manifest).ids
+    if rows:
+        start, _, stop = rows.partition(":")
+        ids = ids[int(start or 0):int(stop) if stop else None]
+    return ids
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Lysogeny marker scan of phage annotations.
+
+A marker is a named list of case-insensitive regex fragments matched against the GFF
+attribute column (Prokka puts the product there). All markers are compiled into one
+alternation that rejects most feature lines in a single scan; a line it matches is then searched
+per marker, since one alternation only reports one of several markers matching overlapping text
+(a `recombinase` marker inside "site-specific recombinase", which `integrase` also lists). `config.yaml` may override or add markers and temperate rules under
+`lysogeny_markers`:
+
+    lysogeny_markers:
+      markers:
+        integrase: ["integrase", "site-specific recombinase"]
+      temperate_rules:
+        - [integrase]
+        - [ci_repressor, excisionase]
+
+A phage is `possible_temperate` when every marker of at least one rule is present.
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+# The only copy of the built-in dictionary: config.yaml's `lysogeny_markers` block is empty and
+# only lists overrides, which `load_scanner` applies on top of these.
+DEFAULT_MARKERS: Dict[str, List[str]] = {
+    "integrase": ["integrase", "site-specific recombinase"],
+    "excisionase": ["excisionase", r"\bxis\b"],
+    "ci_repressor": [r"\bc[i1]\b[- ]?(?:like )?repressor", r"repressor,? c[i1]\b",
+                     "phage repressor", "prophage repressor", "lambda repressor"],
+    "partition": [r"\bpar[ab]\b", "partition protein", "partitioning protein"],
+    "transposase": ["transposase"],
+}
+# Integrase alone keeps the original rule; the pairs catch integrase-less or
+# unannotated-integrase prophages (lambdoid, plasmid-like P1/N15, Mu-like).
+DEFAULT_TEMPERATE_RULES: List[List[str]] = [
+    ["integrase"],
+    ["ci_repressor", "excisionase"],
+    ["ci_repressor", "partition"],
+    ["ci_repressor", "transposase"],
+]
+
+
+class MarkerScanner:
+    """Compiled marker dictionary; `scan_gff` streams a GFF and reports counts and coordinates."""
+
+    def __init__(self, markers: Mapping[str, Sequence[str]],
+                 temperate_rules: Optional[Sequence[Sequence[str]]] = None):
+        self.markers = {name: list(patterns) for name, patterns in markers.items() if patterns}
+        self.temperate_rules = [list(rule) for rule in (temperate_rules or [])]
+        for rule in self.temperate_rules:
+            unknown = [m for m in rule if m not in self.markers]
+            if unknown:
+                raise ValueError(f"Temperate rule {rule} uses unknown markers {unknown}; expected {sorted(self.markers)}")
+        self._patterns = {name: re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+                          for name, patterns in self.markers.items()}
+        alternation = "|".join(f"(?:{p.pattern})" for p in self._patterns.values())
+        self.pattern = re.compile(alternation, re.IGNORECASE) if alternation else None
+
+    def match(self, text: str) -> List[str]:
+        """Marker names found in `text` (each at most once, in dictionary order)."""
+        if self.pattern is None or not self.pattern.search(text):
+            return []
+        return [name for name, pattern in self._patterns.items() if pattern.search(text)]
+
+    def scan_gff(self, lines: Iterable[str]) -> Dict[str, Any]:
+        """Stream GFF lines; per-marker feature counts and coordinates, plus the tRNA count."""
+        hits: Dict[str, List[Dict[str, Any]]] = {name: [] for name in self.markers}
+        trna = 0
+        for line in lines:
+            if line.startswith("##FASTA"):
+                break
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 9:
+                continue
+            if parts[2].lower() == "trna":
+                trna += 1
+            for name in self.match(parts[8]):
+                hits[name].append({"seqid": parts[0], "start": _int_or_none(parts[3]),
+                                   "end": _int_or_none(parts[4]), "strand": parts[6]})
+        return {
+            "tRNA_count": trna,
+            "markers": {name: {"count": len(feats), "features": feats} for name, feats in hits.items()},
+        }
+
+    def scan_gff_file(self, gff: Path) -> Dict[str, Any]:
+        with Path(gff).open() as f:
+            return self.scan_gff(f)
+
+    def temperate(self, counts: Mapping[str, int]) -> bool:
+        return any(all(counts.get(m, 0) > 0 for m in rule) for rule in self.temperate_rules)
+
+
+def _int_or_none(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def load_scanner(config: Optional[Mapping[str, Any]] = None) -> MarkerScanner:
+    """Scanner from the built-in dictionary, with `lysogeny_markers` config overrides applied."""
+    block = (config or {}).get("lysogeny_markers") or {}
+    markers = {name: list(patterns) for name, patterns in DEFAULT_MARKERS.items()}
+    for name, patterns in (block.get("markers") or {}).items():
+        markers[name] = list(patterns or [])
+    rules = block.get("temperate_rules")
+    return MarkerScanner(markers, DEFAULT_TEMPERATE_RULES if rules is None else rules)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""In-process hot-path instrumentation: nestable spans, counters and histograms per job.
+
+Off unless `$PM_PROFILE` names a trace directory (the workflow sets it from
+`params.profiling`). When off, `span()` returns a shared no-op context manager, `timed` and
+`traced` return the function unchanged, and `count`/`observe`/`record` return immediately.
+
+    @profiling.traced("assemble_decision_bundle")       # one JSON trace per job
+    def main():
+        args = parse_args()
+        profiling.label(host_id=args.host_id)             # labels the trace (and may start a capture)
+        with profiling.span("load_shared"):
+            ...
+            with profiling.span("safety_columns"):        # recorded as "load_shared/safety_columns"
+                ...
+        profiling.count("pairs_scored", n)
+        profiling.observe("hits_per_phage", k)
+
+A trace is written to `$PM_PROFILE/<script>/<labels>.<pid>.<ns>.json` with per-span count, total,
+min and max seconds, counters and log2-bucketed histograms. `python -m pm.profiling merge
+<dir>` sums traces across a run, per script and overall.
+
+Capture mode: `$PM_PROFILE_CAPTURE` names one host or phage (`H001`, or `host_id=H001`).
+While a trace or `capture()` block is labelled with it, cProfile and tracemalloc run; the
+`.prof` file is written next to the trace and the top functions and allocations are kept in it.
+"""
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+ENV_VAR = "PM_PROFILE"
+CAPTURE_ENV_VAR = "PM_PROFILE_CAPTURE"
+TRACE_FORMAT = 1
+TOP_N = 25
+
+_dir: Optional[str] = os.environ.get(ENV_VAR) or None
+_capture_target: Optional[str] = os.environ.get(CAPTURE_ENV_VAR) or None
+
+
+def enabled() -> bool:
+    return _dir is not None
+
+
+def enable(trace_dir: Optional[str | Path], capture: Optional[str] = None) -> None:
+    """Turn tracing on (or off with None) in this process; only affects functions decorated later."""
+    global _dir, _capture_target
+    _dir = str(trace_dir) if trace_dir else None
+    _capture_target = capture
+
+
+class _Collector:
+    def __init__(self, script: str) -> None:
+        self.script = script
+        self.pid = os.getpid()
+        self.labels: Dict[str, Any] = {}
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Dict[str, Any]] = {}
+        self.captures: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float, count: int = 1) -> None:
+        with self.lock:
+            s = self.spans.get(name)
+            if s is None:
+                self.spans[name] = [count, seconds, seconds, seconds]
+            else:
+                s[0] += count
+                s[1] += seconds
+                s[2] = min(s[2], seconds)
+                s[3] = max(s[3], seconds)
+
+    def document(self) -> Dict[str, Any]:
+        return {
+            "format": TRACE_FORMAT,
+            "script": self.script,
+            "labels": self.labels,
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "wall_s": round(time.perf_counter() - self.started, 6),
+            "spans": {name: {"count": c, "total_s": round(t, 6), "min_s": round(lo, 6), "max_s": round(hi, 6)}
+                      for name, (c, t, lo, hi) in sorted(self.spans.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": dict(sorted(self.histograms.items())),
+            "captures": self.captures,
+        }
+
+
+_collector: Optional[_Collector] = None
+_local = threading.local()
+
+
+def _stack() -> List[str]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _NullSpan:
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "path", "t0")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        stack = _stack()
+        self.path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self.path)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        seconds = time.perf_counter() - self.t0
+        _stack().pop()
+        if _collector is not None:
+            _collector.add_span(self.path, seconds)
+        return False
+
+
+def span(name: str):
+    """Context manager timing a named span, nested under the enclosing span of this thread."""
+    if _collector is None:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator form of `span` (identity when tracing is off at decoration time)."""
+    def decorate(fn: Callable) -> Callable:
+        if not enabled():
+            return fn
+        span_name = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name: str, seconds: float, count: int = 1) -> None:
+    """Add externally measured time (e.g. accumulated inside a loop) as a span under the current one."""
+    if _collector is None:
+        return
+    stack = _stack()
+    _collector.add_span(f"{stack[-1]}/{name}" if stack else name, seconds, count)
+
+
+def count(name: str, n: float = 1) -> None:
+    if _collector is None:
+        return
+    with _collector.lock:
+        _collector.counters[name] = _collector.counters.get(name, 0) + n
+
+
+def _bucket(value: float) -> str:
+    return str(math.floor(math.log2(value))) if value > 0 else "zero"
+
+
+def observe(name: str, value: float) -> None:
+    """Add a value to a histogram (count, sum, min, max and log2 buckets: "k" holds [2^k, 2^(k+1)))."""
+    if _collector is None:
+        return
+    with _collector.lock:
+        h = _collector.histograms.get(name)
+        if h is None:
+            h = _collector.histograms[name] = {"count": 0, "sum": 0.0, "min": value, "max": value, "buckets": {}}
+        h["count"] += 1
+        h["sum"] += value
+        h["min"] = min(h["min"], value)
+        h["max"] = max(h["max"], value)
+        b = _bucket(value)
+        h["buckets"][b] = h["buckets"].get(b, 0) + 1
+
+
+def _matched(labels: Dict[str, Any]) -> Dict[str, Any]:
+    """The labels that name the $PM_PROFILE_CAPTURE target (empty when there is none)."""
+    if not _capture_target:
+        return {}
+    key, sep, value = _capture_target.partition("=")
+    if not sep:
+        key, value = "", _capture_target
+    return {k: v for k, v in labels.items() if v is not None and str(v) == value and (not key or k == key)}
+
+
+class _Capture:
+    """cProfile + tracemalloc for the duration of one capture()/trace block."""
+
+    def __init__(self, subject: Dict[str, Any]) -> None:
+        import tracemalloc
+
+        self.subject = subject
+        self.tracemalloc = tracemalloc
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def finish(self) -> None:
+        self.profile.disable()
+        _, peak = self.tracemalloc.get_traced_memory()
+        allocations = self.tracemalloc.take_snapshot().statistics("lineno")[:TOP_N]
+        if self.started_tracemalloc:
+            self.tracemalloc.stop()
+        tag = "-".join(f"{k}={v}" for k, v in sorted(self.subject.items()))
+        prof_path = Path(_dir) / _collector.script / f"capture.{tag}.{os.getpid()}.prof"
+        prof_path.parent.mkdir(parents=True, exist_ok=True)
+        self.profile.dump_stats(str(prof_path))
+        stats = pstats.Stats(self.profile).sort_stats("cumulative")
+        functions = []
+        for func in stats.fcn_list[:TOP_N]:
+            _, calls, tottime, cumtime, _ = stats.stats[func]
+            functions.append({"function": f"{func[0]}:{func[1]}({func[2]})", "calls": calls,
+                              "tottime_s": round(tottime, 6), "cumtime_s": round(cumtime, 6)})
+        entry = {
+            "subject": self.subject,
+            "cprofile": str(prof_path),
+            "top_functions": functions,
+            "tracemalloc_peak_mb": round(peak / 2**20, 3),
+            "top_allocations": [{"where": str(s.traceback), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                                for s in allocations],
+        }
+        with _collector.lock:
+            _collector.captures.append(entry)
+
+
+@contextmanager
+def capture(**subject: Any) -> Iterator[None]:
+    """Profile this block with cProfile + tracemalloc when `subject` is the $PM_PROFILE_CAPTURE target."""
+    if _collector is None or getattr(_local, "capturing", False) or not _matched(subject):
+        yield
+        return
+    _local.capturing = True
+    cap = _Capture(_matched(subject))
+    try:
+        yield
+    finally:
+        cap.finish()
+        _local.capturing = False
+
+
+def label(**labels: Any) -> None:
+    """Attach labels (host_id, phage_id, ...) to the current trace; starts a capture if they match."""
+    if _collector is None:
+        return
+    _collector.labels.update({k: v for k, v in labels.items() if v is not None})
+    subject = _matched(labels)
+    if subject and not getattr(_local, "capturing", False):
+        _local.capturing = True
+        _local.trace_capture = _Capture(subject)
+
+
+def _trace_name(collector: _Collector) -> str:
+    parts = [f"{k}={v}" for k, v in sorted(collector.labels.items()) if "," not in str(v) and len(str(v)) <= 64]
+    return ".".join(parts + [str(os.getpid()), str(time.time_ns())]) + ".json"
+
+
+@contextmanager
+def trace(script: str, **labels: Any) -> Iterator[None]:
+    """Collect spans/counters/histograms for one job and write its JSON trace on exit."""
+    global _collector
+    # A collector inherited through fork belongs to the parent: pool workers trace their own jobs.
+    if not enabled() or (_collector is not None and _collector.pid == os.getpid()):
+        yield
+        return
+    _collector = _Collector(script)
+    _local.stack, _local.capturing, _local.trace_capture = [], False, None
+    label(**labels)
+    try:
+        yield
+    finally:
+        cap = getattr(_local, "trace_capture", None)
+        if cap is not None:
+            cap.finish()
+            _local.trace_capture = None
+            _local.capturing = False
+        collector, _collector = _collector, None
+        out = Path(_dir) / script / _trace_name(collector)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(collector.document(), indent=2))
+
+
+def traced(script: str) -> Callable[[Callable], Callable]:
+    """Decorator: run the function inside `trace(script)` (identity when tracing is off)."""
+    def decorate(fn: Callable) -> Callable:
+        if not enabled():
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with trace(script):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ---------- Merging traces across a run ----------
+
+def _merge_into(target: Dict[str, Any], doc: Dict[str, Any]) -> None:
+    target["jobs"] += 1
+    target["wall_s"] = round(target["wall_s"] + doc.get("wall_s", 0.0), 6)
+    for name, s in doc.get("spans", {}).items():
+        t = target["spans"].get(name)
+        if t is None:
+            target["spans"][name] = dict(s)
+        else:
+            t["count"] += s["count"]
+            t["total_s"] = round(t["total_s"] + s["total_s"], 6)
+            t["min_s"] = min(t["min_s"], s["min_s"])
+            t["max_s"] = max(t["max_s"], s["max_s"])
+    for name, n in doc.get("counters", {}).items():
+        target["counters"][name] = target["counters"].get(name, 0) + n
+    for name, h in doc.get("histograms", {}).items():
+        t = target["histograms"].get(name)
+        if t is None:
+            target["histograms"][name] = json.loads(json.dumps(h))
+            continue
+        t["count"] += h["count"]
+        t["sum"] = round(t["sum"] + h["sum"], 6)
+        t["min"] = min(t["min"], h["min"])
+        t["max"] = max(t["max"], h["max"])
+        for b, n in h["buckets"].items():
+            t["buckets"][b] = t["buckets"].get(b, 0) + n
+    target["captures"].extend(doc.get("captures", []))
+
+
+def merge_traces(paths: List[Path], top_n: int = 20) -> Dict[str, Any]:
+    """Sum traces per script; `top_spans` ranks "<script>:<span>" by total seconds across the run."""
+    scripts: Dict[str, Dict[str, Any]] = {}
+    for path in paths:
+        doc = json.loads(path.read_text())
+        entry = scripts.setdefault(doc["script"], {"jobs": 0, "wall_s": 0.0, "spans": {}, "counters": {},
+                                                   "histograms": {}, "captures": []})
+        _merge_into(entry, doc)
+    top = sorted(((f"{script}:{name}", s) for script, e in scripts.items() for name, s in e["spans"].items()),
+                 key=lambda kv: -kv[1]["total_s"])[:top_n]
+    return {
+        "format": TRACE_FORMAT,
+        "traces": len(paths),
+        "scripts": dict(sorted(scripts.items())),
+        "top_spans": [{"span": name, **s} for name, s in top],
+    }
+
+
+def find_traces(roots: List[str | Path]) -> List[Path]:
+    out: List[Path] = []
+    for root in roots:
+        root = Path(root)
+        if root.is_dir():
+            out.extend(sorted(root.rglob("*.json")))
+        elif root.is_file():
+            out.append(root)
+    return out
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Merge per-job pm.profiling traces across a run.")
+    sub = p.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("merge", help="Sum traces per script and rank the hottest spans.")
+    m.add_argument("paths", nargs="+", help="Trace files or directories (searched recursively).")
+    m.add_argument("--out", default=None, help="Write the merged JSON here instead of stdout.")
+    m.add_argument("--top-n", type=int, default=20)
+    args = p.parse_args()
+
+    merged = merge_traces(find_traces(args.paths), args.top_n)
+    text = json.dumps(merged, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text)
+        for row in merged["top_spans"]:
+            print(f"{row['total_s']:10.3f} s  {row['count']:8d}x  {row['span']}")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
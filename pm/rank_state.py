@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Per-host scored state for incremental decision bundle re-ranking.
+
+A state holds one host's full ranking in rank order, (-confidence, phage_id), and per row the
+scoring inputs (pm.scoring columns plus safety flags) and a fingerprint of each per-pair feature
+JSON (its SHA-256). `update_state` finds the phages whose inputs changed, rescoring only those,
+and merges them back into the ordered rows, so a library update of a few phages costs a few
+feature reads per host instead of a full re-assembly:
+
+- phages new to the manifest, or listed in `changed`;
+- per-pair JSONs whose content differs (not checked when `changed` is given; the feature rules
+  rewrite every JSON of a host when they rerun, so size and mtime would flag every phage);
+- feature store rows whose values differ (stores are rewritten whole, so values are compared);
+- safety flags that differ from the shared, already-loaded safety columns.
+
+A state written for different feature sources (JSON vs store, modules present) or another
+`STATE_VERSION` is ignored and rebuilt. Scores are computed by pm.scoring on the same inputs,
+so an updated state ranks exactly like a full assembly.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pm import scoring
+from pm.feature_store import FeatureStore
+from pm.hash_cache import sha256_files
+from pm.utils import ensure_dir
+
+STATE_VERSION = 2
+# Row arrays, all in rank order.
+COLUMNS = ("phage_ids", "sim_value", "sim_valid", "best_evalue", "hit_count", "struct_valid", "flags",
+           "confidence", "reason", "sim_fp", "struct_fp")
+_NO_FILE = "-"
+
+
+def state_path(state_dir: str | Path, host_id: str) -> Path:
+    return Path(state_dir) / f"{host_id}.npz"
+
+
+def feature_sources(sim_dir: Optional[Path], struct_dir: Optional[Path], safety: bool,
+                    sim_store: Optional[FeatureStore], struct_store: Optional[FeatureStore]) -> Dict[str, Any]:
+    """Where each module's inputs come from; a state is only reused for the same sources."""
+    return {
+        "version": STATE_VERSION,
+        "similarity": "store" if sim_store is not None else ("json" if sim_dir else None),
+        "structural": "store" if struct_store is not None else ("json" if struct_dir else None),
+        "safety": bool(safety),
+    }
+
+
+def fingerprints(base_dir: Optional[Path], host_id: str, phage_ids: Iterable[str]) -> np.ndarray:
+    """SHA-256 of each per-pair JSON, "-" where missing; empty strings without a JSON dir."""
+    phage_ids = list(phage_ids)
+    if base_dir is None:
+        return np.full(len(phage_ids), "", dtype="<U64")
+    paths = [str(base_dir / host_id / f"{pid}.json") for pid in phage_ids]
+    digests = sha256_files(paths)
+    return np.array([digests[p] or _NO_FILE for p in paths], dtype="<U64")
+
+
+def _join_flags(flags: Sequence[List[str]]) -> np.ndarray:
+    return np.array([";".join(f) for f in flags], dtype=np.str_)
+
+
+class RankState:
+    """One host's rows in rank order; see the module docstring."""
+
+    def __init__(self, host_id: str, sources: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.host_id = host_id
+        self.sources = sources
+        self.arrays = arrays
+
+    def __len__(self) -> int:
+        return len(self.arrays["phage_ids"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    @classmethod
+    def from_columns(cls, host_id: str, sources: Dict[str, Any], cols: scoring.FeatureColumns,
+                     sim_fp: np.ndarray, struct_fp: np.ndarray) -> "RankState":
+        """Score `cols` and order the rows (fingerprints are in `cols` row order)."""
+        scores = scoring.score(cols)
+        order = scoring.rank_order(scores["confidence"], cols.phage_ids)
+        arrays = {
+            "phage_ids": cols.phage_ids, "sim_value": cols.sim_value, "sim_valid": cols.sim_valid,
+            "best_evalue": cols.best_evalue, "hit_count": cols.hit_count, "struct_valid": cols.struct_valid,
+            "flags": _join_flags(cols.flags), "confidence": scores["confidence"],
+            "reason": scores["reason"].astype(np.str_), "sim_fp": sim_fp, "struct_fp": struct_fp,
+        }
+        return cls(host_id, sources, {k: v[order] for k, v in arrays.items()})
+
+    def take(self, rows: np.ndarray) -> "RankState":
+        return RankState(self.host_id, self.sources, {k: v[rows] for k, v in self.arrays.items()})
+
+    def merge(self, other: "RankState") -> "RankState":
+        """Both states in rank order; `other` is usually a handful of rescored rows."""
+        if not len(other):
+            return self
+        a_conf, a_ids = self["confidence"], self["phage_ids"]
+        b_conf, b_ids = other["confidence"], other["phage_ids"]
+        # Slot of each `other` row among ours: the confidence block it falls in, then by phage_id
+        # within the block of equal confidences.
+        neg = -a_conf
+        lo = np.searchsorted(neg, -b_conf, side="left")
+        hi = np.searchsorted(neg, -b_conf, side="right")
+        pos = lo.copy()
+        for j in np.flatnonzero(hi > lo):
+            pos[j] = lo[j] + np.searchsorted(a_ids[lo[j]:hi[j]], b_ids[j])
+        n = len(self) + len(other)
+        b_at = pos + np.arange(len(other))
+        a_mask = np.ones(n, dtype=bool)
+        a_mask[b_at] = False
+        arrays = {}
+        for name, a in self.arrays.items():
+            b = other.arrays[name]
+            out = np.empty((n,) + a.shape[1:], dtype=np.result_type(a, b))
+            out[a_mask] = a
+            out[b_at] = b
+            arrays[name] = out
+        return RankState(self.host_id, self.sources, arrays)
+
+    def flags(self, i: int) -> List[str]:
+        s = str(self["flags"][i])
+        return s.split(";") if s else []
+
+    def ranked(self) -> List[Tuple[str, float, str, List[str]]]:
+        """(phage_id, confidence, primary_reason, flags) in rank order, as ranking.csv lists them."""
+        return [(str(pid), float(c), str(r), self.flags(i))
+                for i, (pid, c, r) in enumerate(zip(self["phage_ids"], self["confidence"], self["reason"]))]
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        ensure_dir(path.parent)
+        meta = {"host_id": self.host_id, "sources": self.sources}
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **self.arrays)
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path, host_id: str, sources: Dict[str, Any]) -> Optional["RankState"]:
+        """The saved state, or None when missing, unreadable, or written for other sources."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                meta = json.loads(str(z["meta"]))
+                arrays = {name: z[name] for name in COLUMNS}
+        except Exception:
+            return None
+        if meta.get("host_id") != host_id or meta.get("sources") != sources:
+            return None
+        return cls(host_id, sources, arrays)
+
+
+def _differs(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Elementwise inequality treating NaN == NaN."""
+    return (old != new) & ~(np.isnan(old) & np.isnan(new))
+
+
+def build_state(host_id: str, phage_ids: Sequence[str], sim_dir: Optional[Path], struct_dir: Optional[Path],
+                safety: Optional[scoring.FeatureColumns], sim_store: Optional[FeatureStore] = None,
+                struct_store: Optional[FeatureStore] = None) -> RankState:
+    """Full scoring of every phage (no usable saved state)."""
+    sources = feature_sources(sim_dir, struct_dir, safety is not None, sim_store, struct_store)
+    cols = scoring.load_feature_columns(host_id, phage_ids, sim_dir, struct_dir, None, safety, sim_store, struct_store)
+    return RankState.from_columns(
+        host_id, sources, cols,
+        fingerprints(None if sim_store is not None else sim_dir, host_id, phage_ids),
+        fingerprints(None if struct_store is not None else struct_dir, host_id, phage_ids))
+
+
+def update_state(state: RankState, phage_ids: Sequence[str], sim_dir: Optional[Path], struct_dir: Optional[Path],
+                 safety: Optional[scoring.FeatureColumns], sim_store: Optional[FeatureStore] = None,
+                 struct_store: Optional[FeatureStore] = None,
+                 changed: Optional[Iterable[str]] = None) -> Tuple[RankState, int]:
+    """Rescore the phages whose inputs changed and merge them in; returns (state, rows rescored).
+
+    `safety` holds the current safety columns in `phage_ids` order. With `changed`, per-pair
+    JSON fingerprints are trusted for every other phage instead of being re-checked.
+    """
+    host_id = state.host_id
+    sim_json = None if sim_store is not None else sim_dir
+    struct_json = None if struct_store is not None else struct_dir
+    manifest = np.array(list(phage_ids), dtype=np.str_)
+    index = {pid: i for i, pid in enumerate(state["phage_ids"].tolist())}
+    rows = np.array([index.get(pid, -1) for pid in manifest.tolist()], dtype=np.intp)
+    known = rows >= 0
+    dirty = ~known
+    r = rows[known]
+
+    if changed is not None:
+        dirty |= np.isin(manifest, np.array(list(changed), dtype=np.str_))
+    else:
+        for base, fp in ((sim_json, "sim_fp"), (struct_json, "struct_fp")):
+            if base is not None:
+                now = fingerprints(base, host_id, manifest[known])
+                dirty[known] |= now != state[fp][r]
+    if safety is not None:
+        dirty[known] |= _join_flags(safety.flags)[known] != state["flags"][r]
+    if sim_store is not None or struct_store is not None:
+        current = scoring.load_feature_columns(host_id, manifest[known].tolist(), None, None, None,
+                                               None, sim_store, struct_store)
+        if sim_store is not None:
+            dirty[known] |= (current.sim_valid != state["sim_valid"][r]) | _differs(current.sim_value, state["sim_value"][r])
+        if struct_store is not None:
+            dirty[known] |= ((current.struct_valid != state["struct_valid"][r])
+                             | _differs(current.best_evalue, state["best_evalue"][r])
+                             | _differs(current.hit_count, state["hit_count"][r]))
+
+    # Rows kept as they are: still in the manifest and unchanged (they stay in rank order).
+    keep = np.zeros(len(state), dtype=bool)
+    keep[rows[known & ~dirty]] = True
+    redo = np.flatnonzero(dirty)
+    redo_ids = manifest[redo].tolist()
+    cols = scoring.load_feature_columns(host_id, redo_ids, sim_json, struct_json, None,
+                                        safety.take(redo) if safety is not None else None, sim_store, struct_store)
+    rescored = RankState.from_columns(host_id, state.sources, cols, fingerprints(sim_json, host_id, redo_ids),
+                                      fingerprints(struct_json, host_id, redo_ids))
+    return state.take(np.flatnonzero(keep)).merge(rescored), len(redo)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Receptor-focused protein selection for the structural PPI search.
+
+Nearly all host-range signal in a Foldseek search comes from phage tail fibers / tailspikes /
+receptor-binding proteins meeting host surface proteins. These helpers pick those proteins
+out of the annotations already produced by the pipeline:
+
+  - phage: Prokka GFF `product=` attributes, plus protein IDs called RBP-like in the
+    `predict_rbps.py` InterProScan TSVs when available
+  - host:  proteome FASTA header descriptions (Prokka writes the product after the ID)
+
+Structure files are matched to protein IDs by file stem, also accepting the
+`<phage_id>__<protein_id>` / `<phage_id>|<protein_id>` naming used by the library.
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Lower-case regex fragments matched as whole words (`keyword_pattern`); a trailing `\w*` marks
+# a stem ("capsul\w*": capsule, capsular), so "lamb" does not match "lambda".
+PHAGE_RECEPTOR_KEYWORDS = (
+    r"tail[- ]fib(?:er|re)s?", r"tail[- ]?spikes?", r"receptor[- ]binding", r"host specificity", r"base[- ]?plate",
+    r"tail proteins?", r"adhesins?", r"depolymerases?",
+)
+HOST_SURFACE_KEYWORDS = (
+    r"outer membrane", r"porins?", r"maltoporin", r"lamb", r"lipopolysaccharide", r"lps[- ]assembly",
+    r"o[- ]antigen", r"capsul\w*", r"flagell\w*", r"pil(?:us|i|ins?)", r"fimbri\w*", r"tonb-dependent",
+    r"teichoic", r"s-layer", r"(?:cell )?surface (?:proteins?|antigens?|layer)",
+    r"(?:siderophore|colicin|ferri\w*|vitamin b12) receptors?",
+)
+STRUCTURE_SUFFIXES = (".gz", ".pdb", ".cif", ".mmcif", ".ent")
+
+
+def keyword_pattern(keywords: Iterable[str]) -> re.Pattern:
+    """One pattern matching any keyword fragment as a whole word of lower-cased text."""
+    return re.compile(r"\b(?:" + "|".join(keywords) + r")\b")
+
+
+def protein_key(path: Path) -> str:
+    """Structure file name without structure/compression suffixes."""
+    name = path.name
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in STRUCTURE_SUFFIXES:
+            if name.lower().endswith(suffix):
+                name = name[: -len(suffix)]
+                stripped = True
+    return name
+
+
+def key_candidates(key: str) -> List[str]:
+    out = [key]
+    for sep in ("__", "|"):
+        if sep in key:
+            out.append(key.split(sep)[-1])
+    return out
+
+
+def gff_receptor_ids(gff: Path, pattern: re.Pattern) -> Set[str]:
+    """IDs / locus tags of CDS features whose product matches `pattern`."""
+    ids: Set[str] = set()
+    if not gff.exists():
+        return ids
+    with gff.open() as f:
+        for line in f:
+            if line.startswith("##FASTA"):
+                break
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 9 or parts[2] != "CDS":
+                continue
+            attrs = dict(kv.split("=", 1) for kv in parts[8].split(";") if "=" in kv)
+            if not pattern.search(attrs.get("product", "").lower()):
+                continue
+            for field in ("ID", "locus_tag"):
+                if attrs.get(field):
+                    ids.add(attrs[field])
+    return ids
+
+
+def interpro_receptor_ids(tsv: Path, pattern: re.Pattern) -> Set[str]:
+    """Protein accessions with an InterProScan signature/entry description matching `pattern`."""
+    ids: Set[str] = set()
+    if not tsv.exists():
+        return ids
+    with tsv.open() as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) < 6:
+                continue
+            text = " ".join(parts[5:6] + parts[12:13]).lower()
+            if pattern.search(text):
+                ids.add(parts[0])
+    return ids
+
+
+def fasta_surface_ids(faa: Path, pattern: re.Pattern) -> Set[str]:
+    ids: Set[str] = set()
+    if not faa.exists():
+        return ids
+    with faa.open() as f:
+        for line in f:
+            if not line.startswith(">"):
+                continue
+            fields = line[1:].strip().split(None, 1)
+            if fields and len(fields) > 1 and pattern.search(fields[1].lower()):
+                ids.add(fields[0])
+    return ids
+
+
+def select_structures(struct_dir: Path, keep_ids: Set[str]) -> Dict[str, object]:
+    """Split a structure folder into kept/excluded files.
+
+    When no protein of the folder was flagged the whole folder is kept (`fallback`): a missing
+    annotation must not silently remove an organism from the search.
+    """
+    files = sorted(p for p in struct_dir.rglob("*") if p.is_file()) if struct_dir.is_dir() else []
+    kept = [p for p in files if any(c in keep_ids for c in key_candidates(protein_key(p)))]
+    fallback = not kept
+    if fallback:
+        kept = files
+    kept_set = set(kept)
+    return {
+        "kept": kept,
+        "excluded": [p for p in files if p not in kept_set],
+        "fallback": fallback,
+    }
+
+
+def selection_report(selection: Dict[str, object], source: Optional[str]) -> Dict[str, object]:
+    return {
+        "source": source,
+        "n_total": len(selection["kept"]) + len(selection["excluded"]),
+        "n_kept": len(selection["kept"]),
+        "fallback_kept_all": selection["fallback"],
+        "excluded": [protein_key(p) for p in selection["excluded"]],
+    }
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Vectorized host x phage scoring for decision bundle assembly.
+
+Feature JSONs are reduced to a few column arrays as they are read (the dicts are dropped
+immediately), confidence is computed for all phages at once, and the top-N shortlist is picked
+with `argpartition`; full evidence is only re-read for shortlisted rows. Every formula mirrors
+the scalar functions in `scripts/assemble_decision_bundle.py` operation for operation, including
+`clamp01` sending NaN to 1.0, so both paths rank identically
+(`scripts/benchmarks/scoring_parity.py`).
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pm import profiling
+from pm.feature_store import FeatureStore
+
+REASON_THRESHOLD = 0.15
+
+
+@profiling.timed()
+def load_json(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text())
+    except Exception:
+        return None
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except Exception:
+        return None
+
+
+class FeatureColumns:
+    """Per-phage scoring inputs for one host, one row per phage in manifest order."""
+
+    def __init__(self, phage_ids: Sequence[str]):
+        n = len(phage_ids)
+        self.phage_ids = np.array(list(phage_ids), dtype=np.str_)
+        self.sim_value = np.zeros(n, dtype=np.float64)
+        self.sim_valid = np.zeros(n, dtype=bool)
+        self.best_evalue = np.ones(n, dtype=np.float64)
+        self.hit_count = np.zeros(n, dtype=np.float64)
+        self.struct_valid = np.zeros(n, dtype=bool)
+        self.vfdb_flag = np.zeros(n, dtype=bool)
+        self.temperate_flag = np.zeros(n, dtype=bool)
+        self.flags: List[List[str]] = [[] for _ in range(n)]
+
+    def set_similarity(self, i: int, sim: Optional[Dict[str, Any]]) -> None:
+        value = _float_or_none(sim.get("value")) if sim else None
+        if value is not None:
+            self.sim_value[i] = value
+            self.sim_valid[i] = True
+
+    def set_structural(self, i: int, struct: Optional[Dict[str, Any]]) -> None:
+        if not struct or struct.get("best_evalue") is None:
+            return
+        best_e = _float_or_none(struct["best_evalue"])
+        if best_e is None:
+            return
+        self.best_evalue[i] = best_e
+        self.hit_count[i] = float(struct.get("hit_count") or 0)
+        self.struct_valid[i] = True
+
+    def set_safety(self, i: int, safety: Optional[Dict[str, Any]]) -> None:
+        flags = list((safety or {}).get("flags") or [])
+        self.flags[i] = flags
+        self.vfdb_flag[i] = "vfdb_hit" in flags
+        self.temperate_flag[i] = "possible_temperate" in flags
+
+    def share_safety(self, other: "FeatureColumns") -> None:
+        """Reuse another instance's (read-only) safety columns; safety does not depend on the host."""
+        self.vfdb_flag, self.temperate_flag, self.flags = other.vfdb_flag, other.temperate_flag, other.flags
+
+    def take(self, rows: Sequence[int]) -> "FeatureColumns":
+        """Copy of the given rows (used to score a subset of phages, e.g. incremental updates)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        sub = FeatureColumns(self.phage_ids[rows])
+        for name in ("sim_value", "sim_valid", "best_evalue", "hit_count", "struct_valid", "vfdb_flag", "temperate_flag"):
+            setattr(sub, name, getattr(self, name)[rows])
+        sub.flags = [self.flags[i] for i in rows]
+        return sub
+
+
+def load_safety_columns(phage_ids: Sequence[str], safety_dir: Path) -> FeatureColumns:
+    cols = FeatureColumns(phage_ids)
+    for i, pid in enumerate(phage_ids):
+        cols.set_safety(i, load_json(safety_dir / f"{pid}.json"))
+    return cols
+
+
+def _gather(store: FeatureStore, column: str, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Store column values at `rows` and whether each converts with float(); invalid where the row
+    is -1 (phage not in the store)."""
+    out = np.full(len(rows), np.nan)
+    valid = np.zeros(len(rows), dtype=bool)
+    have = rows >= 0
+    if have.any():
+        out[have] = store.column(column)[rows[have]]
+        valid[have] = store.valid(column)[rows[have]]
+    return out, valid
+
+
+def load_feature_columns(host_id: str, phage_ids: Sequence[str], sim_dir: Optional[Path],
+                         struct_dir: Optional[Path], safety_dir: Optional[Path],
+                         safety: Optional[FeatureColumns] = None, sim_store: Optional[FeatureStore] = None,
+                         struct_store: Optional[FeatureStore] = None) -> FeatureColumns:
+    """Columns for one host; pass `safety` (from `load_safety_columns`) to skip re-reading safety JSONs.
+
+    With a host's feature store (pm.feature_store), that module's columns are gathered straight
+    from the memory-mapped matrix instead of per-pair JSONs; the stored value kinds decide what
+    counts as missing, as `set_similarity`/`set_structural` do on the documents.
+    """
+    cols = FeatureColumns(phage_ids)
+    if safety is not None:
+        cols.share_safety(safety)
+        safety_dir = None
+    if sim_store is not None:
+        value, cols.sim_valid = _gather(sim_store, "value", sim_store.rows(phage_ids))
+        cols.sim_value = np.where(cols.sim_valid, value, 0.0)
+        sim_dir = None
+    if struct_store is not None:
+        rows = struct_store.rows(phage_ids)
+        best_e, cols.struct_valid = _gather(struct_store, "best_evalue", rows)
+        cols.best_evalue = np.where(cols.struct_valid, best_e, 1.0)
+        hit_count, hit_valid = _gather(struct_store, "hit_count", rows)
+        cols.hit_count = np.where(cols.struct_valid & hit_valid, hit_count, 0.0)
+        struct_dir = None
+    for i, pid in enumerate(phage_ids):
+        if sim_dir:
+            cols.set_similarity(i, load_json(sim_dir / host_id / f"{pid}.json"))
+        if struct_dir:
+            cols.set_structural(i, load_json(struct_dir / host_id / f"{pid}.json"))
+        if safety_dir:
+            cols.set_safety(i, load_json(safety_dir / f"{pid}.json"))
+    return cols
+
+
+def clamp01(x: np.ndarray) -> np.ndarray:
+    # Same as max(0.0, min(1.0, x)) elementwise, which maps NaN to 1.0.
+    return np.where(x < 1.0, np.where(x > 0.0, x, 0.0), 1.0)
+
+
+def structural_scores(cols: FeatureColumns) -> np.ndarray:
+    best_e = np.where(cols.best_evalue <= 0, 1e-180, cols.best_evalue)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        e_score = clamp01((-np.log10(best_e) - 2.0) / 6.0)
+        h_score = 1.0 - np.exp(-cols.hit_count / 3.0)
+    return np.where(cols.struct_valid, clamp01(0.7 * e_score + 0.3 * h_score), 0.0)
+
+
+def similarity_scores(cols: FeatureColumns) -> np.ndarray:
+    return np.where(cols.sim_valid, clamp01(cols.sim_value), 0.0)
+
+
+def safety_penalties(cols: FeatureColumns) -> np.ndarray:
+    return 0.0 + 0.25 * cols.vfdb_flag + 0.20 * cols.temperate_flag
+
+
+def primary_reasons(struct_score: np.ndarray, sim_score: np.ndarray) -> np.ndarray:
+    return np.where((struct_score >= sim_score) & (struct_score > REASON_THRESHOLD), "structural_support",
+                    np.where(sim_score > REASON_THRESHOLD, "sequence_similarity", "weak_evidence"))
+
+
+def score(cols: FeatureColumns) -> Dict[str, np.ndarray]:
+    struct_score = structural_scores(cols)
+    sim_score = similarity_scores(cols)
+    confidence = clamp01(0.6 * struct_score + 0.4 * sim_score - safety_penalties(cols))
+    return {
+        "structural": struct_score,
+        "similarity": sim_score,
+        "confidence": confidence,
+        "reason": primary_reasons(struct_score, sim_score),
+    }
+
+
+def rank_order(confidence: np.ndarray, phage_ids: np.ndarray) -> np.ndarray:
+    """Row indices by (-confidence, phage_id), the order of the scalar path's sort."""
+    return np.lexsort((phage_ids, -confidence))
+
+
+def top_n_indices(confidence: np.ndarray, phage_ids: np.ndarray, n: int) -> np.ndarray:
+    """First `n` rows of `rank_order` without sorting every row; ties at the cutoff go by phage_id."""
+    if n <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if n >= len(confidence):
+        return rank_order(confidence, phage_ids)
+    cutoff = confidence[np.argpartition(-confidence, n - 1)[:n]].min()
+    # Keep every row tied with the cutoff so the phage_id tie-break matches the full sort.
+    candidates = np.flatnonzero(confidence >= cutoff)
+    return candidates[rank_order(confidence[candidates], phage_ids[candidates])][:n]
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Read sourmash `.sig` files and compute containment without the sourmash CLI."""
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# sourmash stores FracMinHash hashes as unsigned 64-bit ints below max_hash.
+MAX_HASH_64 = 2**64 - 1
+
+
+def max_hash_for_scaled(scaled: int) -> int:
+    """Mirror sourmash: max_hash = round((2**64 - 1) / scaled)."""
+    if scaled <= 0:
+        return 0
+    return min(int(round(MAX_HASH_64 / scaled, 0)), MAX_HASH_64)
+
+
+def scaled_for_max_hash(max_hash: int) -> int:
+    if max_hash <= 0:
+        return 0
+    return int(round(MAX_HASH_64 / max_hash, 0))
+
+
+def _read_sig_text(path: Path) -> str:
+    raw = path.read_bytes()
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    return raw.decode("utf-8")
+
+
+def load_sketches(path: str | Path) -> List[Dict[str, Any]]:
+    """Return every sketch dict in a `.sig` file (a file may hold several signatures / ksizes)."""
+    data = json.loads(_read_sig_text(Path(path)))
+    if isinstance(data, dict):
+        data = [data]
+    sketches: List[Dict[str, Any]] = []
+    for sig in data:
+        for mh in sig.get("signatures") or []:
+            sketches.append(mh)
+    return sketches
+
+
+def load_hashes(path: str | Path, ksize: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """Load the (sorted, unique) hash array and `scaled` of the sketch matching `ksize`.
+
+    If `ksize` is None the file must contain exactly one DNA sketch.
+    """
+    sketches = [mh for mh in load_sketches(path) if (mh.get("molecule") or "dna").lower() == "dna"]
+    if ksize is not None:
+        sketches = [mh for mh in sketches if int(mh.get("ksize", -1)) == int(ksize)]
+    if not sketches:
+        raise ValueError(f"no DNA sketch with ksize={ksize} in {path}")
+    if len(sketches) > 1:
+        raise ValueError(f"ambiguous sketches in {path}: pass ksize to select one")
+    mh = sketches[0]
+    mins = np.unique(np.asarray(mh.get("mins") or [], dtype=np.uint64))
+    return mins, scaled_for_max_hash(int(mh.get("max_hash") or 0))
+
+
+def downsample(hashes: np.ndarray, scaled: int) -> np.ndarray:
+    if scaled <= 0:
+        return hashes
+    return hashes[hashes <= np.uint64(max_hash_for_scaled(scaled))]
+
+
+def max_containment_batch(host: np.ndarray, phages: Sequence[np.ndarray]) -> np.ndarray:
+    """Max containment |H ∩ P| / min(|H|, |P|) of one host against many phage sketches.
+
+    All phage hashes are concatenated into one array and intersected with the host in a
+    single vectorized pass; intersections are then counted per phage with `bincount`.
+    Inputs must already share ksize and scaled.
+    """
+    n = len(phages)
+    if n == 0:
+        return np.zeros(0, dtype=np.float64)
+    sizes = np.fromiter((len(p) for p in phages), dtype=np.int64, count=n)
+    if sizes.sum() == 0 or len(host) == 0:
+        return np.zeros(n, dtype=np.float64)
+    all_hashes = np.concatenate(phages)
+    owner = np.repeat(np.arange(n, dtype=np.int64), sizes)
+    shared = np.bincount(owner[np.isin(all_hashes, host, assume_unique=False)], minlength=n)
+    denom = np.minimum(sizes, len(host))
+    out = np.zeros(n, dtype=np.float64)
+    np.divide(shared, denom, out=out, where=denom > 0)
+    return out
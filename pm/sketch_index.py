@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Persistent inverted hash index over the phage library sketches.
+
+Layout of an index directory:
+
+    index.json            catalog: ksize, scaled, phage_ids, per-phage sizes + sig hashes, segments
+    seg_0000/hashes.npy   sorted unique uint64 hashes present in this segment
+    seg_0000/offsets.npy  int64, len(hashes)+1; postings[offsets[i]:offsets[i+1]] own hashes[i]
+    seg_0000/postings.npy uint32 indexes into catalog phage_ids
+
+Segments are append-only: adding phages writes a new segment instead of rebuilding the
+existing ones. All arrays are opened with `mmap_mode="r"`, so a query only pages in the
+postings touched by the host sketch.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pm.signatures import downsample, load_hashes
+from pm.utils import ensure_dir, sha256_files
+
+INDEX_FORMAT = 1
+CATALOG_NAME = "index.json"
+
+
+def _read_catalog(index_dir: Path) -> Optional[Dict]:
+    p = index_dir / CATALOG_NAME
+    if not p.exists():
+        return None
+    return json.loads(p.read_text())
+
+
+def _write_segment(seg_dir: Path, hash_lists: Sequence[np.ndarray], phage_idx: Sequence[int]) -> None:
+    ensure_dir(seg_dir)
+    sizes = np.fromiter((len(h) for h in hash_lists), dtype=np.int64, count=len(hash_lists))
+    if sizes.sum():
+        all_hashes = np.concatenate(hash_lists)
+        owners = np.repeat(np.asarray(phage_idx, dtype=np.uint32), sizes)
+    else:
+        all_hashes = np.zeros(0, dtype=np.uint64)
+        owners = np.zeros(0, dtype=np.uint32)
+    order = np.lexsort((owners, all_hashes))
+    all_hashes = all_hashes[order]
+    owners = owners[order]
+    uniq, starts = np.unique(all_hashes, return_index=True)
+    offsets = np.append(starts, len(all_hashes)).astype(np.int64)
+    np.save(seg_dir / "hashes.npy", uniq.astype(np.uint64))
+    np.save(seg_dir / "offsets.npy", offsets)
+    np.save(seg_dir / "postings.npy", owners.astype(np.uint32))
+
+
+def build_index(index_dir: str | Path, sig_paths: Dict[str, str | Path], ksize: int, scaled: int,
+                append: bool = True) -> Dict[str, int]:
+    """Create or extend the index with `sig_paths` ({phage_id: .sig path}).
+
+    With `append=True`, phages already indexed with an unchanged signature are kept and only
+    new phages are written as a fresh segment. A params mismatch or a changed signature for
+    an indexed phage forces a full rebuild. Returns counts of added/kept phages.
+    """
+    index_dir = ensure_dir(index_dir)
+    catalog = _read_catalog(index_dir) if append else None
+    digests = sha256_files(sig_paths.values())
+    sig_hashes = {pid: digests[str(path)] for pid, path in sig_paths.items()}
+
+    rebuild = catalog is None
+    if catalog is not None:
+        if catalog.get("format") != INDEX_FORMAT or catalog.get("ksize") != ksize or catalog.get("scaled") != scaled:
+            rebuild = True
+        else:
+            known = dict(zip(catalog["phage_ids"], catalog["sig_sha256"]))
+            if any(pid in known and known[pid] != sha for pid, sha in sig_hashes.items()):
+                rebuild = True
+
+    if rebuild:
+        for old in index_dir.glob("seg_*"):
+            for f in old.iterdir():
+                f.unlink()
+            old.rmdir()
+        catalog = {"format": INDEX_FORMAT, "ksize": ksize, "scaled": scaled,
+                   "phage_ids": [], "phage_sizes": [], "sig_sha256": [], "segments": []}
+
+    known_ids = set(catalog["phage_ids"])
+    new_ids = [pid for pid in sig_paths if pid not in known_ids]
+    if new_ids:
+        hash_lists: List[np.ndarray] = []
+        base = len(catalog["phage_ids"])
+        for pid in new_ids:
+            hashes, sig_scaled = load_hashes(sig_paths[pid], ksize)
+            if sig_scaled > scaled:
+                raise ValueError(f"{sig_paths[pid]} has scaled={sig_scaled}, coarser than index scaled={scaled}")
+            hashes = downsample(hashes, scaled)
+            hash_lists.append(hashes)
+            catalog["phage_ids"].append(pid)
+            catalog["phage_sizes"].append(int(len(hashes)))
+            catalog["sig_sha256"].append(sig_hashes[pid])
+        seg_name = f"seg_{len(catalog['segments']):04d}"
+        _write_segment(index_dir / seg_name, hash_lists, range(base, base + len(new_ids)))
+        catalog["segments"].append(seg_name)
+
+    # Catalog is written last so a crashed append never references a partial segment.
+    tmp = index_dir / (CATALOG_NAME + ".tmp")
+    tmp.write_text(json.dumps(catalog, indent=2))
+    tmp.replace(index_dir / CATALOG_NAME)
+    return {"added": len(new_ids), "kept": len(catalog["phage_ids"]) - len(new_ids), "rebuilt": int(rebuild)}
+
+
+def catalog_sig_hashes(index_dir: str | Path) -> Dict[str, str]:
+    """{phage_id: sha256 of the signature file it was indexed from} (empty without an index)."""
+    catalog = _read_catalog(Path(index_dir))
+    if catalog is None:
+        return {}
+    return dict(zip(catalog["phage_ids"], catalog["sig_sha256"]))
+
+
+def catalog_scaled(index_dir: str | Path) -> Optional[int]:
+    """The scaled an index was built at (None without an index)."""
+    catalog = _read_catalog(Path(index_dir))
+    return None if catalog is None else catalog["scaled"]
+
+
+class SketchIndex:
+    """Read-only, memory-mapped view over an index directory."""
+
+    def __init__(self, index_dir: str | Path, ksize: Optional[int] = None, scaled: Optional[int] = None) -> None:
+        self.index_dir = Path(index_dir)
+        catalog = _read_catalog(self.index_dir)
+        if catalog is None:
+            raise ValueError(f"no sketch index at {self.index_dir}")
+        if catalog.get("format") != INDEX_FORMAT:
+            raise ValueError(f"unsupported sketch index format {catalog.get('format')} in {self.index_dir}")
+        # Reject indexes built under different sketch params instead of returning wrong containments.
+        if ksize is not None and catalog["ksize"] != ksize:
+            raise ValueError(f"stale sketch index: built with ksize={catalog['ksize']}, requested {ksize}")
+        if scaled is not None and catalog["scaled"] != scaled:
+            raise ValueError(f"stale sketch index: built with scaled={catalog['scaled']}, requested {scaled}")
+        self.ksize: int = catalog["ksize"]
+        self.scaled: int = catalog["scaled"]
+        self.phage_ids: List[str] = list(catalog["phage_ids"])
+        self.phage_sizes = np.asarray(catalog["phage_sizes"], dtype=np.int64)
+        self.position = {pid: i for i, pid in enumerate(self.phage_ids)}
+        self.segments: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for name in catalog["segments"]:
+            seg = self.index_dir / name
+            self.segments.append((
+                np.load(seg / "hashes.npy", mmap_mode="r"),
+                np.load(seg / "offsets.npy", mmap_mode="r"),
+                np.load(seg / "postings.npy", mmap_mode="r"),
+            ))
+
+    def shared_counts(self, host_hashes: np.ndarray) -> np.ndarray:
+        """Number of host hashes shared with each indexed phage (cost ~ host sketch size)."""
+        counts = np.zeros(len(self.phage_ids), dtype=np.int64)
+        for hashes, offsets, postings in self.segments:
+            if len(hashes) == 0 or len(host_hashes) == 0:
+                continue
+            pos = np.searchsorted(hashes, host_hashes)
+            in_range = pos < len(hashes)
+            pos = pos[in_range]
+            pos = pos[hashes[pos] == host_hashes[in_range]]
+            if len(pos) == 0:
+                continue
+            starts = offsets[pos]
+            lengths = offsets[pos + 1] - starts
+            total = int(lengths.sum())
+            # Flatten the selected posting ranges without a Python loop.
+            gather = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+            counts += np.bincount(postings[gather], minlength=len(self.phage_ids))
+        return counts
+
+    def max_containment(self, host_hashes: np.ndarray, host_scaled: int,
+                        phage_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        if host_scaled > self.scaled:
+            raise ValueError(f"host sketch scaled={host_scaled} is coarser than index scaled={self.scaled}")
+        host = downsample(np.asarray(host_hashes, dtype=np.uint64), self.scaled)
+        shared = self.shared_counts(host)
+        denom = np.minimum(self.phage_sizes, len(host))
+        values = np.zeros(len(self.phage_ids), dtype=np.float64)
+        np.divide(shared, denom, out=values, where=denom > 0)
+        wanted = self.phage_ids if phage_ids is None else phage_ids
+        return {pid: float(values[self.position[pid]]) for pid in wanted if pid in self.position}
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Native FracMinHash sketcher producing sourmash-compatible `.sig` files.
+
+Each genome is read once, 2-bit encoded with NumPy, and sketched for every requested ksize
+from that single encoding. Hashes are MurmurHash3 x64_128 (seed 42, first 64 bits) of the
+canonical k-mer, computed vectorized over blocks of k-mers, so the output is hash-for-hash
+identical to `sourmash sketch dna -p k=<k>,scaled=<s>` and readable by `pm.signatures`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from pm.signatures import max_hash_for_scaled
+from pm.utils import ensure_dir
+
+SEED = 42
+# k-mers hashed per vectorized block; bounds peak memory at ~chunk * (k + 32) bytes.
+CHUNK_KMERS = 1 << 20
+
+_C1 = np.uint64(0x87C37B91114253D5)
+_C2 = np.uint64(0x4CF5AD432745937F)
+_FMIX1 = np.uint64(0xFF51AFD7ED558CCD)
+_FMIX2 = np.uint64(0xC4CEB9FE1A85EC53)
+_M5 = np.uint64(5)
+_N1 = np.uint64(0x52DCE729)
+_N2 = np.uint64(0x38495AB5)
+
+# ASCII -> 2-bit code (A=0, C=1, G=2, T=3, other=4); code order equals lexicographic order.
+_CODE = np.full(256, 4, dtype=np.uint8)
+for _i, _b in enumerate(b"ACGT"):
+    _CODE[_b] = _i
+    _CODE[ord(chr(_b).lower())] = _i
+_BASE = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+
+def _rotl(x: np.ndarray, r: int) -> np.ndarray:
+    return (x << np.uint64(r)) | (x >> np.uint64(64 - r))
+
+
+def _fmix(k: np.ndarray) -> np.ndarray:
+    k = k ^ (k >> np.uint64(33))
+    k = k * _FMIX1
+    k = k ^ (k >> np.uint64(33))
+    k = k * _FMIX2
+    return k ^ (k >> np.uint64(33))
+
+
+def murmur64_words(words: List[np.ndarray], k: int) -> np.ndarray:
+    """First 64 bits of MurmurHash3_x64_128(seed=42) over k-byte keys.
+
+    `words[w]` holds little-endian bytes 8w..8w+7 of every key, zero past byte k.
+    """
+    n = len(words[0])
+    zero = np.zeros(n, dtype=np.uint64)
+    word = lambda i: words[i] if i < len(words) else zero
+    h1 = np.full(n, SEED, dtype=np.uint64)
+    h2 = np.full(n, SEED, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for b in range(k // 16):
+            k1 = word(2 * b) * _C1
+            k1 = _rotl(k1, 31) * _C2
+            h1 ^= k1
+            h1 = (_rotl(h1, 27) + h2) * _M5 + _N1
+            k2 = word(2 * b + 1) * _C2
+            k2 = _rotl(k2, 33) * _C1
+            h2 ^= k2
+            h2 = (_rotl(h2, 31) + h1) * _M5 + _N2
+        tail = k % 16
+        if tail > 8:
+            k2 = word(2 * (k // 16) + 1) * _C2
+            h2 ^= _rotl(k2, 33) * _C1
+        if tail > 0:
+            k1 = word(2 * (k // 16)) * _C1
+            h1 ^= _rotl(k1, 31) * _C2
+        length = np.uint64(k)
+        h1 ^= length
+        h2 ^= length
+        h1 = h1 + h2
+        h2 = h2 + h1
+        h1 = _fmix(h1)
+        h2 = _fmix(h2)
+        h1 = h1 + h2
+    return h1
+
+
+def _byte_words(ascii: np.ndarray) -> np.ndarray:
+    """Little-endian uint64 of the 8 bytes starting at every position (zero padded)."""
+    w = np.concatenate([ascii, np.zeros(8, dtype=np.uint8)]).astype(np.uint64)
+    for step in (1, 2, 4):
+        w = w[:-step] | (w[step:] << np.uint64(8 * step))
+    return w
+
+
+def _code_powers(codes: np.ndarray) -> Dict[int, np.ndarray]:
+    """2-bit packed windows of 1, 2, 4, ... 32 bases at every position, built by doubling."""
+    pows = {1: codes.astype(np.uint64) & np.uint64(3)}
+    m = 1
+    while m < 32:
+        prev = pows[m]
+        pows[2 * m] = (prev[:-m] << np.uint64(2 * m)) | prev[m:]
+        m *= 2
+    return pows
+
+
+def _pack(pows: Dict[int, np.ndarray], k: int, base: int, n: int) -> List[np.ndarray]:
+    """Rolling 2-bit keys of n k-windows from `base` as ceil(k/32) big-endian words (lexicographic order)."""
+    words = []
+    for offset in range(0, k, 32):
+        length = min(32, k - offset)
+        pos = base + offset
+        word = None
+        for m in (32, 16, 8, 4, 2, 1):
+            if length & m:
+                part = pows[m][pos:pos + n]
+                word = part if word is None else (word << np.uint64(2 * m)) | part
+                pos += m
+        words.append(word)
+    return words
+
+
+def _rc_smaller(fwd: List[np.ndarray], rc: List[np.ndarray]) -> np.ndarray:
+    smaller = np.zeros(len(fwd[0]), dtype=bool)
+    equal = np.ones(len(fwd[0]), dtype=bool)
+    for f, r in zip(fwd, rc):
+        smaller |= equal & (r < f)
+        equal &= r == f
+    return smaller
+
+
+def _hash_segment(codes: np.ndarray, ksizes: Sequence[int], chunk: int, max_hash: int) -> Dict[int, np.ndarray]:
+    """Hash the first `chunk` k-mers of a segment for every ksize, sharing one encoding."""
+    size = len(codes)
+    # k-mers containing a non-ACGT base are skipped (sourmash sketch default behaviour).
+    bad = np.concatenate(([0], np.cumsum(codes == 4, dtype=np.int64)))
+    rc_codes = np.where(codes < 4, 3 - codes, 4).astype(np.uint8)[::-1]
+    fwd_pows = _code_powers(codes)
+    rc_pows = _code_powers(rc_codes)
+    fwd_bytes = _byte_words(_BASE[np.minimum(codes, 3)])
+    rc_bytes = _byte_words(_BASE[np.minimum(rc_codes, 3)])
+
+    out: Dict[int, np.ndarray] = {}
+    for k in ksizes:
+        n = min(chunk, size - k + 1)
+        if n <= 0:
+            continue
+        keep = (bad[k:k + n] - bad[:n]) == 0
+        if not keep.any():
+            continue
+        # The RC of the k-mer at i starts at size-k-i in rc_codes: read windows from
+        # rc_base = size-k-n+1 onwards and reverse them into forward order.
+        rc_base = size - k - n + 1
+        fwd_keys = _pack(fwd_pows, k, 0, n)
+        rc_keys = [w[::-1] for w in _pack(rc_pows, k, rc_base, n)]
+        use_rc = _rc_smaller(fwd_keys, rc_keys)[keep]
+        words = []
+        for w in range(-(-k // 8)):
+            f = fwd_bytes[8 * w:8 * w + n]
+            r = rc_bytes[rc_base + 8 * w:rc_base + 8 * w + n][::-1]
+            word = np.where(use_rc, r[keep], f[keep])
+            if 8 * (w + 1) > k:
+                word &= np.uint64((1 << (8 * (k - 8 * w))) - 1)
+            words.append(word)
+        hashes = murmur64_words(words, k)
+        out[k] = hashes[hashes <= np.uint64(max_hash)]
+    return out
+
+
+def hash_record(codes: np.ndarray, ksizes: Sequence[int], max_hash: int) -> Dict[int, np.ndarray]:
+    """Sorted unique FracMinHash hashes (<= max_hash) of one 2-bit encoded record, per ksize."""
+    parts: Dict[int, List[np.ndarray]] = {k: [] for k in ksizes}
+    kmax = max(ksizes)
+    n_total = len(codes) - min(ksizes) + 1
+    # Overlapping segments bound temporaries to ~CHUNK_KMERS words per array.
+    for start in range(0, max(n_total, 0), CHUNK_KMERS):
+        seg = codes[start:start + CHUNK_KMERS + kmax - 1]
+        for k, hashes in _hash_segment(seg, ksizes, CHUNK_KMERS, max_hash).items():
+            parts[k].append(hashes)
+    return {
+        k: (np.unique(np.concatenate(v)) if v else np.zeros(0, dtype=np.uint64))
+        for k, v in parts.items()
+    }
+
+
+def read_fasta_codes(path: str | Path) -> Iterator[np.ndarray]:
+    """Yield the 2-bit code array of each FASTA record (one read of the file)."""
+    chunks: List[bytes] = []
+    with Path(path).open("rb") as f:
+        for line in f:
+            if line.startswith(b">"):
+                if chunks:
+                    yield _CODE[np.frombuffer(b"".join(chunks), dtype=np.uint8)]
+                chunks = []
+                continue
+            chunks.append(line.strip())
+    if chunks:
+        yield _CODE[np.frombuffer(b"".join(chunks), dtype=np.uint8)]
+
+
+def _md5sum(ksize: int, mins: np.ndarray) -> str:
+    h = hashlib.md5()
+    h.update(str(ksize).encode())
+    for x in mins.tolist():
+        h.update(str(x).encode())
+    return h.hexdigest()
+
+
+def sketch_file(fasta: str | Path, ksizes: Sequence[int], scaled: int) -> Dict[int, np.ndarray]:
+    """Sketch one genome for all `ksizes` from a single pass over the file."""
+    max_hash = max_hash_for_scaled(scaled)
+    per_k: Dict[int, List[np.ndarray]] = {k: [] for k in ksizes}
+    for codes in read_fasta_codes(fasta):
+        for k, hashes in hash_record(codes, ksizes, max_hash).items():
+            per_k[k].append(hashes)
+    return {
+        k: (np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.uint64))
+        for k, parts in per_k.items()
+    }
+
+
+def signature_json(fasta: str | Path, sketches: Dict[int, np.ndarray], scaled: int) -> List[Dict]:
+    max_hash = max_hash_for_scaled(scaled)
+    sigs = []
+    for k in sorted(sketches):
+        mins = sketches[k]
+        sigs.append({
+            "class": "sourmash_signature",
+            "email": "",
+            "hash_function": "0.murmur64",
+            "filename": Path(fasta).name,
+            "license": "CC0",
+            "signatures": [{
+                "num": 0,
+                "ksize": int(k),
+                "seed": SEED,
+                "max_hash": max_hash,
+                "mins": mins.tolist(),
+                "md5sum": _md5sum(k, mins),
+                "molecule": "DNA",
+            }],
+            "version": 0.4,
+        })
+    return sigs
+
+
+def write_signature(fasta: str | Path, out: str | Path, ksizes: Sequence[int], scaled: int) -> Path:
+    out = Path(out)
+    ensure_dir(out.parent)
+    sketches = sketch_file(fasta, ksizes, scaled)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    tmp.write_text(json.dumps(signature_json(fasta, sketches, scaled)))
+    tmp.replace(out)
+    return out
+
+
+def _sketch_job(job: Tuple[str, str, Tuple[int, ...], int]) -> str:
+    fasta, out, ksizes, scaled = job
+    return str(write_signature(fasta, out, ksizes, scaled))
+
+
+def sketch_many(jobs: Iterable[Tuple[str | Path, str | Path]], ksizes: Sequence[int], scaled: int,
+                workers: int = 1) -> List[str]:
+    """Sketch (fasta, out_sig) pairs across a process pool."""
+    payload = [(str(f), str(o), tuple(ksizes), scaled) for f, o in jobs]
+    if workers <= 1 or len(payload) <= 1:
+        return [_sketch_job(j) for j in payload]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_sketch_job, payload, chunksize=max(1, len(payload) // (workers * 4))))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of predicted protein structures, shared across hosts and runs.
+
+Structures are keyed by the SHA-256 of the normalized amino-acid sequence, so an identical
+protein (a conserved porin in every isolate of a species, a repeated phage gene) is predicted
+once. Layout:
+
+    <root>/objects/<key[:2]>/<key>.pdb   one structure per unique sequence
+    <root>/stats.json                    cumulative hit/miss counters
+
+Object mtimes double as the LRU clock: every hit touches the object, and `evict` removes the
+least recently used objects until the cache fits its byte budget.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pm.utils import ensure_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows (run_demo.ps1)
+    fcntl = None
+    import msvcrt
+
+STRUCTURE_SUFFIX = ".pdb"
+
+
+def normalize_sequence(seq: str) -> str:
+    """Uppercase, whitespace-free sequence without a trailing stop ('*')."""
+    return "".join(seq.split()).upper().rstrip("*")
+
+
+def sequence_key(seq: str) -> str:
+    return hashlib.sha256(normalize_sequence(seq).encode("ascii")).hexdigest()
+
+
+def read_fasta(path: str | Path) -> Iterator[Tuple[str, str]]:
+    """Yield (record id, sequence); the id is the first header token, as written by Prokka."""
+    name, chunks = None, []
+    with Path(path).open() as f:
+        for line in f:
+            if line.startswith(">"):
+                if name is not None:
+                    yield name, "".join(chunks)
+                name, chunks = (line[1:].split() or [""])[0], []
+            else:
+                chunks.append(line.strip())
+    if name is not None:
+        yield name, "".join(chunks)
+
+
+def link_or_copy(src: Path, dest: Path) -> str:
+    """Place `src` at `dest` as a hardlink, else a symlink, else a copy; returns the method used."""
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        os.symlink(src.resolve(), dest)
+        return "symlink"
+    except OSError:
+        shutil.copyfile(src, dest)
+        return "copy"
+
+
+@contextmanager
+def exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `path` (flock on POSIX, a one-byte msvcrt lock on Windows)."""
+    with path.open("w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+            return
+        # LK_LOCK retries for ~10 s, then raises OSError.
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class StructureCache:
+    def __init__(self, root: str | Path, max_bytes: Optional[int] = None) -> None:
+        self.root = ensure_dir(root)
+        self.objects = ensure_dir(self.root / "objects")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key: str) -> Path:
+        return self.objects / key[:2] / f"{key}{STRUCTURE_SUFFIX}"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        p = self.path_for(key)
+        if p.exists():
+            os.utime(p)
+            return p
+        return None
+
+    def partition(self, keys: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Split unique keys into (cached, missing) and count them towards the hit rate."""
+        cached, missing = [], []
+        for key in dict.fromkeys(keys):
+            (cached if self.lookup(key) is not None else missing).append(key)
+        self.hits += len(cached)
+        self.misses += len(missing)
+        return cached, missing
+
+    def put(self, key: str, structure: str | Path) -> Path:
+        dest = self.path_for(key)
+        ensure_dir(dest.parent)
+        # Copy then rename, so concurrent readers never see a partial structure.
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        shutil.copyfile(structure, tmp)
+        tmp.replace(dest)
+        return dest
+
+    def materialize(self, entries: Dict[str, str], dest_dir: str | Path) -> Dict[str, int]:
+        """Assemble `dest_dir/<name>.pdb` for each {name: key} from cached objects."""
+        dest_dir = ensure_dir(dest_dir)
+        methods: Dict[str, int] = {}
+        for name, key in entries.items():
+            src = self.path_for(key)
+            if not src.exists():
+                methods["missing"] = methods.get("missing", 0) + 1
+                continue
+            method = link_or_copy(src, dest_dir / f"{name}{STRUCTURE_SUFFIX}")
+            methods[method] = methods.get(method, 0) + 1
+        return methods
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.objects.glob(f"*/*{STRUCTURE_SUFFIX}"))
+
+    def evict(self, max_bytes: Optional[int] = None, keep: Iterable[str] = ()) -> int:
+        """Drop least recently used objects until the cache fits `max_bytes`; returns objects removed.
+
+        Keys in `keep` (the structures of the current run) are never evicted. Hardlinked run
+        directories keep their files after eviction; symlinked ones would dangle.
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        if budget is None:
+            return 0
+        keep = set(keep)
+        entries = []
+        total = 0
+        for p in self.objects.glob(f"*/*{STRUCTURE_SUFFIX}"):
+            st = p.stat()
+            total += st.st_size
+            if p.stem not in keep:
+                entries.append((st.st_mtime, st.st_size, p))
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= budget:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def hit_rate(self) -> Optional[float]:
+        n = self.hits + self.misses
+        return self.hits / n if n else None
+
+    def record_stats(self, evicted: int = 0) -> Dict[str, object]:
+        """Add this session's counters to `<root>/stats.json` and return both views."""
+        session = {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate(), "evicted": evicted}
+        with exclusive_lock(self.root / "stats.lock"):
+            path = self.root / "stats.json"
+            total = json.loads(path.read_text()) if path.exists() else {"hits": 0, "misses": 0, "evicted": 0}
+            for k in ("hits", "misses", "evicted"):
+                total[k] = int(total.get(k, 0)) + session[k]
+            n = total["hits"] + total["misses"]
+            total["hit_rate"] = total["hits"] / n if n else None
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(total, indent=2))
+            tmp.replace(path)
+        return {"session": session, "cumulative": total}
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Per-rule performance telemetry from Snakemake `benchmark:` files.
+
+Every rule of the workflow writes a benchmark TSV (wall `s`, `cpu_time`, `max_rss`, `io_in`,
+`io_out`, ... as recorded by Snakemake) to a path that encodes the rule and its wildcards:
+
+    <benchmark_dir>/<rule>/host_id=H001/phage_id=P001.tsv
+    <benchmark_dir>/<rule>/all.tsv                          (rules without wildcards)
+
+`collect` reads back the files a run wrote (mtime at or after its start; files of rules that were
+up to date are left from earlier runs) into job records, which `run_report` aggregates into
+per-module and per-host tables, the hottest rules and a per-rule timeline. Throughput counts the
+work units of the jobs collected (see `default_rule_units`), not the whole library, so a
+partial or incremental run is credited only with the pairs it computed. `run:` rules execute
+inside the Snakemake process, whose CPU, RSS and I/O their benchmarks record, so only their wall
+time is kept. Performance stays in the run report: evidence bundles carry no run-dependent
+timings. The timeline places every job by its file's mtime (the job ended then and started `s`
+seconds earlier); it shows when each rule ran and how busy the run was, not which jobs waited on
+which (benchmarks carry no DAG edges).
+
+Dependency-free (the Snakefile imports `benchmark_path`).
+"""
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+ALL_KEY = "all"
+# Snakemake benchmark columns -> record fields (seconds and MB, as Snakemake reports them).
+COLUMNS = {"s": "wall_s", "cpu_time": "cpu_s", "max_rss": "max_rss_mb", "io_in": "io_in_mb", "io_out": "io_out_mb"}
+# Rule-name prefixes per module; the first match wins.
+MODULE_PREFIXES = (
+    ("sourmash_", "similarity"),
+    ("similarity_", "similarity"),
+    ("prokka_", "safety"),
+    ("abricate_", "safety"),
+    ("safety_", "safety"),
+    ("foldseek_", "structural"),
+    ("structural_", "structural"),
+    ("decision_bundle", "decision"),
+)
+# Work units counted for throughput: host×phage pairs, or phages for the host-independent module.
+PAIR_MODULES = ("similarity", "structural", "decision")
+PHAGE_MODULES = ("safety",)
+
+
+def default_rule_units(n_phages: int) -> Dict[str, int]:
+    """Units one job of each feature-producing rule covers (host-wide rules: the whole library).
+
+    Other rules (sketches, searches, meta files) take time but produce no units of their own. The
+    workflow adds its chunked and batched rules, whose sizes depend on its configuration.
+    """
+    return {
+        "similarity_feature_batch": n_phages,
+        "structural_features": n_phages,
+        "decision_bundle": n_phages,
+        "safety_feature": 1,
+        "safety_feature_batch": n_phages,
+    }
+
+
+def benchmark_path(benchmark_dir: str | Path, rule: str, wildcards: Sequence[str] = ()) -> str:
+    """Snakemake `benchmark:` pattern for a rule, e.g. `<dir>/similarity_meta/host_id={host_id}.tsv`."""
+    parts = [f"{w}={{{w}}}" for w in wildcards] or [ALL_KEY]
+    return str(Path(benchmark_dir) / rule / "/".join(parts)) + ".tsv"
+
+
+def module_of(rule: str) -> str:
+    for prefix, module in MODULE_PREFIXES:
+        if rule.startswith(prefix):
+            return module
+    return "other"
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_benchmark(path: str | Path) -> Optional[Dict[str, Optional[float]]]:
+    """Mean of the rows of one benchmark TSV (one row per `repeat`); None when empty or unreadable."""
+    try:
+        with Path(path).open(newline="") as f:
+            rows = list(csv.DictReader(f, delimiter="\t"))
+    except OSError:
+        return None
+    if not rows:
+        return None
+    out: Dict[str, Optional[float]] = {}
+    for column, field in COLUMNS.items():
+        values = [v for v in (_number(r.get(column)) for r in rows) if v is not None]
+        out[field] = sum(values) / len(values) if values else None
+    return out
+
+
+def collect(benchmark_dir: str | Path, since: Optional[float] = None,
+            inline_rules: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """One record per benchmark file: rule, module, wildcards, host_id, timings and start/end.
+
+    `since` (epoch seconds) skips files last written before it; `inline_rules` are `run:` rules,
+    whose CPU, RSS and I/O figures are the scheduler's and are dropped.
+    """
+    root = Path(benchmark_dir)
+    inline = set(inline_rules)
+    records = []
+    if not root.is_dir():
+        return records
+    for path in sorted(root.rglob("*.tsv")):
+        rel = path.relative_to(root).with_suffix("").parts
+        if len(rel) < 2:
+            continue
+        end = path.stat().st_mtime
+        if since is not None and end < since:
+            continue
+        stats = read_benchmark(path)
+        if stats is None or stats["wall_s"] is None:
+            continue
+        if rel[0] in inline:
+            stats = {field: (value if field == "wall_s" else None) for field, value in stats.items()}
+        wildcards = dict(p.split("=", 1) for p in rel[1:] if "=" in p)
+        records.append({
+            "rule": rel[0],
+            "module": module_of(rel[0]),
+            "wildcards": wildcards,
+            "host_id": wildcards.get("host_id"),
+            **stats,
+            "start": end - stats["wall_s"],
+            "end": end,
+        })
+    return records
+
+
+def _stats(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    records = list(records)
+
+    def total(field: str) -> Optional[float]:
+        values = [r[field] for r in records if r[field] is not None]
+        return round(sum(values), 3) if values else None
+
+    rss = [r["max_rss_mb"] for r in records if r["max_rss_mb"] is not None]
+    return {
+        "jobs": len(records),
+        "wall_s": total("wall_s") or 0.0,
+        "cpu_s": total("cpu_s"),
+        "max_rss_mb": round(max(rss), 1) if rss else None,
+        "io_in_mb": total("io_in_mb"),
+        "io_out_mb": total("io_out_mb"),
+    }
+
+
+def _units(module: str, records: Iterable[Dict[str, Any]], rule_units: Mapping[str, int]) -> Optional[int]:
+    """Units computed by the module's collected jobs."""
+    if module not in PAIR_MODULES and module not in PHAGE_MODULES:
+        return None
+    return sum(rule_units.get(r["rule"], 0) for r in records)
+
+
+def _throughput(stats: Dict[str, Any], units: Optional[int]) -> Optional[float]:
+    if not units or not stats["wall_s"]:
+        return None
+    return round(units / stats["wall_s"], 2)
+
+
+def timeline(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """When each rule ran, in seconds from the first job's start, and the time any job was running."""
+    if not records:
+        return {"span_s": 0.0, "busy_s": 0.0, "rules": []}
+    t0 = min(r["start"] for r in records)
+    busy, reach = 0.0, t0
+    for r in sorted(records, key=lambda r: r["start"]):
+        # Union of the job intervals: only the part past the furthest end so far is new.
+        if r["end"] > reach:
+            busy += r["end"] - max(r["start"], reach)
+            reach = r["end"]
+    rules = []
+    for rule in {r["rule"] for r in records}:
+        mine = [r for r in records if r["rule"] == rule]
+        rules.append({
+            "rule": rule,
+            "jobs": len(mine),
+            "first_start_s": round(min(r["start"] for r in mine) - t0, 3),
+            "last_end_s": round(max(r["end"] for r in mine) - t0, 3),
+            "wall_s": round(sum(r["wall_s"] for r in mine), 3),
+        })
+    rules.sort(key=lambda r: (r["first_start_s"], r["rule"]))
+    return {
+        "span_s": round(max(r["end"] for r in records) - t0, 3),
+        "busy_s": round(busy, 3),
+        "rules": rules,
+    }
+
+
+def run_report(records: List[Dict[str, Any]], n_hosts: int, n_phages: int, top_n: int = 10,
+               rule_units: Optional[Mapping[str, int]] = None) -> Dict[str, Any]:
+    """Per-module and per-host tables, hottest rules and the timeline of one run's benchmarks.
+
+    `rule_units` maps rules to the units one job covers (default: `default_rule_units`).
+    """
+    rule_units = default_rule_units(n_phages) if rule_units is None else rule_units
+    modules: Dict[str, Dict[str, Any]] = {}
+    for module in sorted({r["module"] for r in records}):
+        mine = [r for r in records if r["module"] == module]
+        stats = _stats(mine)
+        units = _units(module, mine, rule_units)
+        modules[module] = {**stats, "units": units, "units_per_s": _throughput(stats, units)}
+
+    hosts: Dict[str, Dict[str, Any]] = {}
+    for host_id in sorted({r["host_id"] for r in records if r["host_id"]}):
+        mine = [r for r in records if r["host_id"] == host_id]
+        hosts[host_id] = {
+            **_stats(mine),
+            "modules": {m: round(sum(r["wall_s"] for r in mine if r["module"] == m), 3)
+                        for m in sorted({r["module"] for r in mine})},
+        }
+
+    rules = []
+    for rule in {r["rule"] for r in records}:
+        stats = _stats(r for r in records if r["rule"] == rule)
+        rules.append({"rule": rule, "module": module_of(rule), **stats})
+    rules.sort(key=lambda r: (-r["wall_s"], r["rule"]))
+
+    return {
+        "hosts": n_hosts,
+        "phages": n_phages,
+        "totals": _stats(records),
+        "modules": modules,
+        "per_host": hosts,
+        "shared": _stats(r for r in records if not r["host_id"]),
+        "hottest_rules": rules[:top_n],
+        "timeline": timeline(records),
+    }
@@ -6,14 +6,8 @@ import hashlib
 from pathlib import Path
 from typing import Dict, List, Any
 
-
-def sha256_file(path: str | Path) -> str:
-    p = Path(path)
-    h = hashlib.sha256()
-    with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+# Provenance hashes are memoized on (path, size, mtime_ns, inode); see pm.hash_cache.
+from pm.hash_cache import sha256_file, sha256_files
 
 
 def read_tsv(path: str | Path) -> List[Dict[str, str]]:
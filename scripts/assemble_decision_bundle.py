@@ -16,13 +16,20 @@ import argparse
 import csv
 import json
 import math
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import yaml
 
-from pm.utils import sha256_file, read_tsv, ensure_dir
+from pm import profiling, scoring
+from pm.feature_store import FeatureStore, open_store
+from pm.foldseek_tiers import resolve_tier
+from pm.manifest import load_hosts, load_phages
+from pm.rank_state import RankState, build_state, feature_sources, state_path, update_state
+from pm.scoring import load_json
+from pm.utils import sha256_file, ensure_dir
 
 
 def clamp01(x: float) -> float:
@@ -90,13 +97,12 @@ def next_action(flags: List[str]) -> str:
     return "Run plaque assay; if positive, measure EOP and optimize growth conditions."
 
 
-def load_json(path: Path) -> Optional[Dict[str, Any]]:
-    if not path.exists():
-        return None
-    try:
-        return json.loads(path.read_text())
-    except Exception:
-        return None
+def pair_feature(store: Optional[FeatureStore], base_dir: Optional[Path], host_id: str,
+                 phage_id: str) -> Optional[Dict[str, Any]]:
+    """A host×phage feature document from the host's feature store when present, else its JSON file."""
+    if store is not None:
+        return store.payload(phage_id)
+    return load_json(base_dir / host_id / f"{phage_id}.json") if base_dir else None
 
 
 def module_status(enabled: bool, test_mode: bool, feature_examples: List[Optional[Dict[str, Any]]], default_tool: str) -> Dict[str, Any]:
@@ -116,48 +122,59 @@ def module_status(enabled: bool, test_mode: bool, feature_examples: List[Optiona
     return {"status": "unknown", "tool": default_tool, "tool_version": None, "reason": None}
 
 
-def main() -> None:
-    p = argparse.ArgumentParser(description="Assemble Decision Bundle outputs (ranking.csv + evidence_bundle.json) for one host.")
-    p.add_argument("--host-id", required=True)
-    p.add_argument("--config", required=True)
-    p.add_argument("--phage-manifest", required=True)
-    p.add_argument("--host-manifest", required=True)
-    p.add_argument("--similarity-dir", required=False, default=None)
-    p.add_argument("--structural-dir", required=False, default=None)
-    p.add_argument("--safety-dir", required=False, default=None)
-    p.add_argument("--out-ranking", required=True)
-    p.add_argument("--out-evidence", required=True)
-    p.add_argument("--pipeline-version", default="0.1.0")
-    args = p.parse_args()
-
-    cfg_path = Path(args.config)
-    cfg = yaml.safe_load(cfg_path.read_text())
-
-    modules_cfg = cfg.get("modules", {})
-    test_mode = bool(modules_cfg.get("test_mode", False))
-    enable_similarity = bool(modules_cfg.get("enable_sourmash", False))
-    enable_structural = bool(modules_cfg.get("enable_structural_ppi", False))
-    enable_safety = bool(modules_cfg.get("enable_safety", False))
-
-    profile = cfg.get("profile", "custom")
+def shortlist_entry(host_id: str, phage_id: str, rank: int, confidence: float, reason: str, flags: List[str],
+                    sim: Optional[Dict[str, Any]], struct: Optional[Dict[str, Any]],
+                    safety: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "host_id": host_id,
+        "phage_id": phage_id,
+        "rank": rank,
+        "confidence_score": round(float(confidence), 4),
+        "primary_reason": reason,
+        "safety_flags": flags,
+        "evidence": {
+            # Flatten evidence into small UI-friendly objects if present
+            "similarity": (sim and {
+                "metric": sim.get("metric"),
+                "value": sim.get("value"),
+                "status": sim.get("status"),
+                "tool": sim.get("tool"),
+            }) or None,
+            "structural": (struct and {
+                "hit_count": struct.get("hit_count"),
+                "best_evalue": struct.get("best_evalue"),
+                "best_bitscore": struct.get("best_bitscore"),
+                "qcov_mean": struct.get("qcov_mean"),
+                "tcov_mean": struct.get("tcov_mean"),
+                "status": struct.get("status"),
+                "tool": struct.get("tool"),
+            }) or None,
+            "safety": (safety and {
+                "vfdb_hits": safety.get("vfdb_hits"),
+                "integrase_like": safety.get("integrase_like"),
+                "tRNA_count": safety.get("tRNA_count"),
+                "flags": safety.get("flags") or [],
+                "status": safety.get("status"),
+                "tool": safety.get("tool"),
+            }) or None,
+        },
+        "next_best_action": next_action(flags),
+    }
 
-    phage_rows = read_tsv(args.phage_manifest)
-    phage_ids = [r["phage_id"] for r in phage_rows]
 
-    # Optional: ensure host exists in host manifest
-    host_rows = read_tsv(args.host_manifest)
-    if not any(r.get("host_id") == args.host_id for r in host_rows):
-        raise SystemExit(f"host_id {args.host_id} not found in {args.host_manifest}")
+Ranked = List[Tuple[str, float, str, List[str]]]
 
-    sim_dir = Path(args.similarity_dir) if args.similarity_dir else None
-    struct_dir = Path(args.structural_dir) if args.structural_dir else None
-    safety_dir = Path(args.safety_dir) if args.safety_dir else None
 
+def rank_scalar(host_id: str, phage_ids: List[str], sim_dir: Optional[Path], struct_dir: Optional[Path],
+                safety_dir: Optional[Path], top_n: int, sim_store: Optional[FeatureStore] = None,
+                struct_store: Optional[FeatureStore] = None) -> Tuple[Ranked, List[Dict[str, Any]]]:
+    """Reference path: score each phage with the scalar functions, keeping every evidence dict."""
     candidates: List[Dict[str, Any]] = []
+    profiling.count("phages_scored", len(phage_ids))
 
     for pid in phage_ids:
-        sim = load_json(sim_dir / args.host_id / f"{pid}.json") if sim_dir else None
-        struct = load_json(struct_dir / args.host_id / f"{pid}.json") if struct_dir else None
+        sim = pair_feature(sim_store, sim_dir, host_id, pid)
+        struct = pair_feature(struct_store, struct_dir, host_id, pid)
         safety = load_json(safety_dir / f"{pid}.json") if safety_dir else None
 
         sim_score = similarity_to_score(sim)
@@ -171,7 +188,6 @@ def main() -> None:
         reason = pick_primary_reason(struct_score, sim_score, flags)
 
         candidates.append({
-            "host_id": args.host_id,
             "phage_id": pid,
             "confidence_score": confidence,
             "primary_reason": reason,
@@ -185,98 +201,310 @@ def main() -> None:
 
     # Rank
     candidates.sort(key=lambda r: (-r["confidence_score"], r["phage_id"]))
-    for i, c in enumerate(candidates, start=1):
-        c["rank"] = i
-        c["next_best_action"] = next_action(c["safety_flags"])
-
-    # Write ranking.csv (all candidates)
-    out_rank = Path(args.out_ranking)
-    ensure_dir(out_rank.parent)
-    with out_rank.open("w", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["host_id","phage_id","rank","confidence_score","primary_reason","safety_flags"])
-        for c in candidates:
-            flags = c["safety_flags"]
-            flags_str = "none" if not flags else ";".join(flags)
-            w.writerow([c["host_id"], c["phage_id"], c["rank"], f"{c['confidence_score']:.4f}", c["primary_reason"], flags_str])
+    ranked = [(c["phage_id"], c["confidence_score"], c["primary_reason"], c["safety_flags"]) for c in candidates]
+    shortlist = [shortlist_entry(host_id, c["phage_id"], i, c["confidence_score"], c["primary_reason"],
+                                 c["safety_flags"], c["evidence"]["similarity"], c["evidence"]["structural"],
+                                 c["evidence"]["safety"])
+                 for i, c in enumerate(candidates[:top_n], start=1)]
+    return ranked, shortlist
+
+
+def rank_columns(host_id: str, cols: scoring.FeatureColumns, top_n: int,
+                 evidence: Callable[[str], Tuple[Optional[Dict[str, Any]], ...]]) -> Tuple[Ranked, List[Dict[str, Any]]]:
+    """Score loaded columns; `evidence(phage_id)` returns the (similarity, structural, safety)
+    documents of a shortlisted phage."""
+    phage_ids = cols.phage_ids.tolist()
+    with profiling.span("score"):
+        scores = scoring.score(cols)
+    confidence, reasons = scores["confidence"], scores["reason"]
+    profiling.count("phages_scored", len(phage_ids))
 
-    # Evidence bundle
-    top_n = int((cfg.get("params", {}) or {}).get("top_n", 10))
     shortlist = []
-    for c in candidates[:top_n]:
-        shortlist.append({
-            "host_id": c["host_id"],
-            "phage_id": c["phage_id"],
-            "rank": c["rank"],
-            "confidence_score": round(float(c["confidence_score"]), 4),
-            "primary_reason": c["primary_reason"],
-            "safety_flags": c["safety_flags"],
-            "evidence": {
-                # Flatten evidence into small UI-friendly objects if present
-                "similarity": (c["evidence"]["similarity"] and {
-                    "metric": c["evidence"]["similarity"].get("metric"),
-                    "value": c["evidence"]["similarity"].get("value"),
-                    "status": c["evidence"]["similarity"].get("status"),
-                    "tool": c["evidence"]["similarity"].get("tool"),
-                }) or None,
-                "structural": (c["evidence"]["structural"] and {
-                    "hit_count": c["evidence"]["structural"].get("hit_count"),
-                    "best_evalue": c["evidence"]["structural"].get("best_evalue"),
-                    "best_bitscore": c["evidence"]["structural"].get("best_bitscore"),
-                    "qcov_mean": c["evidence"]["structural"].get("qcov_mean"),
-                    "tcov_mean": c["evidence"]["structural"].get("tcov_mean"),
-                    "status": c["evidence"]["structural"].get("status"),
-                    "tool": c["evidence"]["structural"].get("tool"),
-                }) or None,
-                "safety": (c["evidence"]["safety"] and {
-                    "vfdb_hits": c["evidence"]["safety"].get("vfdb_hits"),
-                    "integrase_like": c["evidence"]["safety"].get("integrase_like"),
-                    "tRNA_count": c["evidence"]["safety"].get("tRNA_count"),
-                    "flags": c["evidence"]["safety"].get("flags") or [],
-                    "status": c["evidence"]["safety"].get("status"),
-                    "tool": c["evidence"]["safety"].get("tool"),
-                }) or None,
-            },
-            "next_best_action": c["next_best_action"],
-        })
+    with profiling.span("shortlist"):
+        for rank, i in enumerate(scoring.top_n_indices(confidence, cols.phage_ids, top_n), start=1):
+            pid = phage_ids[i]
+            shortlist.append(shortlist_entry(
+                host_id, pid, rank, float(confidence[i]), str(reasons[i]), cols.flags[i], *evidence(pid)))
+    # ranking.csv lists every phage, so it still needs the full order (one lexsort over the columns).
+    with profiling.span("rank_order"):
+        ranked = [(phage_ids[i], float(confidence[i]), str(reasons[i]), cols.flags[i])
+                  for i in scoring.rank_order(confidence, cols.phage_ids)]
+    return ranked, shortlist
+
+
+def rank_vectorized(host_id: str, phage_ids: List[str], sim_dir: Optional[Path], struct_dir: Optional[Path],
+                    safety_dir: Optional[Path], top_n: int,
+                    safety_columns: Optional[scoring.FeatureColumns] = None, sim_store: Optional[FeatureStore] = None,
+                    struct_store: Optional[FeatureStore] = None) -> Tuple[Ranked, List[Dict[str, Any]]]:
+    """Column-array scoring (pm.scoring); evidence is re-read only for the shortlisted phages."""
+    with profiling.span("load_feature_columns"):
+        cols = scoring.load_feature_columns(host_id, phage_ids, sim_dir, struct_dir, safety_dir, safety_columns,
+                                            sim_store, struct_store)
+    return rank_columns(host_id, cols, top_n, lambda pid: (
+        pair_feature(sim_store, sim_dir, host_id, pid),
+        pair_feature(struct_store, struct_dir, host_id, pid),
+        load_json(safety_dir / f"{pid}.json") if safety_dir else None,
+    ))
+
+
+def rank_incremental(host_id: str, phage_ids: List[str], sim_dir: Optional[Path], struct_dir: Optional[Path],
+                     safety_dir: Optional[Path], top_n: int, safety_columns: Optional[scoring.FeatureColumns],
+                     state_dir: Path, changed: Optional[List[str]] = None, sim_store: Optional[FeatureStore] = None,
+                     struct_store: Optional[FeatureStore] = None) -> Tuple[Ranked, List[Dict[str, Any]], int]:
+    """Vectorized scoring against the host's saved state (pm.rank_state): only phages whose
+    features changed are rescored and merged into the ordered ranking. Returns the rows rescored too."""
+    path = state_path(state_dir, host_id)
+    sources = feature_sources(sim_dir, struct_dir, safety_columns is not None, sim_store, struct_store)
+    with profiling.span("load_state"):
+        state = RankState.load(path, host_id, sources)
+    with profiling.span("update_state"):
+        if state is None:
+            state = build_state(host_id, phage_ids, sim_dir, struct_dir, safety_columns, sim_store, struct_store)
+            rescored = len(phage_ids)
+        else:
+            state, rescored = update_state(state, phage_ids, sim_dir, struct_dir, safety_columns, sim_store,
+                                           struct_store, changed)
+    profiling.count("phages_scored", rescored)
+    with profiling.span("save_state"):
+        state.save(path)
 
-    run_id = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
-    pipeline_version = args.pipeline_version + ("-mock" if test_mode else "")
+    shortlist = []
+    for i in range(min(top_n, len(state))):
+        pid = str(state["phage_ids"][i])
+        shortlist.append(shortlist_entry(
+            host_id, pid, i + 1, float(state["confidence"][i]), str(state["reason"][i]), state.flags(i),
+            pair_feature(sim_store, sim_dir, host_id, pid),
+            pair_feature(struct_store, struct_dir, host_id, pid),
+            load_json(safety_dir / f"{pid}.json") if safety_dir else None,
+        ))
+    return state.ranked(), shortlist, rescored
+
+
+@profiling.timed()
+def load_shared(args: argparse.Namespace) -> Dict[str, Any]:
+    """Inputs identical for every host: config, manifests, their hashes and (vectorized) safety columns."""
+    cfg_path = Path(args.config)
+    cfg = yaml.safe_load(cfg_path.read_text())
+
+    modules_cfg = cfg.get("modules", {})
+    phage_ids = load_phages(args.phage_manifest).ids
+    host_ids = load_hosts(args.host_manifest).ids
+    safety_dir = Path(args.safety_dir) if args.safety_dir else None
+
+    params = dict(cfg.get("params", {}) or {})
+    if args.foldseek_tier:
+        # Record the effective tier (profiles may select it) together with its resolved settings.
+        params["foldseek_tier"] = args.foldseek_tier
+        params["foldseek_tier_settings"] = resolve_tier(cfg, args.foldseek_tier)
 
-    config_sha = sha256_file(cfg_path)
-    manifest_hashes = {
-        Path(args.phage_manifest).name: sha256_file(args.phage_manifest),
-        Path(args.host_manifest).name: sha256_file(args.host_manifest),
+    test_mode = bool(modules_cfg.get("test_mode", False))
+    return {
+        "cfg": cfg,
+        "test_mode": test_mode,
+        "enable_similarity": bool(modules_cfg.get("enable_sourmash", False)),
+        "enable_structural": bool(modules_cfg.get("enable_structural_ppi", False)),
+        "enable_safety": bool(modules_cfg.get("enable_safety", False)),
+        "profile": cfg.get("profile", "custom"),
+        "phage_ids": phage_ids,
+        "host_ids": host_ids,
+        "sim_dir": Path(args.similarity_dir) if args.similarity_dir else None,
+        "struct_dir": Path(args.structural_dir) if args.structural_dir else None,
+        "feature_store": Path(args.feature_store) if args.feature_store else None,
+        "safety_dir": safety_dir,
+        "top_n": int((cfg.get("params", {}) or {}).get("top_n", 10)),
+        "scoring": args.scoring,
+        "state_dir": Path(args.state_dir) if args.state_dir else None,
+        "changed_phages": ([x.strip() for x in args.changed_phages.split(",") if x.strip()]
+                           if args.changed_phages else None),
+        "pipeline_version": args.pipeline_version + ("-mock" if test_mode else ""),
+        "config_sha": sha256_file(cfg_path),
+        "manifest_hashes": {
+            Path(args.phage_manifest).name: sha256_file(args.phage_manifest),
+            Path(args.host_manifest).name: sha256_file(args.host_manifest),
+        },
+        "sample_safety": [load_json(safety_dir / f"{phage_ids[0]}.json")] if (safety_dir and phage_ids) else [],
+        # Safety is host-independent: read every safety JSON once, not once per host.
+        "safety_columns": (scoring.load_safety_columns(phage_ids, safety_dir)
+                           if safety_dir and args.scoring == "vectorized" else None),
+        "params": params,
+        "versions": cfg.get("versions", {}) or {},
     }
 
+
+@profiling.timed()
+def assemble_host(host_id: str, shared: Dict[str, Any], out_ranking: Path, out_evidence: Path) -> int:
+    """Write one host's outputs; returns the number of phages scored (all, unless incremental)."""
+    phage_ids = shared["phage_ids"]
+    sim_dir, struct_dir, safety_dir = shared["sim_dir"], shared["struct_dir"], shared["safety_dir"]
+    # Per-host binary stores take precedence over per-pair JSON files where they exist.
+    sim_store = open_store(shared["feature_store"], "similarity", host_id)
+    struct_store = open_store(shared["feature_store"], "structural", host_id)
+
+    rescored = len(phage_ids)
+    profiling.count("hosts")
+    if shared["state_dir"] is not None:
+        ranked, shortlist, rescored = rank_incremental(
+            host_id, phage_ids, sim_dir, struct_dir, safety_dir, shared["top_n"], shared["safety_columns"],
+            shared["state_dir"], shared["changed_phages"], sim_store, struct_store)
+    elif shared["scoring"] == "scalar":
+        ranked, shortlist = rank_scalar(host_id, phage_ids, sim_dir, struct_dir, safety_dir, shared["top_n"],
+                                        sim_store, struct_store)
+    else:
+        ranked, shortlist = rank_vectorized(host_id, phage_ids, sim_dir, struct_dir, safety_dir, shared["top_n"],
+                                            shared["safety_columns"], sim_store, struct_store)
+
+    write_ranking(out_ranking, host_id, ranked)
+
     # Infer module status from a small sample of feature artefacts
-    sample_sim = [load_json(sim_dir / args.host_id / f"{phage_ids[0]}.json")] if (sim_dir and phage_ids) else []
-    sample_struct = [load_json(struct_dir / args.host_id / f"{phage_ids[0]}.json")] if (struct_dir and phage_ids) else []
-    sample_safety = [load_json(safety_dir / f"{phage_ids[0]}.json")] if (safety_dir and phage_ids) else []
+    sample_sim = [pair_feature(sim_store, sim_dir, host_id, phage_ids[0])] if ((sim_store or sim_dir) and phage_ids) else []
+    sample_struct = ([pair_feature(struct_store, struct_dir, host_id, phage_ids[0])]
+                     if ((struct_store or struct_dir) and phage_ids) else [])
 
+    ensure_dir(out_evidence.parent)
+    out_evidence.write_text(json.dumps(evidence_document(host_id, shared, shortlist, sample_sim, sample_struct),
+                                       indent=2))
+    return rescored
+
+
+def write_ranking(path: Path, host_id: str, ranked: Ranked) -> None:
+    """ranking.csv: every candidate, best first."""
+    ensure_dir(path.parent)
+    with profiling.span("write_ranking"), path.open("w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["host_id","phage_id","rank","confidence_score","primary_reason","safety_flags"])
+        for rank, (pid, confidence, reason, flags) in enumerate(ranked, start=1):
+            flags_str = "none" if not flags else ";".join(flags)
+            w.writerow([host_id, pid, rank, f"{confidence:.4f}", reason, flags_str])
+
+
+def evidence_document(host_id: str, shared: Dict[str, Any], shortlist: List[Dict[str, Any]],
+                      sample_sim: List[Optional[Dict[str, Any]]],
+                      sample_struct: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """evidence_bundle.json content; module status is inferred from the sampled feature documents."""
+    test_mode = shared["test_mode"]
+    run_id = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
     modules = {
-        "similarity": module_status(enable_similarity, test_mode, sample_sim, "sourmash"),
-        "safety": module_status(enable_safety, test_mode, sample_safety, "abricate"),
-        "structural": module_status(enable_structural, test_mode, sample_struct, "foldseek"),
+        "similarity": module_status(shared["enable_similarity"], test_mode, sample_sim, "sourmash"),
+        "safety": module_status(shared["enable_safety"], test_mode, shared["sample_safety"], "abricate"),
+        "structural": module_status(shared["enable_structural"], test_mode, sample_struct, "foldseek"),
     }
 
     evidence_bundle = {
-        "pipeline_version": pipeline_version,
+        "pipeline_version": shared["pipeline_version"],
         "run_id": run_id,
-        "host_id": args.host_id,
-        "profile": profile,
+        "host_id": host_id,
+        "profile": shared["profile"],
         "test_mode": test_mode,
-        "config_sha256": config_sha,
-        "manifest_hashes": manifest_hashes,
+        "config_sha256": shared["config_sha"],
+        "manifest_hashes": shared["manifest_hashes"],
         "modules": modules,
-        "params": cfg.get("params", {}) or {},
-        "versions": cfg.get("versions", {}) or {},
+        "params": shared["params"],
+        "versions": shared["versions"],
         "shortlist": shortlist,
     }
+    return evidence_bundle
+
+
+# Process-pool workers receive the shared inputs once (initializer), not with every host.
+_WORKER_SHARED: Dict[str, Any] = {}
+
+
+def _init_worker(shared: Dict[str, Any]) -> None:
+    _WORKER_SHARED.update(shared)
+
+
+def _assemble_worker(job: Tuple[str, Path, Path]) -> int:
+    host_id, out_ranking, out_evidence = job
+    # Each worker writes its own trace per host; the parent's trace covers the shared inputs.
+    with profiling.trace("assemble_decision_bundle", host_id=host_id):
+        return assemble_host(host_id, _WORKER_SHARED, out_ranking, out_evidence)
+
+
+def requested_hosts(args: argparse.Namespace, known: List[str]) -> List[str]:
+    if args.host_id:
+        hosts = [args.host_id]
+    elif args.host_list:
+        lines = Path(args.host_list).read_text().splitlines()
+        hosts = [x.strip() for x in lines if x.strip() and not x.startswith("#")]
+    elif args.host_ids.strip() == "all":
+        hosts = list(known)
+    else:
+        hosts = [x.strip() for x in args.host_ids.split(",") if x.strip()]
+    # Ensure hosts exist in host manifest
+    known_ids = set(known)
+    missing = [h for h in hosts if h not in known_ids]
+    if missing:
+        raise SystemExit(f"host_id {', '.join(missing)} not found in {args.host_manifest}")
+    return hosts
+
+
+@profiling.traced("assemble_decision_bundle")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Assemble Decision Bundle outputs (ranking.csv + evidence_bundle.json) for one or more hosts.")
+    hosts = p.add_mutually_exclusive_group(required=True)
+    hosts.add_argument("--host-id")
+    hosts.add_argument("--host-ids", help="Comma-separated host_ids, or 'all' for every host in --host-manifest.")
+    hosts.add_argument("--host-list", help="File with one host_id per line.")
+    p.add_argument("--config", required=True)
+    p.add_argument("--phage-manifest", required=True)
+    p.add_argument("--host-manifest", required=True)
+    p.add_argument("--similarity-dir", required=False, default=None)
+    p.add_argument("--structural-dir", required=False, default=None)
+    p.add_argument("--safety-dir", required=False, default=None)
+    p.add_argument("--feature-store", default=None,
+                   help="Feature store root (pm.feature_store); per-host similarity/structural stores found "
+                        "here are used instead of the per-pair JSONs.")
+    p.add_argument("--out-ranking", default=None, help="ranking.csv path (with --host-id).")
+    p.add_argument("--out-evidence", default=None, help="evidence_bundle.json path (with --host-id).")
+    p.add_argument("--out-dir", default=None,
+                   help="Multi-host mode: writes <out-dir>/<host_id>/ranking.csv and evidence_bundle.json.")
+    p.add_argument("--workers", type=int, default=1, help="Processes for multi-host mode.")
+    p.add_argument("--pipeline-version", default="0.1.0")
+    p.add_argument("--foldseek-tier", default=None, help="Foldseek tier the structural features were searched with.")
+    p.add_argument("--scoring", choices=["vectorized", "scalar"], default="vectorized",
+                   help="Column-array scoring (default) or the per-phage scalar reference path.")
+    p.add_argument("--state-dir", default=None,
+                   help="Incremental re-ranking: keep per-host scored state (<state-dir>/<host_id>.npz) and "
+                        "rescore only phages whose features changed.")
+    p.add_argument("--changed-phages", default=None,
+                   help="With --state-dir: comma-separated phages known to have changed; other phages' "
+                        "feature files are not re-checked.")
+    args = p.parse_args()
 
-    out_ev = Path(args.out_evidence)
-    ensure_dir(out_ev.parent)
-    out_ev.write_text(json.dumps(evidence_bundle, indent=2))
+    if args.state_dir and args.scoring != "vectorized":
+        raise SystemExit("--state-dir requires --scoring vectorized.")
+    if args.changed_phages and not args.state_dir:
+        raise SystemExit("--changed-phages requires --state-dir.")
+
+    if args.host_id:
+        if not args.out_ranking or not args.out_evidence:
+            raise SystemExit("--out-ranking and --out-evidence are required with --host-id.")
+    elif not args.out_dir:
+        raise SystemExit("--out-dir is required with --host-ids/--host-list.")
+
+    shared = load_shared(args)
+    host_ids = requested_hosts(args, shared["host_ids"])
+    profiling.label(host_id=args.host_id, scoring=args.scoring)
+
+    if args.host_id:
+        assemble_host(args.host_id, shared, Path(args.out_ranking), Path(args.out_evidence))
+        return
+
+    out_dir = Path(args.out_dir)
+    jobs = [(h, out_dir / h / "ranking.csv", out_dir / h / "evidence_bundle.json") for h in host_ids]
+    if args.workers <= 1 or len(jobs) <= 1:
+        rescored = 0
+        for host_id, out_ranking, out_evidence in jobs:
+            with profiling.capture(host_id=host_id):
+                rescored += assemble_host(host_id, shared, out_ranking, out_evidence)
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs)),
+                                 initializer=_init_worker, initargs=(shared,)) as pool:
+            rescored = sum(pool.map(_assemble_worker, jobs, chunksize=max(1, len(jobs) // (4 * args.workers))))
+    msg = f"decision bundles assembled for {len(jobs)} hosts"
+    if shared["state_dir"] is not None:
+        msg += f" ({rescored} of {len(jobs) * len(shared['phage_ids'])} host×phage pairs rescored)"
+    print(msg)
 
 
 if __name__ == "__main__":
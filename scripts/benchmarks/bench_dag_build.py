@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+DAG construction time of the workflow against library size.
+
+For each size a scratch working directory gets a phage manifest with that many phages (empty
+FASTA placeholders), one host, and a real-mode config (similarity + safety; per-phage sketch,
+prokka, abricate and safety jobs, whose inputs are resolved through the manifest helpers).
+`snakemake --dry-run` of the host's ranking and the module meta files is timed on it; the
+structural module is off (it needs structure folders).
+
+Also reported per size, in-process:
+  parse_s        pm.manifest parse + validation of the phage manifest
+  indexed_s      one fasta lookup per phage through the index (what the Snakefile does now)
+  scan_est_s     the former per-lookup re-read plus linear scan, timed on --scan-sample lookups
+                 and extrapolated to one per phage
+
+Usage:
+  python scripts/benchmarks/bench_dag_build.py --sizes 1000,10000,100000 --timeout 1800
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+from pm.manifest import parse_manifest
+from pm.utils import read_tsv
+
+REPO = Path(__file__).resolve().parents[2]
+
+
+def write_workdir(root: Path, n_phages: int, pair_chunk_size: int = 0) -> List[str]:
+    lib = root / "data" / "phages"
+    lib.mkdir(parents=True)
+    phage_ids = [f"P{i:07d}" for i in range(n_phages)]
+    for pid in phage_ids:
+        (lib / f"{pid}.fna").touch()
+    (root / "manifests").mkdir()
+    (root / "manifests" / "phages.tsv").write_text(
+        "phage_id\tfasta\n" + "".join(f"{pid}\tdata/phages/{pid}.fna\n" for pid in phage_ids))
+    (root / "data" / "H001.fna").touch()
+    (root / "data" / "H001.faa").touch()
+    (root / "manifests" / "hosts.tsv").write_text("host_id\tgenome_fna\tproteome_faa\nH001\tdata/H001.fna\tdata/H001.faa\n")
+    cfg = yaml.safe_load((REPO / "config.yaml").read_text())
+    cfg["modules"].update({"test_mode": False, "enable_structural_ppi": False, "enable_sourmash": True,
+                           "enable_safety": True})
+    cfg["directories"]["results_viewer"] = None
+    cfg["params"]["hash_cache"] = False
+    cfg["params"]["pair_chunk_size"] = pair_chunk_size
+    (root / "config.yaml").write_text(yaml.safe_dump(cfg))
+    return phage_ids
+
+
+def lookups(manifest: Path, phage_ids: List[str], scan_sample: int, seed: int) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    index = parse_manifest(manifest, "phage_id", ("fasta",))
+    parse_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for pid in phage_ids:
+        index.get(pid, "fasta")
+    indexed_s = time.perf_counter() - t0
+
+    sample = random.Random(seed).sample(phage_ids, min(scan_sample, len(phage_ids)))
+    t0 = time.perf_counter()
+    for pid in sample:
+        next(r["fasta"] for r in read_tsv(manifest) if r["phage_id"] == pid)
+    scan_s = (time.perf_counter() - t0) / max(1, len(sample)) * len(phage_ids)
+    return {"parse_s": round(parse_s, 4), "indexed_s": round(indexed_s, 4), "scan_est_s": round(scan_s, 2)}
+
+
+def dry_run(root: Path, timeout: int) -> Dict[str, Any]:
+    cmd = ["snakemake", "--snakefile", str(REPO / "Snakefile"), "--directory", str(root),
+           "--configfile", str(root / "config.yaml"), "--dry-run", "--quiet", "rules", "--cores", "1",
+           "rankings/H001/ranking.csv", "cache/features/similarity/H001/meta.json", "cache/features/safety/meta.json"]
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"dag_build_s": None, "status": f"timeout after {timeout}s"}
+    seconds = round(time.perf_counter() - t0, 2)
+    if proc.returncode != 0:
+        return {"dag_build_s": seconds, "status": "error", "stderr": proc.stderr[-2000:]}
+    return {"dag_build_s": seconds, "status": "ok"}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark Snakemake DAG construction against library size.")
+    p.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated phage counts.")
+    p.add_argument("--timeout", type=int, default=1800, help="Seconds allowed per dry run.")
+    p.add_argument("--scan-sample", type=int, default=50, help="Lookups timed for the linear-scan estimate.")
+    p.add_argument("--skip-dag", action="store_true", help="Only the in-process lookup timings.")
+    p.add_argument("--pair-chunk-size", type=int, default=0, help="params.pair_chunk_size for the dry runs.")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    results = []
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        with tempfile.TemporaryDirectory(prefix="bench_dag_build_") as tmp:
+            root = Path(tmp)
+            phage_ids = write_workdir(root, n, args.pair_chunk_size)
+            row: Dict[str, Any] = {"phages": n}
+            row.update(lookups(root / "manifests" / "phages.tsv", phage_ids, args.scan_sample, args.seed))
+            if not args.skip_dag:
+                row.update(dry_run(root, args.timeout))
+        results.append(row)
+        print(json.dumps(row), file=sys.stderr)
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
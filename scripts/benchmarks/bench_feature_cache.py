@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Feature cache (pm.cas) hit rates and timings across configuration switches.
+
+Sketches a synthetic host and --phages phages (native sketcher, k=21,31), builds the library
+index, then runs the similarity module (scripts/modules/sourmash_containment.py --batch)
+through a sequence of configurations against one feature cache:
+
+  portable_k21     indexed library, ksize 21            (cold: every pair computed)
+  sigs_k21         per-phage signatures, ksize 21       (same sketches: all hits)
+  sigs_k31         ksize 31                             (new key: all misses)
+  portable_k21     back to the first configuration      (all hits)
+
+Each step is also run with the cache disabled; outputs must be byte-identical. Prints a JSON
+report with seconds, lookups and hits per step (the pm.profiling counters of the cached run);
+exits non-zero on a mismatch.
+
+Usage:
+  python scripts/benchmarks/bench_feature_cache.py --phages 2000 --genome-kb 40
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import filecmp
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from pm.cas import FeatureCache
+from pm.profiling import find_traces, merge_traces
+from pm.sketch_index import build_index
+from pm.sketching import sketch_many, write_signature
+
+REPO = Path(__file__).resolve().parents[2]
+SCRIPT = REPO / "scripts" / "modules" / "sourmash_containment.py"
+SCALED = 100
+STEPS = [("portable_k21", True, 21), ("sigs_k21", False, 21), ("sigs_k31", False, 31), ("portable_k21", True, 21)]
+
+
+def write_genomes(root: Path, n_phages: int, genome_kb: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    host = "".join(rng.choice("ACGT") for _ in range(genome_kb * 4000))
+    (root / "host.fna").write_text(">host\n" + host + "\n")
+    phage_ids = [f"P{i:06d}" for i in range(n_phages)]
+    for pid in phage_ids:
+        start = rng.randrange(0, len(host) - genome_kb * 500)
+        own = "".join(rng.choice("ACGT") for _ in range(genome_kb * 500))
+        (root / "phages" / f"{pid}.fna").write_text(f">{pid}\n{host[start:start + genome_kb * 500]}{own}\n")
+    return phage_ids
+
+
+def run_step(root: Path, out_dir: Path, phage_ids: List[str], indexed: bool, ksize: int, cache: str,
+             trace_dir: str = "") -> float:
+    cmd = [sys.executable, str(SCRIPT), "--batch", "--host-id", "H", "--phage-ids", ",".join(phage_ids),
+           "--host-sig", str(root / "host.sig"), "--out-dir", str(out_dir), "--ksize", str(ksize)]
+    cmd += ["--index", str(root / "index")] if indexed else ["--phage-sig-dir", str(root / "sigs")]
+    cmd += ["--scaled", str(SCALED)]
+    env = dict(os.environ, PM_FEATURE_CACHE=cache, PM_PROFILE=trace_dir)
+    t0 = time.perf_counter()
+    subprocess.run(cmd, check=True, env=env)
+    return round(time.perf_counter() - t0, 4)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark feature cache hit rates across config switches.")
+    p.add_argument("--phages", type=int, default=500)
+    p.add_argument("--genome-kb", type=int, default=20, help="Phage genome size; the host is 8x larger.")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--seed", type=int, default=11)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_feature_cache_") as tmp:
+        root = Path(tmp)
+        (root / "phages").mkdir()
+        phage_ids = write_genomes(root, args.phages, args.genome_kb, args.seed)
+        write_signature(root / "host.fna", root / "host.sig", [21, 31], SCALED)
+        sketch_many([(root / "phages" / f"{pid}.fna", root / "sigs" / f"{pid}.sig") for pid in phage_ids],
+                    [21, 31], SCALED, workers=args.workers)
+        build_index(root / "index", {pid: root / "sigs" / f"{pid}.sig" for pid in phage_ids}, 21, SCALED)
+
+        db = root / "feature_cache.sqlite"
+        steps: List[Dict[str, Any]] = []
+        failures: List[str] = []
+        for i, (name, indexed, ksize) in enumerate(STEPS):
+            cached_dir, plain_dir = root / f"out{i}_cached", root / f"out{i}_plain"
+            trace_dir = root / f"trace{i}"
+            t_cached = run_step(root, cached_dir, phage_ids, indexed, ksize, str(db), str(trace_dir))
+            t_plain = run_step(root, plain_dir, phage_ids, indexed, ksize, "")
+            counters = merge_traces(find_traces([trace_dir]))["scripts"]["sourmash_containment"]["counters"]
+            _, mismatch, errors = filecmp.cmpfiles(cached_dir, plain_dir, [f"{pid}.json" for pid in phage_ids],
+                                                   shallow=False)
+            if mismatch or errors:
+                failures.append(f"step {i} {name}: {len(mismatch) + len(errors)} differing outputs")
+            lookups, hits = counters.get("feature_cache_lookups", 0), counters.get("feature_cache_hits", 0)
+            steps.append({"step": name, "ksize": ksize, "indexed": indexed, "seconds_cached": t_cached,
+                          "seconds_uncached": t_plain, "lookups": lookups, "hits": hits,
+                          "hit_rate": round(hits / lookups, 4) if lookups else None})
+            print(json.dumps(steps[-1]), file=sys.stderr)
+        totals = FeatureCache(db).stats()
+
+    print(json.dumps({"phages": args.phages, "genome_kb": args.genome_kb, "steps": steps, "totals": totals,
+                      "ok": not failures, "failures": failures}, indent=2))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
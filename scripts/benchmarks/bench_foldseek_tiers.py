@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark Foldseek tiers (pm.foldseek_tiers) on a fixed host panel: wall time vs ranking overlap.
+
+For every tier the panel is searched once against a prebuilt phage library DB (one batched
+search, as `foldseek_batch_search.py` runs it), summarised with `foldseek_summarise.py` and
+ranked with `assemble_decision_bundle.py`. Optional similarity/safety feature directories from
+a previous run are reused, so the ranking is the final one the pipeline would produce. The
+report gives the search wall time per tier and the mean overlap of each host's top-N with the
+reference tier (default: exhaustive). Prints a JSON report.
+
+Usage:
+  python scripts/benchmarks/bench_foldseek_tiers.py --host-ids H001,H002 \
+    --host-struct-dir cache/structures/hosts --phage-db cache/foldseek/db/phageDB \
+    --similarity-dir cache/features/similarity --safety-dir cache/features/safety \
+    --work-dir results/tmp/bench_tiers --top-n 10
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import csv
+import json
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+from pm.foldseek_tiers import resolve_tier, search_args
+from pm.manifest import load_phages
+
+MODULES = Path(__file__).resolve().parents[1] / "modules"
+ASSEMBLE = Path(__file__).resolve().parents[1] / "assemble_decision_bundle.py"
+
+
+def run(cmd: List[str]) -> None:
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+
+
+def top_n(ranking_csv: Path, n: int) -> List[str]:
+    with ranking_csv.open(newline="") as f:
+        rows = sorted(csv.DictReader(f), key=lambda r: int(r["rank"]))
+    return [r["phage_id"] for r in rows[:n]]
+
+
+def run_tier(tier: str, settings: Dict, args: argparse.Namespace, host_ids: List[str], phage_ids: List[str]) -> Dict:
+    tier_dir = Path(args.work_dir) / tier
+    if tier_dir.exists():
+        shutil.rmtree(tier_dir)
+    results_dir = tier_dir / "results"
+
+    t0 = time.perf_counter()
+    run([sys.executable, str(MODULES / "foldseek_batch_search.py"), "--host-ids", ",".join(host_ids),
+         "--host-struct-dir", args.host_struct_dir, "--phage-db", args.phage_db,
+         "--work-dir", str(tier_dir / "search"), "--results-dir", str(results_dir),
+         "--threads", str(args.threads), "--search-args", " ".join(search_args(settings))])
+    search_seconds = time.perf_counter() - t0
+
+    rankings: Dict[str, List[str]] = {}
+    for host_id in host_ids:
+        struct_dir = tier_dir / "structural"
+        summarise = [sys.executable, str(MODULES / "foldseek_summarise.py"), "--host-id", host_id,
+                     "--phage-ids", ",".join(phage_ids), "--out-dir", str(struct_dir / host_id),
+                     "--hits-tsv", str(results_dir / host_id / "hits.tsv")]
+        if args.evalue_max is not None:
+            summarise += ["--evalue-max", str(args.evalue_max)]
+        run(summarise)
+        ranking = tier_dir / "rankings" / host_id / "ranking.csv"
+        assemble = [sys.executable, str(ASSEMBLE), "--host-id", host_id, "--config", args.config,
+                    "--phage-manifest", args.phage_manifest, "--host-manifest", args.host_manifest,
+                    "--structural-dir", str(struct_dir), "--out-ranking", str(ranking),
+                    "--out-evidence", str(ranking.with_name("evidence_bundle.json")), "--foldseek-tier", tier]
+        if args.similarity_dir:
+            assemble += ["--similarity-dir", args.similarity_dir]
+        if args.safety_dir:
+            assemble += ["--safety-dir", args.safety_dir]
+        run(assemble)
+        rankings[host_id] = top_n(ranking, args.top_n)
+    return {"settings": settings, "search_seconds": search_seconds, "top_n": rankings}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Foldseek tier benchmark: search wall time and top-N ranking overlap.")
+    p.add_argument("--host-ids", required=True, help="Comma-separated host panel.")
+    p.add_argument("--host-struct-dir", required=True)
+    p.add_argument("--phage-db", required=True, help="Prebuilt library DB prefix (foldseek_library_db.py).")
+    p.add_argument("--work-dir", required=True)
+    p.add_argument("--config", default="config.yaml")
+    p.add_argument("--phage-manifest", default="manifests/phages.tsv")
+    p.add_argument("--host-manifest", default="manifests/hosts.tsv")
+    p.add_argument("--similarity-dir", default=None)
+    p.add_argument("--safety-dir", default=None)
+    p.add_argument("--tiers", default="fast,default,exhaustive")
+    p.add_argument("--reference-tier", default="exhaustive")
+    p.add_argument("--top-n", type=int, default=10)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--evalue-max", type=float, default=None, help="Default: params.foldseek_evalue_max from --config.")
+    args = p.parse_args()
+
+    cfg = yaml.safe_load(Path(args.config).read_text())
+    if args.evalue_max is None:
+        args.evalue_max = (cfg.get("params") or {}).get("foldseek_evalue_max")
+    host_ids = [x.strip() for x in args.host_ids.split(",") if x.strip()]
+    phage_ids = load_phages(args.phage_manifest).ids
+    tiers = [t.strip() for t in args.tiers.split(",") if t.strip()]
+    if args.reference_tier not in tiers:
+        tiers.append(args.reference_tier)
+
+    results = {t: run_tier(t, resolve_tier(cfg, t), args, host_ids, phage_ids) for t in tiers}
+    reference = results[args.reference_tier]["top_n"]
+    report = {"hosts": host_ids, "top_n": args.top_n, "reference_tier": args.reference_tier, "tiers": {}}
+    for tier, res in results.items():
+        overlaps = [len(set(res["top_n"][h]) & set(reference[h])) / max(1, len(reference[h])) for h in host_ids]
+        report["tiers"][tier] = {
+            "settings": res["settings"],
+            "search_seconds": round(res["search_seconds"], 3),
+            "speedup_vs_reference": (results[args.reference_tier]["search_seconds"] / res["search_seconds"]
+                                     if res["search_seconds"] else None),
+            "top_n_overlap_mean": sum(overlaps) / len(overlaps) if overlaps else None,
+            "top_n_overlap_min": min(overlaps) if overlaps else None,
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Provenance hashing with and without the memoized hash cache (pm.hash_cache).
+
+Writes --files random files of --size-kb each, backdates their mtimes (so they are cacheable),
+then times, for --repeats meta-rule-like passes over all of them:
+
+  uncached     hashlib over every file, every pass (the previous behaviour)
+  cold         first pass through sha256_files with an empty SQLite cache (threaded hashing)
+  warm         a new process-level memo but the persisted cache (a later Snakemake run)
+  memo         further passes in the same process (later hosts' meta rules)
+  one_changed  one file rewritten, everything else served from the cache
+
+All digests must equal hashlib's. Prints a JSON report; exits non-zero on a mismatch.
+
+Usage:
+  python scripts/benchmarks/bench_hash_cache.py --files 2000 --size-kb 256 --repeats 5
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from pm import hash_cache
+
+
+def timed(fn) -> tuple:
+    t0 = time.perf_counter()
+    result = fn()
+    return result, round(time.perf_counter() - t0, 4)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark memoized provenance hashing.")
+    p.add_argument("--files", type=int, default=1000)
+    p.add_argument("--size-kb", type=int, default=256)
+    p.add_argument("--repeats", type=int, default=5, help="Passes over all files (e.g. hosts with a meta rule).")
+    p.add_argument("--workers", type=int, default=None)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_hash_cache_") as tmp:
+        root = Path(tmp)
+        files: List[str] = []
+        old = time.time() - 3600
+        for i in range(args.files):
+            f = root / "files" / f"f{i:06d}.fna"
+            f.parent.mkdir(exist_ok=True)
+            f.write_bytes(os.urandom(args.size_kb * 1024))
+            os.utime(f, (old, old))
+            files.append(str(f))
+        cache = hash_cache.HashCache(root / "hash_cache.sqlite")
+
+        ref, t_uncached = timed(lambda: [{f: hash_cache.hash_file(f) for f in files} for _ in range(args.repeats)])
+        ref = ref[0]
+        hash_cache._memo.clear()
+        cold, t_cold = timed(lambda: hash_cache.sha256_files(files, args.workers, cache))
+        memo, t_memo = timed(lambda: [hash_cache.sha256_files(files, args.workers, cache)
+                                      for _ in range(args.repeats - 1)])
+        hash_cache._memo.clear()
+        warm, t_warm = timed(lambda: hash_cache.sha256_files(files, args.workers, cache))
+
+        Path(files[0]).write_bytes(os.urandom(args.size_kb * 1024))
+        os.utime(files[0], (old + 1, old + 1))
+        updated = dict(ref, **{files[0]: hash_cache.hash_file(files[0])})
+        changed, t_changed = timed(lambda: hash_cache.sha256_files(files, args.workers, cache))
+
+        failures = [name for name, got, want in (("cold", cold, ref), ("warm", warm, ref),
+                                                 ("one_changed", changed, updated)) if got != want]
+        failures += ["memo"] if any(m != cold for m in memo) else []
+
+    report: Dict[str, Any] = {
+        "files": args.files,
+        "size_kb": args.size_kb,
+        "repeats": args.repeats,
+        "seconds": {
+            "uncached": t_uncached,
+            "cached": round(t_cold + t_memo, 4),
+            "cold": t_cold,
+            "memo": t_memo,
+            "warm": t_warm,
+            "one_changed": t_changed,
+        },
+        "ok": not failures,
+        "failures": failures,
+    }
+    print(json.dumps(report, indent=2))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
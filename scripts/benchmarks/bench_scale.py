@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Synthetic-scale benchmarks of the v0.1 DAG in test mode, with a JSON history across commits.
+
+For each scale PHAGESxHOSTS (e.g. 10x1 ... 100000x1000) a scratch working directory gets
+synthetic manifests, dummy FASTAs and a test-mode config (every module on, mocked). Measured:
+
+  dag             `snakemake --dry-run` of the ranking, bundle and module meta targets
+  pipeline        the mocked pipeline run on those targets: wall time and peak RSS, per-module
+                  wall time and units/s from the rules' benchmark files (pm.telemetry), and
+                  the mean per-host assembly latency (decision_bundle jobs)
+  scripts         each module script for one host over the whole library (similarity,
+                  structural, safety), the assembler and the validator; wall time, peak RSS and
+                  units/s, where a unit is a host×phage pair (a phage for safety)
+
+Peak RSS is the largest single process of a command (RUSAGE_CHILDREN of a wrapper process).
+The pipeline is skipped above --max-pipeline-pairs host×phage pairs; the scripts always run.
+
+Each invocation appends one entry (commit, machine, params, per-scale results) to --history and
+compares it with the latest earlier entry on the same machine and params: metrics that grew by
+more than --threshold (and by more than 50 ms / 5 MB) are listed as regressions.
+
+Usage:
+  python scripts/benchmarks/bench_scale.py --scales 10x1,1000x10,10000x100
+  python scripts/benchmarks/bench_scale.py --scales 100000x1000 --max-pipeline-pairs 0 \\
+      --param decision_bundle_batch_size=50 --fail-on-regression
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from pm.telemetry import collect, run_report
+
+REPO = Path(__file__).resolve().parents[2]
+HISTORY_FORMAT = 1
+# Linked into every scratch directory: the rules run `python scripts/...` relative to it.
+LINKED = ("Snakefile", "workflow", "scripts", "pm", "contracts", "envs")
+# Runs one command and records its wall time and the peak RSS of its largest process.
+MEASURE = (
+    "import json, resource, subprocess, sys, time\n"
+    "t0 = time.perf_counter()\n"
+    "rc = subprocess.run(sys.argv[2:]).returncode\n"
+    "with open(sys.argv[1], 'w') as f:\n"
+    "    json.dump({'returncode': rc, 'wall_s': time.perf_counter() - t0,\n"
+    "               'max_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss}, f)\n"
+)
+# Regressions smaller than these are noise whatever the ratio.
+MIN_DELTA = {"s": 0.05, "mb": 5.0}
+
+
+def iso_utc() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def parse_scales(value: str) -> List[Tuple[int, int]]:
+    scales = []
+    for item in value.split(","):
+        if item.strip():
+            phages, _, hosts = item.strip().lower().partition("x")
+            scales.append((int(phages), int(hosts or 1)))
+    return scales
+
+
+def parse_params(items: List[str]) -> Dict[str, Any]:
+    params = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--param expects key=value, got {item!r}")
+        params[key.strip()] = yaml.safe_load(value)
+    return params
+
+
+def write_workdir(root: Path, n_phages: int, n_hosts: int, genome_bp: int, params: Dict[str, Any],
+                  seed: int) -> Tuple[List[str], List[str]]:
+    rng = random.Random(seed)
+    for name in LINKED:
+        if (REPO / name).exists():
+            (root / name).symlink_to(REPO / name)
+    phages_dir, hosts_dir = root / "data" / "phages", root / "data" / "hosts"
+    phages_dir.mkdir(parents=True)
+    hosts_dir.mkdir(parents=True)
+    phage_ids = [f"P{i:07d}" for i in range(n_phages)]
+    host_ids = [f"H{i:05d}" for i in range(n_hosts)]
+    for pid in phage_ids:
+        (phages_dir / f"{pid}.fna").write_text(f">{pid}\n{''.join(rng.choices('ACGT', k=genome_bp))}\n")
+    for hid in host_ids:
+        (hosts_dir / f"{hid}.fna").write_text(f">{hid}\n{''.join(rng.choices('ACGT', k=genome_bp * 10))}\n")
+        (hosts_dir / f"{hid}.faa").write_text(f">{hid}_1 outer membrane porin\nMKKLLA\n")
+    (root / "manifests").mkdir()
+    (root / "manifests" / "phages.tsv").write_text(
+        "phage_id\tfasta\n" + "".join(f"{pid}\tdata/phages/{pid}.fna\n" for pid in phage_ids))
+    (root / "manifests" / "hosts.tsv").write_text(
+        "host_id\tgenome_fna\tproteome_faa\n"
+        + "".join(f"{hid}\tdata/hosts/{hid}.fna\tdata/hosts/{hid}.faa\n" for hid in host_ids))
+
+    cfg = yaml.safe_load((REPO / "config.yaml").read_text())
+    cfg["modules"].update({"test_mode": True, "enable_structural_ppi": True, "enable_sourmash": True,
+                           "enable_safety": True})
+    # Fixed layout: pipeline_targets() and the benchmark directory read below assume it.
+    cfg["directories"].update({"cache": "cache", "logs": "results/logs", "rankings": "rankings",
+                               "results_viewer": None})
+    cfg["params"].update({"hash_cache": False, "feature_cache": False, "performance_report": True,
+                          "profiling": False, **params})
+    (root / "config.yaml").write_text(yaml.safe_dump(cfg))
+    return phage_ids, host_ids
+
+
+def measured(cmd: List[str], cwd: Path, timeout: int, log: Path) -> Dict[str, Any]:
+    """Wall time, peak RSS (MB) and status of one command run through the MEASURE wrapper."""
+    stats_path = log.with_suffix(".stats.json")
+    with log.open("w") as out:
+        try:
+            subprocess.run([sys.executable, "-c", MEASURE, str(stats_path), *cmd], cwd=cwd, stdout=out,
+                           stderr=subprocess.STDOUT, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"status": f"timeout after {timeout}s", "wall_s": None, "max_rss_mb": None}
+        except OSError as e:
+            # E2BIG: one argument over the kernel's per-argument limit (~128 KiB).
+            return {"status": f"error: {e.strerror}", "wall_s": None, "max_rss_mb": None}
+    stats = json.loads(stats_path.read_text())
+    result = {"status": "ok" if stats["returncode"] == 0 else "error", "wall_s": round(stats["wall_s"], 3),
+              "max_rss_mb": round(stats["max_rss_kb"] / 1024, 1)}
+    if stats["returncode"] != 0:
+        result["log_tail"] = log.read_text()[-2000:]
+    return result
+
+
+def throughput(result: Dict[str, Any], units: int) -> Dict[str, Any]:
+    if result["status"] == "ok" and result["wall_s"]:
+        result["units"] = units
+        result["units_per_s"] = round(units / result["wall_s"], 1)
+    return result
+
+
+def pipeline_targets(host_ids: List[str]) -> List[str]:
+    targets = [f"rankings/{h}/{name}" for h in host_ids for name in ("ranking.csv", "evidence_bundle.json")]
+    targets += [f"cache/features/{m}/{h}/meta.json" for h in host_ids for m in ("similarity", "structural")]
+    return targets + ["cache/features/safety/meta.json"]
+
+
+def snakemake_cmd(root: Path, cores: int, targets: List[str], dry_run: bool = False) -> List[str]:
+    cmd = ["snakemake", "--snakefile", str(root / "Snakefile"), "--directory", str(root),
+           "--configfile", str(root / "config.yaml")]
+    if dry_run:
+        cmd += ["--dry-run", "--quiet", "rules"]
+    return cmd + ["--cores", str(cores), *targets]
+
+
+def run_pipeline(root: Path, host_ids: List[str], n_phages: int, cores: int, timeout: int) -> Dict[str, Any]:
+    result = measured(snakemake_cmd(root, cores, pipeline_targets(host_ids)), root, timeout,
+                      root / "pipeline.log")
+    records = collect(root / "results" / "logs" / "benchmarks")
+    report = run_report(records, len(host_ids), n_phages)
+    result["jobs"] = len(records)
+    result["modules"] = {m: {"jobs": s["jobs"], "wall_s": s["wall_s"], "max_rss_mb": s["max_rss_mb"],
+                             "units_per_s": s["units_per_s"]} for m, s in report["modules"].items()}
+    # Per-host decision_bundle jobs, or batches of hosts (decision_bundle_batch_size): seconds per host.
+    assembly = [r["wall_s"] for r in records if r["rule"].startswith("decision_bundle")]
+    result["assembly_latency_s"] = round(sum(assembly) / len(host_ids), 4) if assembly else None
+    return result
+
+
+def run_scripts(root: Path, host_id: str, n_phages: int, timeout: int) -> Dict[str, Any]:
+    """Each module script for one host over the whole library, then assembly and validation."""
+    out = root / "scripts_out"
+    py = sys.executable
+    steps = {
+        "similarity": ([py, "scripts/modules/sourmash_containment.py", "--batch", "--mock", "--host-id", host_id,
+                        "--manifest", "manifests/phages.tsv", "--out-dir", str(out / "similarity" / host_id)], n_phages),
+        "structural": ([py, "scripts/modules/foldseek_summarise.py", "--mock", "--host-id", host_id,
+                        "--manifest", "manifests/phages.tsv", "--out-dir", str(out / "structural" / host_id)], n_phages),
+        "safety": ([py, "scripts/modules/safety_compile.py", "--batch", "--mock", "--manifest",
+                    "manifests/phages.tsv", "--out-dir", str(out / "safety")], n_phages),
+        "assembly": ([py, "scripts/assemble_decision_bundle.py", "--host-id", host_id, "--config", "config.yaml",
+                      "--phage-manifest", "manifests/phages.tsv", "--host-manifest", "manifests/hosts.tsv",
+                      "--similarity-dir", str(out / "similarity"), "--structural-dir", str(out / "structural"),
+                      "--safety-dir", str(out / "safety"), "--out-ranking", str(out / "ranking.csv"),
+                      "--out-evidence", str(out / "evidence_bundle.json")], n_phages),
+        "validation": ([py, "scripts/validate_decision_bundle.py", "--ranking", str(out / "ranking.csv"),
+                        "--evidence", str(out / "evidence_bundle.json"), "--schema",
+                        "contracts/decision_bundle/evidence_bundle.schema.json"], n_phages),
+    }
+    results: Dict[str, Any] = {}
+    for name, (cmd, units) in steps.items():
+        results[name] = throughput(measured(cmd, root, timeout, root / f"script_{name}.log"), units)
+    return results
+
+
+def bench_scale(n_phages: int, n_hosts: int, args: argparse.Namespace, params: Dict[str, Any]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {"scale": f"{n_phages}x{n_hosts}", "phages": n_phages, "hosts": n_hosts,
+                           "pairs": n_phages * n_hosts}
+    tmp = tempfile.mkdtemp(prefix="bench_scale_")
+    root = Path(tmp)
+    try:
+        t0 = time.perf_counter()
+        phage_ids, host_ids = write_workdir(root, n_phages, n_hosts, args.genome_bp, params, args.seed)
+        row["setup_s"] = round(time.perf_counter() - t0, 3)
+        if not args.skip_dag:
+            row["dag"] = measured(snakemake_cmd(root, 1, pipeline_targets(host_ids), dry_run=True), root,
+                                  args.timeout, root / "dag.log")
+        if row["pairs"] <= args.max_pipeline_pairs:
+            row["pipeline"] = run_pipeline(root, host_ids, n_phages, args.cores, args.timeout)
+        else:
+            row["pipeline"] = {"status": f"skipped (> {args.max_pipeline_pairs} pairs)"}
+        row["scripts"] = run_scripts(root, host_ids[0], n_phages, args.timeout)
+    finally:
+        if args.keep:
+            row["workdir"] = str(root)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return row
+
+
+def git_info() -> Dict[str, Any]:
+    def git(*cmd: str) -> Optional[str]:
+        proc = subprocess.run(["git", *cmd], cwd=REPO, capture_output=True, text=True)
+        return proc.stdout.strip() if proc.returncode == 0 else None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(status) if status is not None else None}
+
+
+def machine_info() -> Dict[str, Any]:
+    proc = subprocess.run(["snakemake", "--version"], capture_output=True, text=True)
+    return {"node": platform.node(), "platform": platform.platform(), "python": platform.python_version(),
+            "cpus": os.cpu_count(), "snakemake": proc.stdout.strip() or None}
+
+
+def metrics(row: Dict[str, Any]) -> Dict[str, float]:
+    """Flat comparable metrics of one scale: `<section>.<name>.<wall_s|max_rss_mb>` (ok results only)."""
+    out: Dict[str, float] = {}
+
+    def add(prefix: str, result: Optional[Dict[str, Any]]) -> None:
+        if not result or result.get("status") != "ok":
+            return
+        for field in ("wall_s", "max_rss_mb"):
+            if result.get(field) is not None:
+                out[f"{prefix}.{field}"] = result[field]
+
+    add("dag", row.get("dag"))
+    add("pipeline", row.get("pipeline"))
+    if (row.get("pipeline") or {}).get("assembly_latency_s") is not None:
+        out["pipeline.assembly_latency_s"] = row["pipeline"]["assembly_latency_s"]
+    for name, result in (row.get("scripts") or {}).items():
+        add(f"scripts.{name}", result)
+    return out
+
+
+def regressions(entry: Dict[str, Any], previous: Optional[Dict[str, Any]], threshold: float) -> List[Dict[str, Any]]:
+    if previous is None:
+        return []
+    before = {r["scale"]: metrics(r) for r in previous["results"]}
+    found = []
+    for row in entry["results"]:
+        old = before.get(row["scale"], {})
+        for name, value in metrics(row).items():
+            base = old.get(name)
+            if base is None:
+                continue
+            floor = MIN_DELTA["mb"] if name.endswith("_mb") else MIN_DELTA["s"]
+            if value > base * (1 + threshold) and value - base > floor:
+                found.append({"scale": row["scale"], "metric": name, "before": base, "after": value,
+                              "change": round(value / base - 1, 3) if base else None})
+    return found
+
+
+def load_history(path: Path) -> Dict[str, Any]:
+    if path.exists():
+        history = json.loads(path.read_text())
+        if history.get("format") == HISTORY_FORMAT:
+            return history
+    return {"format": HISTORY_FORMAT, "runs": []}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark the test-mode DAG and module scripts at synthetic scale.")
+    p.add_argument("--scales", default="10x1,100x5,1000x10",
+                   help="Comma-separated PHAGESxHOSTS, e.g. 10x1,1000x10,100000x1000.")
+    p.add_argument("--genome-bp", type=int, default=500, help="Dummy phage genome length (hosts are 10x).")
+    p.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="snakemake --cores for the pipeline.")
+    p.add_argument("--max-pipeline-pairs", type=int, default=1_000_000,
+                   help="Skip the pipeline run (not the dry run or scripts) above this many host×phage pairs.")
+    p.add_argument("--skip-dag", action="store_true", help="Skip the dry-run timing.")
+    p.add_argument("--timeout", type=int, default=3600, help="Seconds allowed per command.")
+    p.add_argument("--param", action="append", default=[], metavar="KEY=VALUE",
+                   help="config.yaml `params` override for the scratch runs (repeatable).")
+    p.add_argument("--history", default=str(REPO / "results" / "benchmarks" / "scale_history.json"),
+                   help="JSON history file; one entry is appended per invocation.")
+    p.add_argument("--threshold", type=float, default=0.2, help="Relative growth reported as a regression.")
+    p.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero when regressions are found.")
+    p.add_argument("--keep", action="store_true", help="Keep the scratch directories (paths are recorded).")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    if shutil.which("snakemake") is None:
+        raise SystemExit("snakemake is not on PATH.")
+    params = parse_params(args.param)
+    results = []
+    for n_phages, n_hosts in parse_scales(args.scales):
+        row = bench_scale(n_phages, n_hosts, args, params)
+        results.append(row)
+        print(json.dumps(row), file=sys.stderr)
+
+    machine = machine_info()
+    entry = {"recorded_at": iso_utc(), **git_info(), "machine": machine, "params": params,
+             "genome_bp": args.genome_bp, "cores": args.cores, "results": results}
+    history_path = Path(args.history)
+    history = load_history(history_path)
+    # Only runs on the same machine with the same overrides are comparable.
+    previous = next((r for r in reversed(history["runs"])
+                     if r["machine"]["node"] == machine["node"] and r["params"] == params
+                     and r["genome_bp"] == args.genome_bp and r["cores"] == args.cores), None)
+    entry["compared_with"] = previous["commit"] if previous else None
+    entry["regressions"] = regressions(entry, previous, args.threshold)
+    history["runs"].append(entry)
+    history_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = history_path.with_name(history_path.name + ".tmp")
+    tmp.write_text(json.dumps(history, indent=2))
+    tmp.replace(history_path)
+
+    print(json.dumps(entry, indent=2))
+    for r in entry["regressions"]:
+        print(f"REGRESSION {r['scale']} {r['metric']}: {r['before']} -> {r['after']}", file=sys.stderr)
+    if entry["regressions"] and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the native multi-k sketcher against the `sourmash sketch dna` subprocess path.
+
+Generates a random host-sized genome (default 5 Mbp), then times:
+  - native: one read of the genome, all ksizes (pm.sketching)
+  - sourmash: one `sourmash sketch dna` subprocess per ksize (the previous Snakefile behaviour)
+and checks that both produce identical hash sets. Prints a JSON report.
+
+Usage:
+  python scripts/benchmarks/bench_sketching.py --genome-bp 5000000 --ksizes 21,31,51 --scaled 2000
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from pm.signatures import load_hashes
+from pm.sketching import write_signature
+
+
+def write_random_genome(path: Path, n_bp: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    seq = np.frombuffer(b"ACGT", dtype=np.uint8)[rng.integers(0, 4, size=n_bp)].tobytes()
+    with path.open("wb") as f:
+        f.write(b">synthetic_host\n")
+        for i in range(0, n_bp, 80):
+            f.write(seq[i:i + 80] + b"\n")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Native vs subprocess FracMinHash sketch benchmark.")
+    p.add_argument("--genome-bp", type=int, default=5_000_000)
+    p.add_argument("--ksizes", default="21,31,51")
+    p.add_argument("--scaled", type=int, default=2000)
+    p.add_argument("--repeats", type=int, default=1)
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args()
+
+    ksizes = sorted({int(k) for k in args.ksizes.split(",") if k.strip()})
+    report = {"genome_bp": args.genome_bp, "ksizes": ksizes, "scaled": args.scaled}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        fasta = tmp / "host.fna"
+        write_random_genome(fasta, args.genome_bp, args.seed)
+
+        native_sig = tmp / "native.sig"
+        times = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            write_signature(fasta, native_sig, ksizes, args.scaled)
+            times.append(time.perf_counter() - t0)
+        report["native_seconds"] = min(times)
+
+        if shutil.which("sourmash") is None:
+            report["sourmash_seconds"] = None
+            report["note"] = "sourmash not on PATH; subprocess path not timed"
+        else:
+            times = []
+            for _ in range(args.repeats):
+                t0 = time.perf_counter()
+                for k in ksizes:
+                    subprocess.run(
+                        ["sourmash", "sketch", "dna", "-p", f"k={k},scaled={args.scaled}",
+                         "-o", str(tmp / f"sourmash_k{k}.sig"), str(fasta)],
+                        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    )
+                times.append(time.perf_counter() - t0)
+            report["sourmash_seconds"] = min(times)
+            report["speedup"] = report["sourmash_seconds"] / report["native_seconds"]
+            report["identical"] = all(
+                np.array_equal(load_hashes(native_sig, k)[0], load_hashes(tmp / f"sourmash_k{k}.sig", k)[0])
+                for k in ksizes
+            )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Recall of a reduced/faster Foldseek search against a full reference search on a sample panel.
+
+Both directories hold `<host_id>/hits.tsv` (query, target, evalue, bits, qcov, tcov), e.g. a
+run with `params.foldseek_receptor_focus: false` and one with `true` on the same hosts. For
+every host the (host, phage) pairs with a significant hit (evalue <= --evalue-max) in the
+reference are the truth set; the report gives pair recall, whether the best-scoring phage is
+unchanged, and the hit-row ratio as a search-space proxy. Prints a JSON report.
+
+Usage:
+  python scripts/benchmarks/foldseek_recall.py \
+    --reference-dir runs/full/cache/foldseek/results \
+    --candidate-dir runs/receptor/cache/foldseek/results \
+    --host-ids H001,H002
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def infer_phage_id(target_id: str) -> str:
+    # Same convention as scripts/modules/foldseek_summarise.py
+    for sep in ("__", "|"):
+        if sep in target_id:
+            return target_id.split(sep, 1)[0]
+    return target_id.split()[0]
+
+
+def best_evalues(tsv: Path, evalue_max: float) -> Dict[str, float]:
+    """Best (lowest) e-value per phage among significant hits; {} if the file is missing."""
+    best: Dict[str, float] = {}
+    if not tsv.exists():
+        return best
+    with tsv.open() as f:
+        for line in f:
+            parts = line.rstrip("\r\n").split("\t")
+            if len(parts) < 4 or line.startswith("#"):
+                continue
+            try:
+                e = float(parts[2])
+            except ValueError:
+                continue
+            if e > evalue_max:
+                continue
+            pid = infer_phage_id(parts[1])
+            if e < best.get(pid, float("inf")):
+                best[pid] = e
+    return best
+
+
+def count_rows(tsv: Path) -> int:
+    if not tsv.exists():
+        return 0
+    with tsv.open() as f:
+        return sum(1 for line in f if line.strip() and not line.startswith("#"))
+
+
+def compare_host(reference: Path, candidate: Path, evalue_max: float) -> Dict[str, object]:
+    ref = best_evalues(reference, evalue_max)
+    cand = best_evalues(candidate, evalue_max)
+    found = set(ref) & set(cand)
+    top_ref = min(ref, key=ref.get) if ref else None
+    top_cand = min(cand, key=cand.get) if cand else None
+    ref_rows, cand_rows = count_rows(reference), count_rows(candidate)
+    return {
+        "reference_pairs": len(ref),
+        "candidate_pairs": len(cand),
+        "recall": len(found) / len(ref) if ref else None,
+        "missed": sorted(set(ref) - found),
+        "top_phage_reference": top_ref,
+        "top_phage_candidate": top_cand,
+        "top_phage_agrees": top_ref == top_cand,
+        "hit_rows_ratio": cand_rows / ref_rows if ref_rows else None,
+    }
+
+
+def compare_panel(reference_dir: Path, candidate_dir: Path, host_ids: List[str], evalue_max: float) -> Dict[str, object]:
+    per_host = {h: compare_host(reference_dir / h / "hits.tsv", candidate_dir / h / "hits.tsv", evalue_max)
+                for h in host_ids}
+    ref_total = sum(r["reference_pairs"] for r in per_host.values())
+    found_total = sum(r["reference_pairs"] - len(r["missed"]) for r in per_host.values())
+    recall: Optional[float] = found_total / ref_total if ref_total else None
+    return {
+        "evalue_max": evalue_max,
+        "hosts": len(host_ids),
+        "pair_recall": recall,
+        "top_phage_agreement": (sum(r["top_phage_agrees"] for r in per_host.values()) / len(host_ids)
+                                if host_ids else None),
+        "per_host": per_host,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Pair-level recall of a reduced Foldseek search vs a full search.")
+    p.add_argument("--reference-dir", required=True, help="Full-search results: <dir>/<host_id>/hits.tsv")
+    p.add_argument("--candidate-dir", required=True, help="Reduced-search results: <dir>/<host_id>/hits.tsv")
+    p.add_argument("--host-ids", default=None, help="Comma-separated panel (default: hosts present in --reference-dir).")
+    p.add_argument("--evalue-max", type=float, default=1e-3)
+    args = p.parse_args()
+
+    reference_dir, candidate_dir = Path(args.reference_dir), Path(args.candidate_dir)
+    if args.host_ids:
+        host_ids = [x.strip() for x in args.host_ids.split(",") if x.strip()]
+    else:
+        host_ids = sorted(d.name for d in reference_dir.iterdir() if (d / "hits.tsv").exists())
+    print(json.dumps(compare_panel(reference_dir, candidate_dir, host_ids, args.evalue_max), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Incremental re-ranking (assemble_decision_bundle.py --state-dir) against full re-assembly.
+
+Feature JSONs for --hosts x --phages are written to a scratch directory and every host is
+assembled once with --state-dir (builds the per-host state). Then a library update is simulated:
+--update phages get new similarity/structural/safety features and --add phages join the manifest.
+Three assemblies of the updated library follow:
+
+  full         no state (reference)
+  detect       --state-dir, changed phages found from feature fingerprints
+  changed      --state-dir --changed-phages <updated + added>
+
+Each must produce byte-identical ranking.csv files and equal evidence bundles (apart from run_id)
+for every host. Exits non-zero on any mismatch; prints a JSON report with wall times.
+
+Usage:
+  python scripts/benchmarks/incremental_ranking.py --hosts 200 --phages 2000 --update 10 --add 2
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from scoring_parity import random_safety, random_similarity, random_structural  # noqa: E402
+
+ASSEMBLE = Path(__file__).resolve().parents[1] / "assemble_decision_bundle.py"
+
+
+def write_pair_features(root: Path, host_ids: List[str], phage_ids: List[str], rng: random.Random) -> None:
+    for pid in phage_ids:
+        for host_id in host_ids:
+            for name, make in (("similarity", random_similarity), ("structural", random_structural)):
+                out = root / name / host_id / f"{pid}.json"
+                doc = make(rng)
+                if doc is None:
+                    out.unlink(missing_ok=True)
+                else:
+                    out.write_text(json.dumps(doc))
+        out = root / "safety" / f"{pid}.json"
+        doc = random_safety(rng)
+        if doc is None:
+            out.unlink(missing_ok=True)
+        else:
+            out.write_text(json.dumps(doc))
+
+
+def write_manifests(root: Path, host_ids: List[str], phage_ids: List[str], top_n: int) -> None:
+    (root / "phages.tsv").write_text("phage_id\tfasta\n" + "".join(f"{pid}\t{pid}.fna\n" for pid in phage_ids))
+    (root / "hosts.tsv").write_text("host_id\tfasta\n" + "".join(f"{h}\t{h}.fna\n" for h in host_ids))
+    cfg = {"profile": "incremental", "modules": {"test_mode": False, "enable_sourmash": True,
+                                                 "enable_structural_ppi": True, "enable_safety": True},
+           "params": {"top_n": top_n}}
+    (root / "config.yaml").write_text(yaml.safe_dump(cfg))
+
+
+def assemble(root: Path, out_dir: Path, workers: int, extra: List[str]) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, str(ASSEMBLE), "--host-ids", "all", "--out-dir", str(out_dir),
+                    "--workers", str(workers), "--config", str(root / "config.yaml"),
+                    "--phage-manifest", str(root / "phages.tsv"), "--host-manifest", str(root / "hosts.tsv"),
+                    "--similarity-dir", str(root / "similarity"), "--structural-dir", str(root / "structural"),
+                    "--safety-dir", str(root / "safety")] + extra, check=True, stdout=subprocess.DEVNULL)
+    return round(time.perf_counter() - t0, 3)
+
+
+def outputs(out_dir: Path, host_ids: List[str]) -> Dict[str, Any]:
+    result = {}
+    for h in host_ids:
+        bundle = json.loads((out_dir / h / "evidence_bundle.json").read_text())
+        bundle.pop("run_id")
+        result[h] = ((out_dir / h / "ranking.csv").read_bytes(), bundle)
+    return result
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Incremental vs full decision bundle re-ranking after a library update.")
+    p.add_argument("--hosts", type=int, default=50)
+    p.add_argument("--phages", type=int, default=1000)
+    p.add_argument("--update", type=int, default=10, help="Existing phages whose features change.")
+    p.add_argument("--add", type=int, default=2, help="New phages appended to the manifest.")
+    p.add_argument("--top-n", type=int, default=10)
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    host_ids = [f"H{i:05d}" for i in range(args.hosts)]
+    phage_ids = [f"P{i:06d}" for i in range(args.phages)]
+    added = [f"P{i:06d}" for i in range(args.phages, args.phages + args.add)]
+    updated = rng.sample(phage_ids, min(args.update, len(phage_ids)))
+
+    with tempfile.TemporaryDirectory(prefix="incremental_ranking_") as tmp:
+        root = Path(tmp)
+        for name in ("similarity", "structural"):
+            for h in host_ids:
+                (root / name / h).mkdir(parents=True)
+        (root / "safety").mkdir()
+        write_pair_features(root, host_ids, phage_ids, rng)
+        write_manifests(root, host_ids, phage_ids, args.top_n)
+
+        state_dir = root / "state"
+        seconds = {"initial": assemble(root, root / "out_initial", args.workers, ["--state-dir", str(state_dir)])}
+
+        write_pair_features(root, host_ids, updated + added, rng)
+        write_manifests(root, host_ids, phage_ids + added, args.top_n)
+        shutil.copytree(state_dir, root / "state_changed")
+
+        seconds["full"] = assemble(root, root / "out_full", args.workers, [])
+        seconds["detect"] = assemble(root, root / "out_detect", args.workers, ["--state-dir", str(state_dir)])
+        seconds["changed"] = assemble(root, root / "out_changed", args.workers,
+                                      ["--state-dir", str(root / "state_changed"),
+                                       "--changed-phages", ",".join(updated + added)])
+
+        ref = outputs(root / "out_full", host_ids)
+        report: Dict[str, Any] = {"hosts": args.hosts, "phages": args.phages + args.add,
+                                  "updated": len(updated), "added": len(added), "seconds": seconds}
+        failures: List[str] = []
+        for mode in ("detect", "changed"):
+            got = outputs(root / f"out_{mode}", host_ids)
+            rankings = all(got[h][0] == ref[h][0] for h in host_ids)
+            bundles = all(got[h][1] == ref[h][1] for h in host_ids)
+            report[mode] = {"ranking_identical": rankings, "evidence_identical": bundles}
+            failures += [f"{mode}.{k}" for k, ok in report[mode].items() if not ok]
+    report["ok"] = not failures
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Parity and timing of the vectorized scoring path (pm.scoring) against the scalar functions in
+`assemble_decision_bundle.py`.
+
+1. Row parity: random feature dicts, including the edge cases the scalar functions handle
+   (missing features, None/unparseable values, e-values <= 0, NaN, flags), are scored both
+   ways; scores must agree to --tolerance, primary reasons exactly, and the (-confidence,
+   phage_id) order and top-N shortlist must be identical.
+2. End to end: feature JSONs for one host are written to a scratch directory and
+   `assemble_decision_bundle.py` is run with `--scoring scalar` and `--scoring vectorized`;
+   ranking.csv must be byte-identical and the evidence bundles equal apart from run_id.
+   Both wall times are reported.
+
+Exits non-zero on any mismatch. Prints a JSON report.
+
+Usage:
+  python scripts/benchmarks/scoring_parity.py --rows 20000 --e2e-phages 5000 --top-n 10
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+from pm import scoring
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import assemble_decision_bundle as scalar  # noqa: E402
+
+ASSEMBLE = Path(__file__).resolve().parents[1] / "assemble_decision_bundle.py"
+FLAG_CHOICES = [[], ["vfdb_hit"], ["possible_temperate"], ["vfdb_hit", "possible_temperate"]]
+
+
+def random_similarity(rng: random.Random) -> Optional[Dict[str, Any]]:
+    kind = rng.random()
+    if kind < 0.1:
+        return None
+    if kind < 0.15:
+        return {"value": rng.choice([None, "n/a", float("nan"), -0.5, 1.5])}
+    return {"metric": "containment", "value": round(rng.random(), rng.choice([2, 4, 8])), "status": "ok"}
+
+
+def random_structural(rng: random.Random) -> Optional[Dict[str, Any]]:
+    kind = rng.random()
+    if kind < 0.1:
+        return None
+    if kind < 0.2:
+        return rng.choice([{}, {"best_evalue": None, "hit_count": 3}, {"best_evalue": "bad"},
+                           {"best_evalue": 0.0, "hit_count": 2}, {"best_evalue": -1.0},
+                           {"best_evalue": float("nan"), "hit_count": 1}, {"best_evalue": 1e-300, "hit_count": None}])
+    return {"best_evalue": 10 ** rng.uniform(-30, 1), "hit_count": rng.randint(0, 40), "status": "ok"}
+
+
+def random_safety(rng: random.Random) -> Optional[Dict[str, Any]]:
+    if rng.random() < 0.1:
+        return None
+    return {"flags": list(rng.choice(FLAG_CHOICES)), "status": "ok"}
+
+
+def row_parity(n_rows: int, top_n: int, tolerance: float, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    phage_ids = [f"P{rng.randrange(10 ** 7):07d}_{i}" for i in range(n_rows)]
+    sims = [random_similarity(rng) for _ in range(n_rows)]
+    structs = [random_structural(rng) for _ in range(n_rows)]
+    safeties = [random_safety(rng) for _ in range(n_rows)]
+
+    cols = scoring.FeatureColumns(phage_ids)
+    for i in range(n_rows):
+        cols.set_similarity(i, sims[i])
+        cols.set_structural(i, structs[i])
+        cols.set_safety(i, safeties[i])
+    vec = scoring.score(cols)
+
+    struct_ref = np.array([scalar.structural_to_score(s) for s in structs])
+    sim_ref = np.array([scalar.similarity_to_score(s) for s in sims])
+    conf_ref = np.array([scalar.clamp01(0.6 * st + 0.4 * sm - scalar.safety_penalty(sf))
+                         for st, sm, sf in zip(struct_ref, sim_ref, safeties)])
+    reason_ref = [scalar.pick_primary_reason(st, sm, []) for st, sm in zip(struct_ref, sim_ref)]
+
+    order_ref = sorted(range(n_rows), key=lambda i: (-conf_ref[i], phage_ids[i]))
+    order_vec = scoring.rank_order(vec["confidence"], cols.phage_ids).tolist()
+    top_vec = scoring.top_n_indices(vec["confidence"], cols.phage_ids, top_n).tolist()
+
+    # Ties at the cutoff: the same confidence repeated across many phages.
+    tied = np.full(n_rows, 0.5)
+    tied_top = scoring.top_n_indices(tied, cols.phage_ids, top_n).tolist()
+    tied_ref = sorted(range(n_rows), key=lambda i: phage_ids[i])[:top_n]
+
+    return {
+        "rows": n_rows,
+        "max_abs_diff": {
+            "structural": float(np.max(np.abs(vec["structural"] - struct_ref))) if n_rows else 0.0,
+            "similarity": float(np.max(np.abs(vec["similarity"] - sim_ref))) if n_rows else 0.0,
+            "confidence": float(np.max(np.abs(vec["confidence"] - conf_ref))) if n_rows else 0.0,
+        },
+        "reasons_equal": vec["reason"].tolist() == reason_ref,
+        "order_equal": order_vec == order_ref,
+        "top_n_equal": top_vec == order_ref[:top_n],
+        "tied_top_n_equal": tied_top == tied_ref,
+        "tolerance": tolerance,
+    }
+
+
+def write_features(root: Path, host_id: str, n_phages: int, top_n: int, seed: int) -> Dict[str, Path]:
+    rng = random.Random(seed)
+    dirs = {name: root / name for name in ("similarity", "structural", "safety")}
+    for name in ("similarity", "structural"):
+        (dirs[name] / host_id).mkdir(parents=True, exist_ok=True)
+    dirs["safety"].mkdir(parents=True, exist_ok=True)
+    phage_ids = [f"P{i:06d}" for i in range(n_phages)]
+    for pid in phage_ids:
+        for name, make, out in (("similarity", random_similarity, dirs["similarity"] / host_id),
+                                ("structural", random_structural, dirs["structural"] / host_id),
+                                ("safety", random_safety, dirs["safety"])):
+            doc = make(rng)
+            if doc is not None:
+                (out / f"{pid}.json").write_text(json.dumps(doc))
+    (root / "phages.tsv").write_text("phage_id\tfasta\n" + "".join(f"{pid}\t{pid}.fna\n" for pid in phage_ids))
+    (root / "hosts.tsv").write_text(f"host_id\tfasta\n{host_id}\t{host_id}.fna\n")
+    cfg = {"profile": "parity", "modules": {"test_mode": False, "enable_sourmash": True,
+                                            "enable_structural_ppi": True, "enable_safety": True},
+           "params": {"top_n": top_n}}
+    (root / "config.yaml").write_text(yaml.safe_dump(cfg))
+    return dirs
+
+
+def end_to_end(n_phages: int, top_n: int, seed: int) -> Dict[str, Any]:
+    host_id = "H000"
+    with tempfile.TemporaryDirectory(prefix="scoring_parity_") as tmp:
+        root = Path(tmp)
+        dirs = write_features(root, host_id, n_phages, top_n, seed)
+        outputs, seconds = {}, {}
+        for mode in ("scalar", "vectorized"):
+            ranking, evidence = root / mode / "ranking.csv", root / mode / "evidence_bundle.json"
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, str(ASSEMBLE), "--host-id", host_id, "--config", str(root / "config.yaml"),
+                            "--phage-manifest", str(root / "phages.tsv"), "--host-manifest", str(root / "hosts.tsv"),
+                            "--similarity-dir", str(dirs["similarity"]), "--structural-dir", str(dirs["structural"]),
+                            "--safety-dir", str(dirs["safety"]), "--out-ranking", str(ranking),
+                            "--out-evidence", str(evidence), "--scoring", mode], check=True)
+            seconds[mode] = round(time.perf_counter() - t0, 3)
+            bundle = json.loads(evidence.read_text())
+            bundle.pop("run_id")
+            outputs[mode] = (ranking.read_bytes(), bundle)
+    return {
+        "phages": n_phages,
+        "ranking_identical": outputs["scalar"][0] == outputs["vectorized"][0],
+        "evidence_identical": outputs["scalar"][1] == outputs["vectorized"][1],
+        "seconds": seconds,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Vectorized vs scalar scoring parity for decision bundle assembly.")
+    p.add_argument("--rows", type=int, default=20000, help="Rows for the in-process parity check.")
+    p.add_argument("--e2e-phages", type=int, default=2000, help="Phages for the end-to-end run (0 skips it).")
+    p.add_argument("--top-n", type=int, default=10)
+    p.add_argument("--tolerance", type=float, default=1e-12)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    rows = row_parity(args.rows, args.top_n, args.tolerance, args.seed)
+    report: Dict[str, Any] = {"row_parity": rows}
+    failures: List[str] = [k for k, v in rows["max_abs_diff"].items() if v > args.tolerance]
+    failures += [k for k in ("reasons_equal", "order_equal", "top_n_equal", "tied_top_n_equal") if not rows[k]]
+    if args.e2e_phages > 0:
+        e2e = end_to_end(args.e2e_phages, args.top_n, args.seed)
+        report["end_to_end"] = e2e
+        failures += [k for k in ("ranking_identical", "evidence_identical") if not e2e[k]]
+    report["ok"] = not failures
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Aggregate the workflow's per-rule Snakemake benchmarks into a run report (JSON + markdown)."""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pm.manifest import load_hosts, load_phages
+from pm.profiling import find_traces, merge_traces
+from pm.telemetry import collect, run_report
+
+
+def iso_utc() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def fmt(value: Optional[float], digits: int = 2) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def render_markdown(report: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    totals = report["totals"]
+    lines.append("# Run report")
+    lines.append("")
+    lines.append(f"Generated: {report['generated_at']}")
+    lines.append("")
+    lines.append(f"{report['hosts']} hosts x {report['phages']} phages; {totals['jobs']} jobs, "
+                 f"{fmt(totals['wall_s'])} s wall, {fmt(totals['cpu_s'])} s CPU, "
+                 f"peak RSS {fmt(totals['max_rss_mb'], 1)} MB.")
+    lines.append("")
+
+    lines.append("## Modules")
+    lines.append("")
+    lines.append("| Module | Jobs | Wall s | CPU s | Peak RSS MB | Read MB | Written MB | Units | Units/s |")
+    lines.append("| ------ | ---- | ------ | ----- | ----------- | ------- | ---------- | ----- | ------- |")
+    for module, m in report["modules"].items():
+        lines.append(f"| {module} | {m['jobs']} | {fmt(m['wall_s'])} | {fmt(m['cpu_s'])} | {fmt(m['max_rss_mb'], 1)} "
+                     f"| {fmt(m['io_in_mb'])} | {fmt(m['io_out_mb'])} | {m['units'] if m['units'] is not None else '-'} "
+                     f"| {fmt(m['units_per_s'])} |")
+    lines.append("")
+    lines.append("Units are the host x phage pairs (similarity, structural, decision) or phages (safety) "
+                 "computed by this run's jobs.")
+    lines.append("")
+
+    lines.append("## Hosts")
+    lines.append("")
+    modules = sorted({m for h in report["per_host"].values() for m in h["modules"]})
+    if not report["per_host"]:
+        lines.append("_No per-host jobs recorded._")
+    else:
+        lines.append("| Host | Jobs | Wall s | Peak RSS MB | " + " | ".join(f"{m} s" for m in modules) + " |")
+        lines.append("| ---- | ---- | ------ | ----------- | " + " | ".join("-" * (len(m) + 2) for m in modules) + " |")
+        for host_id, h in report["per_host"].items():
+            lines.append(f"| {host_id} | {h['jobs']} | {fmt(h['wall_s'])} | {fmt(h['max_rss_mb'], 1)} | "
+                         + " | ".join(fmt(h["modules"].get(m)) for m in modules) + " |")
+    shared = report["shared"]
+    lines.append("")
+    lines.append(f"Library-wide and per-phage jobs shared by all hosts: {shared['jobs']} jobs, "
+                 f"{fmt(shared['wall_s'])} s wall.")
+    lines.append("")
+
+    lines.append("## Hottest rules")
+    lines.append("")
+    lines.append("| Rule | Module | Jobs | Wall s | CPU s | Peak RSS MB |")
+    lines.append("| ---- | ------ | ---- | ------ | ----- | ----------- |")
+    for r in report["hottest_rules"]:
+        lines.append(f"| {r['rule']} | {r['module']} | {r['jobs']} | {fmt(r['wall_s'])} | {fmt(r['cpu_s'])} "
+                     f"| {fmt(r['max_rss_mb'], 1)} |")
+    lines.append("")
+
+    timeline = report["timeline"]
+    lines.append("## Timeline")
+    lines.append("")
+    lines.append(f"{fmt(timeline['span_s'])} s from the first job starting to the last finishing; some job was "
+                 f"running for {fmt(timeline['busy_s'])} s of it. Times are placed by benchmark file mtimes and "
+                 "do not imply dependencies between rules.")
+    lines.append("")
+    lines.append("| Rule | Jobs | First start s | Last end s | Wall s |")
+    lines.append("| ---- | ---- | ------------- | ---------- | ------ |")
+    for r in timeline["rules"]:
+        lines.append(f"| {r['rule']} | {r['jobs']} | {fmt(r['first_start_s'])} | {fmt(r['last_end_s'])} "
+                     f"| {fmt(r['wall_s'])} |")
+
+    profile = report.get("profile")
+    if profile is not None:
+        lines.append("")
+        lines.append("## Hot spans")
+        lines.append("")
+        lines.append(f"Merged from {profile['traces']} pm.profiling traces.")
+        lines.append("")
+        lines.append("| Script:span | Count | Total s | Max s |")
+        lines.append("| ----------- | ----- | ------- | ----- |")
+        for row in profile["top_spans"]:
+            lines.append(f"| {row['span']} | {row['count']} | {fmt(row['total_s'], 3)} | {fmt(row['max_s'], 3)} |")
+        captures = [c for s in profile["scripts"].values() for c in s["captures"]]
+        for c in captures:
+            subject = ", ".join(f"{k}={v}" for k, v in c["subject"].items())
+            lines.append("")
+            lines.append(f"Capture ({subject}): `{c['cprofile']}`, tracemalloc peak {fmt(c['tracemalloc_peak_mb'])} MB.")
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Aggregate per-rule Snakemake benchmarks into a run report.")
+    p.add_argument("--benchmark-dir", required=True)
+    p.add_argument("--since", type=float, default=None,
+                   help="Epoch seconds the run started; benchmark files written earlier are left out.")
+    p.add_argument("--inline-rules", default="",
+                   help="Comma-separated `run:` rules; their CPU, RSS and I/O are the Snakemake process's and are dropped.")
+    p.add_argument("--rule-units", default=None,
+                   help="JSON {rule: units one job covers}; default: pm.telemetry.default_rule_units.")
+    p.add_argument("--phage-manifest", required=True)
+    p.add_argument("--host-manifest", required=True)
+    p.add_argument("--out-json", required=True)
+    p.add_argument("--out-md", default=None)
+    p.add_argument("--top-n", type=int, default=10, help="Rules listed under hottest rules.")
+    p.add_argument("--profile-dir", default=None,
+                   help="pm.profiling trace directory; merged traces are added to the report as `profile`.")
+    args = p.parse_args()
+
+    records = collect(args.benchmark_dir, args.since, [r for r in args.inline_rules.split(",") if r])
+    n_phages = len(load_phages(args.phage_manifest))
+    n_hosts = len(load_hosts(args.host_manifest))
+    report = {"generated_at": iso_utc(), "benchmark_dir": args.benchmark_dir,
+              **run_report(records, n_hosts, n_phages, args.top_n,
+                           json.loads(args.rule_units) if args.rule_units else None)}
+    if args.profile_dir:
+        report["profile"] = merge_traces(find_traces([args.profile_dir]), 2 * args.top_n)
+
+    out = Path(args.out_json)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    if args.out_md:
+        Path(args.out_md).write_text(render_markdown(report))
+
+
+if __name__ == "__main__":
+    main()
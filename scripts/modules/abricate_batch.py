@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Screen the phage library with abricate in a few large runs instead of one run per phage.
+
+Phage FASTAs are concatenated into multi-FASTA chunks with contig IDs tagged as
+`p<n>__<contig>` (n = the phage's position in its chunk); each chunk is one `abricate --db <db>` call (chunks run in parallel),
+and the hits are split back into `<out-dir>/<phage_id>.tsv` with the original contig ID and
+FASTA path restored, i.e. the file a per-phage `abricate --db <db> <fasta>` run writes.
+
+`<out-dir>/abricate_batch.json` records the FASTA SHA-256 and database each TSV was produced
+from, so re-runs only screen new or changed library members.
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pm import profiling
+from pm.manifest import load_phages
+from pm.utils import ensure_dir, sha256_files
+
+# Contigs are tagged with the phage's chunk position rather than its ID: the tag never contains
+# TAG_SEP, so the first TAG_SEP always ends it, whatever the phage or contig IDs contain.
+TAG_SEP = "__"
+CACHE_NAME = "abricate_batch.json"
+# Header abricate writes for every report (used for phages whose chunk produced no hits).
+DEFAULT_HEADER = ("#FILE\tSEQUENCE\tSTART\tEND\tSTRAND\tGENE\tCOVERAGE\tCOVERAGE_MAP\tGAPS\t"
+                  "%COVERAGE\t%IDENTITY\tDATABASE\tACCESSION\tPRODUCT\tRESISTANCE\n")
+
+
+def load_cache(out_dir: Path) -> Dict[str, Dict[str, str]]:
+    p = out_dir / CACHE_NAME
+    return json.loads(p.read_text()) if p.exists() else {}
+
+
+def save_cache(out_dir: Path, cache: Dict[str, Dict[str, str]]) -> None:
+    p = out_dir / CACHE_NAME
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps(cache, indent=2, sort_keys=True))
+    tmp.replace(p)
+
+
+def phage_tag(index: int) -> str:
+    return f"p{index}"
+
+
+def write_tagged(fastas: List[Tuple[str, str]], out: Path) -> Dict[str, str]:
+    """Concatenate (phage_id, fasta) pairs, prefixing every contig ID with a per-phage tag; returns tag -> phage_id."""
+    tags: Dict[str, str] = {}
+    with out.open("w") as w:
+        for i, (pid, fasta) in enumerate(fastas):
+            tag = phage_tag(i)
+            tags[tag] = pid
+            with open(fasta) as f:
+                for line in f:
+                    if line.startswith(">"):
+                        w.write(f">{tag}{TAG_SEP}{line[1:].lstrip()}")
+                    else:
+                        w.write(line)
+            w.write("\n")
+    return tags
+
+
+@profiling.timed()
+def run_chunk(fastas: List[Tuple[str, str]], db: str, work_dir: Path) -> Optional[Tuple[str, Dict[str, List[str]]]]:
+    """Run abricate on one chunk; returns (header, {phage_id: [rows]}) or None if abricate failed."""
+    with tempfile.NamedTemporaryFile("w", suffix=".fna", dir=work_dir, delete=False) as tmp:
+        chunk = Path(tmp.name)
+    try:
+        tags = write_tagged(fastas, chunk)
+        proc = subprocess.run(["abricate", "--db", db, str(chunk)], capture_output=True, text=True)
+    finally:
+        chunk.unlink(missing_ok=True)
+    if proc.returncode != 0:
+        print(f"abricate failed on a chunk of {len(fastas)} phages: {proc.stderr.strip()}", file=sys.stderr)
+        return None
+
+    paths = dict(fastas)
+    header = DEFAULT_HEADER
+    rows: Dict[str, List[str]] = {pid: [] for pid, _ in fastas}
+    for line in proc.stdout.splitlines(keepends=True):
+        if line.startswith("#"):
+            header = line
+            continue
+        parts = line.split("\t")
+        if len(parts) < 2:
+            continue
+        tag, sep, contig = parts[1].partition(TAG_SEP)
+        pid = tags.get(tag) if sep else None
+        if pid is None:
+            continue
+        # Restore what a per-phage run reports: the phage's own FASTA path and contig ID.
+        parts[0], parts[1] = paths[pid], contig
+        rows[pid].append("\t".join(parts))
+    return header, rows
+
+
+def chunked(items: List, n_chunks: int) -> List[List]:
+    n_chunks = max(1, min(n_chunks, len(items)))
+    return [items[i::n_chunks] for i in range(n_chunks)]
+
+
+@profiling.traced("abricate_batch")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Batched abricate screen of the phage library with per-phage split-back.")
+    p.add_argument("--manifest", required=True, help="Phage manifest TSV (phage_id, fasta).")
+    p.add_argument("--out-dir", required=True, help="Per-phage <phage_id>.tsv reports are written here.")
+    p.add_argument("--db", default="vfdb")
+    p.add_argument("--workers", type=int, default=1, help="Parallel abricate runs (one chunk each).")
+    p.add_argument("--chunk-size", type=int, default=0,
+                   help="Max phages per abricate run (default: split the pending phages evenly across workers).")
+    args = p.parse_args()
+
+    out_dir = ensure_dir(args.out_dir)
+    work_dir = ensure_dir(out_dir / ".work")
+    rows = load_phages(args.manifest).rows
+    cache = load_cache(out_dir)
+
+    pending: List[Tuple[str, str]] = []
+    with profiling.span("hash_fastas"):
+        digests = sha256_files(r["fasta"] for r in rows)
+    hashes: Dict[str, str] = {}
+    for r in rows:
+        pid, fasta = r["phage_id"], r["fasta"]
+        if digests[fasta] is None:
+            raise SystemExit(f"FASTA for {pid} not found: {fasta}")
+        hashes[pid] = digests[fasta]
+        entry = cache.get(pid)
+        if entry == {"fasta_sha256": hashes[pid], "db": args.db} and (out_dir / f"{pid}.tsv").exists():
+            continue
+        pending.append((pid, fasta))
+
+    n_chunks = args.workers
+    if args.chunk_size > 0:
+        n_chunks = max(n_chunks, -(-len(pending) // args.chunk_size))
+    chunks = chunked(pending, n_chunks) if pending else []
+    profiling.count("phages", len(rows))
+    profiling.count("phages_screened", len(pending))
+    for chunk in chunks:
+        profiling.observe("chunk_phages", len(chunk))
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for chunk, result in zip(chunks, pool.map(lambda c: run_chunk(c, args.db, work_dir), chunks)):
+            for pid, _ in chunk:
+                out = out_dir / f"{pid}.tsv"
+                if result is None:
+                    # Like the per-phage rule's `|| true`: leave an empty report, and retry next run.
+                    out.write_text("")
+                    cache.pop(pid, None)
+                    failed += 1
+                    continue
+                header, hits = result
+                out.write_text(header + "".join(hits[pid]))
+                cache[pid] = {"fasta_sha256": hashes[pid], "db": args.db}
+    save_cache(out_dir, cache)
+    if not any(work_dir.iterdir()):
+        work_dir.rmdir()
+    print(f"abricate batch: {len(rows)} phages, {len(pending)} screened in {len(chunks)} runs, "
+          f"{len(rows) - len(pending)} cached, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
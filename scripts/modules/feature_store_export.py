@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Regenerate per-pair feature JSONs from binary feature stores (pm.feature_store).
+
+Writes `<out-root>/<module>/<host_id>/<phage_id>.json`, byte-identical to what the producers
+write without `--store-dir`; with `--out-root cache/features` this restores the JSON cache
+layout. Useful for inspection, contract validation, or tools that expect the JSON files.
+
+Usage:
+  python scripts/modules/feature_store_export.py --store-root cache/features/store \
+    --out-root cache/features --modules similarity,structural --host-ids all
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from pm import profiling
+from pm.feature_store import SCHEMAS, FeatureStore, store_dir
+from pm.utils import ensure_dir
+
+
+@profiling.timed()
+def export_store(store: FeatureStore, out_dir: Path, phage_ids: Optional[List[str]] = None) -> int:
+    ensure_dir(out_dir)
+    n = 0
+    for pid in phage_ids or store.phage_ids:
+        doc = store.payload(pid)
+        if doc is None:
+            continue
+        (out_dir / f"{pid}.json").write_text(json.dumps(doc, indent=2))
+        n += 1
+    profiling.count("documents", n)
+    return n
+
+
+@profiling.traced("feature_store_export")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Export feature stores back to per host×phage JSON files.")
+    p.add_argument("--store-root", required=True, help="Feature store root (<root>/<module>/<host_id>/).")
+    p.add_argument("--out-root", required=True, help="JSONs go to <out-root>/<module>/<host_id>/<phage_id>.json.")
+    p.add_argument("--modules", default=",".join(SCHEMAS), help="Comma-separated modules to export.")
+    p.add_argument("--host-ids", default="all", help="Comma-separated host_ids, or 'all' stores present.")
+    p.add_argument("--phage-ids", default=None, help="Comma-separated subset of phages (default: every row).")
+    args = p.parse_args()
+
+    root = Path(args.store_root)
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    unknown = [m for m in modules if m not in SCHEMAS]
+    if unknown:
+        raise SystemExit(f"Unknown modules {unknown}; expected {sorted(SCHEMAS)}")
+    phage_ids = [x.strip() for x in args.phage_ids.split(",") if x.strip()] if args.phage_ids else None
+
+    total = 0
+    for module in modules:
+        if args.host_ids == "all":
+            module_dir = root / module
+            hosts = sorted(d.name for d in module_dir.iterdir() if (d / "index.json").exists()) if module_dir.is_dir() else []
+        else:
+            hosts = [x.strip() for x in args.host_ids.split(",") if x.strip()]
+        for host_id in hosts:
+            d = store_dir(root, module, host_id)
+            if not (d / "index.json").exists():
+                raise SystemExit(f"No {module} feature store for host {host_id} under {root}")
+            total += export_store(FeatureStore(d), Path(args.out_root) / module / host_id, phage_ids)
+    print(f"exported {total} feature JSONs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, TextIO
+
+from pm import profiling
+from pm.utils import ensure_dir
+
+# Query structures are staged as "b<index>__<original name>"; Foldseek keeps the file stem as the
+# query name, so the tag survives into convertalis output and identifies the host. Tags are built
+# from the host's position, never its ID, so they cannot contain TAG_SEP and the first TAG_SEP in a
+# query name always ends the tag, whatever the host IDs or structure file names contain.
+TAG_SEP = "__"
+FORMAT_OUTPUT = "query,target,evalue,bits,qcov,tcov"
+
+
+def host_tag(index: int) -> str:
+    return f"b{index}"
+
+
+@profiling.timed()
+def stage_queries(host_dirs: Dict[str, Path], stage_dir: Path) -> Dict[str, str]:
+    """Symlink every host structure into one directory under a per-host tag; returns tag -> host_id."""
+    if stage_dir.exists():
+        shutil.rmtree(stage_dir)
+    ensure_dir(stage_dir)
+    tags: Dict[str, str] = {}
+    for i, (host_id, src) in enumerate(host_dirs.items()):
+        tag = host_tag(i)
+        tags[tag] = host_id
+        for f in sorted(src.iterdir()):
+            # Skip dotfiles such as Snakemake's .snakemake_timestamp in directory() outputs.
+            if f.is_file() and not f.name.startswith("."):
+                os.symlink(f.resolve(), stage_dir / f"{tag}{TAG_SEP}{f.name}")
+    return tags
+
+
+@profiling.timed()
+def demultiplex(lines: TextIO, tags: Dict[str, str], out_paths: Dict[str, Path]) -> Dict[str, int]:
+    """Route merged hits to per-host TSVs, stripping the query tag so rows match a per-host search."""
+    counts = {host_id: 0 for host_id in out_paths}
+    handles = {}
+    try:
+        for host_id, path in out_paths.items():
+            ensure_dir(path.parent)
+            tmp = path.with_name(path.name + ".tmp")
+            handles[host_id] = (tmp, tmp.open("w"))
+        for line in lines:
+            if not line.strip():
+                continue
+            tag, sep, rest = line.partition(TAG_SEP)
+            host_id = tags.get(tag) if sep else None
+            if host_id is None:
+                continue
+            handles[host_id][1].write(rest)
+            counts[host_id] += 1
+    finally:
+        for tmp, fh in handles.values():
+            fh.close()
+    for host_id, (tmp, _) in handles.items():
+        tmp.replace(out_paths[host_id])
+    return counts
+
+
+def run_batch_search(host_dirs: Dict[str, Path], phage_db: Path, work_dir: Path,
+                     out_paths: Dict[str, Path], threads: int, search_args: List[str]) -> Dict[str, int]:
+    ensure_dir(work_dir)
+    tags = stage_queries(host_dirs, work_dir / "queries")
+    query_db = work_dir / "queryDB"
+    aln_db = work_dir / "alnDB"
+    merged = work_dir / "hits.tsv"
+    # Like the per-host rule, a failed search yields empty hit files rather than failing the DAG;
+    # the bundle then records the structural evidence as empty.
+    steps = [
+        ["foldseek", "createdb", str(work_dir / "queries"), str(query_db)],
+        ["foldseek", "search", str(query_db), str(phage_db), str(aln_db), str(work_dir / "tmp"),
+         "--threads", str(threads), *search_args],
+        ["foldseek", "convertalis", str(query_db), str(phage_db), str(aln_db), str(merged),
+         "--format-mode", "4", "--format-output", FORMAT_OUTPUT],
+    ]
+    for cmd in steps:
+        with profiling.span(f"foldseek_{cmd[1]}"):
+            returncode = subprocess.run(cmd).returncode
+        if returncode != 0:
+            print(f"foldseek step failed: {' '.join(cmd[:2])}", file=sys.stderr)
+            break
+    if not merged.exists():
+        merged.write_text("")
+    with merged.open() as fh:
+        return demultiplex(fh, tags, out_paths)
+
+
+@profiling.traced("foldseek_batch_search")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Search several hosts against phageDB in one Foldseek run and split the hits per host.")
+    p.add_argument("--host-ids", required=True, help="Comma-separated host_ids in this batch.")
+    p.add_argument("--host-struct-dir", required=True, help="Directory containing one structure folder per host_id.")
+    p.add_argument("--phage-db", required=True, help="Foldseek phage library DB prefix.")
+    p.add_argument("--work-dir", required=True, help="Scratch directory for the merged query/result DBs.")
+    p.add_argument("--results-dir", required=True, help="Per-host hits are written to <results-dir>/<host_id>/hits.tsv.")
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument("--search-args", default="", help="Extra arguments passed to `foldseek search`.")
+    args = p.parse_args()
+
+    host_ids = [x.strip() for x in args.host_ids.split(",") if x.strip()]
+    if not host_ids:
+        raise SystemExit("--host-ids is empty.")
+    struct_dir = Path(args.host_struct_dir)
+    host_dirs = {hid: struct_dir / hid for hid in host_ids}
+    missing = [hid for hid, d in host_dirs.items() if not d.is_dir()]
+    if missing:
+        raise SystemExit(f"Missing host structure folders: {', '.join(missing)}")
+    results_dir = Path(args.results_dir)
+    out_paths = {hid: results_dir / hid / "hits.tsv" for hid in host_ids}
+
+    profiling.label(hosts=len(host_ids))
+    counts = run_batch_search(host_dirs, Path(args.phage_db), Path(args.work_dir), out_paths,
+                              args.threads, args.search_args.split())
+    for n in counts.values():
+        profiling.observe("hits_per_host", n)
+    print(f"foldseek batch: {len(host_ids)} hosts, {sum(counts.values())} hits")
+
+
+if __name__ == "__main__":
+    main()
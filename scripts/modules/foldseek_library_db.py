@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Build or extend the Foldseek phage library DB (`phageDB`) with a precomputed search index.
+
+Next to the DB a sidecar `<db>.manifest.json` records a content hash per phage structure folder.
+On re-runs:
+  - unchanged library       -> nothing to do
+  - only new phages         -> createdb on the new folders, concatdbs into phageDB, createindex
+  - changed/removed phages  -> full rebuild (createdb + createindex)
+
+The sidecar is written last, so an interrupted update is redone from scratch next time.
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pm import profiling
+from pm.manifest import select_phage_ids
+from pm.utils import ensure_dir, sha256_files
+
+SIDECAR_FORMAT = 1
+# Sub-databases written by `foldseek createdb` for structure input (amino acids, 3Di, C-alpha, headers).
+SUB_DBS = ("", "_ss", "_ca", "_h")
+
+
+def sidecar_path(db: Path) -> Path:
+    return db.with_name(db.name + ".manifest.json")
+
+
+def folder_hash(folder: Path) -> str:
+    """Hash of a phage structure folder: relative file names plus file contents."""
+    files = sorted(p for p in folder.rglob("*") if p.is_file())
+    digests = sha256_files(files)
+    h = hashlib.sha256()
+    for f in files:
+        h.update(str(f.relative_to(folder)).encode("utf-8"))
+        h.update(b"\0")
+        h.update(digests[str(f)].encode("ascii"))
+    return h.hexdigest()
+
+
+def read_sidecar(db: Path) -> Optional[Dict]:
+    p = sidecar_path(db)
+    if not p.exists() or not db.with_name(db.name + ".dbtype").exists():
+        return None
+    data = json.loads(p.read_text())
+    return data if data.get("format") == SIDECAR_FORMAT else None
+
+
+def write_sidecar(db: Path, phages: Dict[str, str], indexed: bool) -> None:
+    p = sidecar_path(db)
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(json.dumps({"format": SIDECAR_FORMAT, "indexed": indexed, "phages": phages}, indent=2))
+    tmp.replace(p)
+
+
+def foldseek(*args: str) -> None:
+    with profiling.span(f"foldseek_{args[0]}"):
+        subprocess.run(["foldseek", *args], check=True)
+
+
+def db_files(db: Path) -> List[Path]:
+    return [p for p in db.parent.glob(db.name + "*") if p.is_file() and not p.name.endswith(".manifest.json")]
+
+
+def remove_db(db: Path) -> None:
+    for p in db_files(db):
+        p.unlink()
+
+
+def stage(folders: Dict[str, Path], stage_dir: Path) -> Path:
+    """Mirror the selected phage folders into one createdb input directory.
+
+    Folders are recreated and only files are symlinked: createdb's directory walk does not
+    descend into symlinked directories.
+    """
+    if stage_dir.exists():
+        shutil.rmtree(stage_dir)
+    for pid, folder in folders.items():
+        for f in sorted(p for p in folder.rglob("*") if p.is_file()):
+            dest = stage_dir / pid / f.relative_to(folder)
+            ensure_dir(dest.parent)
+            os.symlink(f.resolve(), dest)
+    ensure_dir(stage_dir)
+    return stage_dir
+
+
+def max_key(index_file: Path) -> int:
+    keys = [int(line.split("\t", 1)[0]) for line in index_file.read_text().splitlines() if line.strip()]
+    return max(keys) if keys else -1
+
+
+def merge_lookup(base: Path, delta: Path, merged: Path, key_offset: int) -> None:
+    """Merge `.lookup`/`.source` tables, shifting delta keys the same way concatdbs does."""
+    base_source = base.with_name(base.name + ".source")
+    file_offset = 0
+    if base_source.exists():
+        ids = [int(l.split("\t", 1)[0]) for l in base_source.read_text().splitlines() if l.strip()]
+        file_offset = max(ids) + 1 if ids else 0
+    for suffix, shift in ((".lookup", lambda c: [str(int(c[0]) + key_offset), c[1], str(int(c[2]) + file_offset)]),
+                          (".source", lambda c: [str(int(c[0]) + file_offset), c[1]])):
+        b, d = base.with_name(base.name + suffix), delta.with_name(delta.name + suffix)
+        if not b.exists() or not d.exists():
+            continue
+        lines = b.read_text().splitlines()
+        lines += ["\t".join(shift(l.split("\t"))) for l in d.read_text().splitlines() if l.strip()]
+        merged.with_name(merged.name + suffix).write_text("\n".join(lines) + "\n")
+
+
+@profiling.timed()
+def full_build(db: Path, folders: Dict[str, Path], work: Path) -> None:
+    remove_db(db)
+    foldseek("createdb", str(stage(folders, work / "stage")), str(db))
+
+
+@profiling.timed()
+def delta_build(db: Path, folders: Dict[str, Path], work: Path) -> None:
+    delta = work / "deltaDB"
+    merged = work / "mergedDB"
+    remove_db(delta)
+    remove_db(merged)
+    foldseek("createdb", str(stage(folders, work / "stage")), str(delta))
+    offset = max_key(db.with_name(db.name + ".index")) + 1
+    for sub in SUB_DBS:
+        a, b = db.with_name(db.name + sub), delta.with_name(delta.name + sub)
+        if a.with_name(a.name + ".dbtype").exists():
+            foldseek("concatdbs", str(a), str(b), str(merged.with_name(merged.name + sub)))
+    merge_lookup(db, delta, merged, offset)
+    # Swap the merged DB in under the library name; the old precomputed index is invalid now.
+    remove_db(db)
+    for p in db_files(merged):
+        p.replace(db.with_name(db.name + p.name[len(merged.name):]))
+    remove_db(delta)
+
+
+@profiling.traced("foldseek_library_db")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Build or incrementally extend the indexed Foldseek phage library DB.")
+    p.add_argument("--struct-dir", required=True, help="Directory with one structure folder per phage_id.")
+    p.add_argument("--phage-ids", default=None, help="Comma-separated phage_ids in the library.")
+    p.add_argument("--manifest", default=None, help="Phage manifest TSV (the whole library) instead of --phage-ids.")
+    p.add_argument("--db", required=True, help="DB prefix, e.g. cache/foldseek/db/phageDB.")
+    p.add_argument("--threads", type=int, default=1)
+    p.add_argument("--no-index", action="store_true", help="Skip `foldseek createindex`.")
+    p.add_argument("--rebuild", action="store_true", help="Ignore the sidecar and rebuild the whole DB.")
+    args = p.parse_args()
+    if not args.phage_ids and not args.manifest:
+        raise SystemExit("--phage-ids or --manifest is required.")
+
+    db = Path(args.db)
+    ensure_dir(db.parent)
+    work = ensure_dir(db.parent / f"{db.name}.work")
+    struct_dir = Path(args.struct_dir)
+    phage_ids = select_phage_ids(args.phage_ids, args.manifest)
+    folders = {pid: struct_dir / pid for pid in phage_ids}
+    missing = [pid for pid, d in folders.items() if not d.is_dir()]
+    if missing:
+        raise SystemExit(f"Missing phage structure folders: {', '.join(missing)}")
+    with profiling.span("hash_folders"):
+        hashes = {pid: folder_hash(d) for pid, d in folders.items()}
+    want_index = not args.no_index
+
+    sidecar = None if args.rebuild else read_sidecar(db)
+    known = (sidecar or {}).get("phages", {})
+    stale = [pid for pid in known if hashes.get(pid) != known[pid]]
+    added = [pid for pid in phage_ids if pid not in known]
+    profiling.count("phages", len(phage_ids))
+    profiling.count("phages_added", len(added))
+    profiling.count("phages_stale", len(stale))
+
+    if sidecar is not None and not stale and not added and sidecar.get("indexed") == want_index:
+        print(f"phageDB up to date ({len(phage_ids)} phages)")
+        return
+
+    # Drop the sidecar before touching the DB so an interrupted update cannot be mistaken for a good one.
+    sidecar_path(db).unlink(missing_ok=True)
+    if sidecar is None or stale:
+        mode = "rebuilt"
+        full_build(db, folders, work)
+    elif added:
+        mode = "extended"
+        delta_build(db, {pid: folders[pid] for pid in added}, work)
+    else:
+        mode = "reindexed"
+
+    for p in db.parent.glob(db.name + ".idx*"):
+        p.unlink()
+    if want_index:
+        foldseek("createindex", str(db), str(work / "tmp"), "--threads", str(args.threads))
+    write_sidecar(db, hashes, want_index)
+    shutil.rmtree(work, ignore_errors=True)
+    print(f"phageDB {mode}: {len(phage_ids)} phages ({len(added)} new, {len(stale)} changed/removed)")
+
+
+if __name__ == "__main__":
+    main()
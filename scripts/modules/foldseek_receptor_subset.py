@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Build receptor-focused structure subsets for the Foldseek search.
+
+  --mode phages : one folder per phage_id with only tail fiber / tailspike / RBP-like structures
+  --mode host   : one host folder with only outer-membrane / surface structures
+
+Kept structures are symlinked into --out-dir; a JSON report lists what was excluded so that
+structural/meta.json can record the reduction.
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict
+
+from pm import profiling
+from pm.manifest import select_phage_ids
+from pm.receptors import (
+    HOST_SURFACE_KEYWORDS,
+    PHAGE_RECEPTOR_KEYWORDS,
+    fasta_surface_ids,
+    gff_receptor_ids,
+    interpro_receptor_ids,
+    keyword_pattern,
+    select_structures,
+    selection_report,
+)
+from pm.utils import ensure_dir
+
+
+def link_selection(selection: Dict[str, object], src_dir: Path, dest_dir: Path) -> None:
+    if dest_dir.exists():
+        shutil.rmtree(dest_dir)
+    ensure_dir(dest_dir)
+    for f in selection["kept"]:
+        dest = dest_dir / f.relative_to(src_dir)
+        ensure_dir(dest.parent)
+        os.symlink(f.resolve(), dest)
+
+
+@profiling.timed()
+def subset_phages(args: argparse.Namespace) -> Dict[str, object]:
+    pattern = keyword_pattern(PHAGE_RECEPTOR_KEYWORDS)
+    struct_dir, out_dir = Path(args.struct_dir), Path(args.out_dir)
+    phage_ids = select_phage_ids(args.phage_ids, args.manifest)
+    report: Dict[str, object] = {}
+    for pid in phage_ids:
+        ids = gff_receptor_ids(Path(args.gff_dir) / pid / f"{pid}.gff", pattern)
+        sources = ["prokka_gff"]
+        if args.rbp_dir:
+            ids |= interpro_receptor_ids(Path(args.rbp_dir) / "interpro" / f"{pid}_interpro.tsv", pattern)
+            sources.append("predict_rbps_interpro")
+        with profiling.capture(phage_id=pid):
+            selection = select_structures(struct_dir / pid, ids)
+            link_selection(selection, struct_dir / pid, out_dir / pid)
+        report[pid] = selection_report(selection, "+".join(sources))
+    return report
+
+
+@profiling.timed()
+def subset_host(args: argparse.Namespace) -> Dict[str, object]:
+    pattern = keyword_pattern(HOST_SURFACE_KEYWORDS)
+    struct_dir = Path(args.struct_dir) / args.host_id
+    ids = fasta_surface_ids(Path(args.host_faa), pattern)
+    selection = select_structures(struct_dir, ids)
+    link_selection(selection, struct_dir, Path(args.out_dir))
+    return {args.host_id: selection_report(selection, "proteome_headers")}
+
+
+@profiling.traced("foldseek_receptor_subset")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Receptor-focused structure subsets for the structural PPI search.")
+    p.add_argument("--mode", choices=["phages", "host"], required=True)
+    p.add_argument("--struct-dir", required=True, help="Directory with one structure folder per phage_id/host_id.")
+    p.add_argument("--out-dir", required=True, help="Reduced structure folder(s) are written here (symlinks).")
+    p.add_argument("--report", required=True, help="JSON report of kept/excluded structures.")
+    p.add_argument("--phage-ids", default=None, help="Comma-separated phage_ids (--mode phages).")
+    p.add_argument("--manifest", default=None, help="Phage manifest TSV instead of --phage-ids (--mode phages).")
+    p.add_argument("--gff-dir", default=None, help="Prokka annotations, <gff-dir>/<phage_id>/<phage_id>.gff (--mode phages).")
+    p.add_argument("--rbp-dir", default=None, help="predict_rbps.py output directory (optional, --mode phages).")
+    p.add_argument("--host-id", default=None, help="Host to reduce (--mode host).")
+    p.add_argument("--host-faa", default=None, help="Host proteome FASTA with product descriptions (--mode host).")
+    args = p.parse_args()
+    profiling.label(mode=args.mode, host_id=args.host_id)
+
+    if args.mode == "phages":
+        if not (args.phage_ids or args.manifest) or not args.gff_dir:
+            raise SystemExit("--phage-ids (or --manifest) and --gff-dir are required with --mode phages.")
+        report = subset_phages(args)
+    else:
+        if not args.host_id or not args.host_faa:
+            raise SystemExit("--host-id and --host-faa are required with --mode host.")
+        report = subset_host(args)
+
+    out = Path(args.report)
+    ensure_dir(out.parent)
+    out.write_text(json.dumps({"mode": args.mode, "entries": report}, indent=2))
+    kept = sum(r["n_kept"] for r in report.values())
+    total = sum(r["n_total"] for r in report.values())
+    profiling.count("structures_kept", kept)
+    profiling.count("structures_total", total)
+    print(f"receptor subset ({args.mode}): kept {kept}/{total} structures")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,11 +13,18 @@ if _REPO_ROOT:
     sys.path.insert(0, str(_REPO_ROOT))
 
 import argparse
+import heapq
 import json
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from pm.utils import ensure_dir, stable_float_0_1
+from pm import profiling
+from pm.cas import CachedPayloads, code_version, open_cache
+from pm.manifest import select_phage_ids
+from pm.utils import ensure_dir, sha256_file, stable_float_0_1
+
+CODE_SOURCES = (Path(__file__), Path(__file__).resolve().parents[2] / "pm" / "hit_store.py")
 
 
 def infer_phage_id(target_id: str) -> str:
@@ -31,25 +38,32 @@ def infer_phage_id(target_id: str) -> str:
     return target_id.split()[0]
 
 
-def parse_hits(tsv_path: Path) -> List[Dict[str, str]]:
-    rows: List[Dict[str, str]] = []
-    for line in tsv_path.read_text().splitlines():
+def iter_hits(lines: Iterable[str]) -> Iterator[Tuple[str, str, str, str, Optional[str], Optional[str]]]:
+    """Yield (query, target, evalue, bitscore, qcov, tcov) per hit line without materialising the file."""
+    for line in lines:
+        line = line.rstrip("\r\n")
         if not line.strip() or line.startswith("#"):
             continue
         parts = line.split("\t")
         # Expected format: query, target, evalue, bitscore, qcov, tcov (others tolerated)
         if len(parts) < 4:
             continue
-        row = {
-            "query": parts[0],
-            "target": parts[1],
-            "evalue": parts[2],
-            "bitscore": parts[3],
-            "qcov": parts[4] if len(parts) > 4 else None,
-            "tcov": parts[5] if len(parts) > 5 else None,
-        }
-        rows.append(row)
-    return rows
+        yield (
+            parts[0],
+            parts[1],
+            parts[2],
+            parts[3],
+            parts[4] if len(parts) > 4 else None,
+            parts[5] if len(parts) > 5 else None,
+        )
+
+
+def parse_hits(tsv_path: Path) -> List[Dict[str, str]]:
+    with tsv_path.open() as f:
+        return [
+            {"query": q, "target": t, "evalue": e, "bitscore": b, "qcov": qc, "tcov": tc}
+            for q, t, e, b, qc, tc in iter_hits(f)
+        ]
 
 
 def safe_float(x: Optional[str]) -> Optional[float]:
@@ -61,108 +75,328 @@ def safe_float(x: Optional[str]) -> Optional[float]:
         return None
 
 
+TOP_N = 5
+# Sort key used for hits without a parseable e-value (they rank after every real hit).
+MISSING_EVALUE_KEY = 1e9
+
+
+class PhageAccumulator:
+    """Running min/max/mean accumulators plus a bounded top-N heap for one phage."""
+
+    __slots__ = ("hit_count", "best_evalue", "best_bitscore", "qcov_sum", "qcov_n", "tcov_sum", "tcov_n", "top")
+
+    def __init__(self) -> None:
+        self.hit_count = 0
+        self.best_evalue: Optional[float] = None
+        self.best_bitscore: Optional[float] = None
+        self.qcov_sum = 0.0
+        self.qcov_n = 0
+        self.tcov_sum = 0.0
+        self.tcov_n = 0
+        # Max-heap on (key, seq) via negation; seq keeps the original stable-sort tie order.
+        self.top: List[Tuple[float, int, Dict[str, object]]] = []
+
+    def add(self, seq: int, query: str, target: str, evalue: Optional[float], bitscore: Optional[float],
+            qcov: Optional[float], tcov: Optional[float]) -> None:
+        self.hit_count += 1
+        if evalue is not None and (self.best_evalue is None or evalue < self.best_evalue):
+            self.best_evalue = evalue
+        if bitscore is not None and (self.best_bitscore is None or bitscore > self.best_bitscore):
+            self.best_bitscore = bitscore
+        if qcov is not None:
+            self.qcov_sum += qcov
+            self.qcov_n += 1
+        if tcov is not None:
+            self.tcov_sum += tcov
+            self.tcov_n += 1
+        key = evalue if evalue is not None else MISSING_EVALUE_KEY
+        if len(self.top) < TOP_N or (-key, -seq) > (self.top[0][0], self.top[0][1]):
+            item = (-key, -seq, {
+                "query": query,
+                "target": target,
+                "evalue": evalue,
+                "bitscore": bitscore,
+                "qcov": qcov,
+                "tcov": tcov,
+            })
+            if len(self.top) < TOP_N:
+                heapq.heappush(self.top, item)
+            else:
+                heapq.heapreplace(self.top, item)
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "hit_count": self.hit_count,
+            "best_evalue": self.best_evalue,
+            "best_bitscore": self.best_bitscore,
+            "qcov_mean": self.qcov_sum / self.qcov_n if self.qcov_n else None,
+            "tcov_mean": self.tcov_sum / self.tcov_n if self.tcov_n else None,
+            "top_targets": [row for _, _, row in sorted(self.top, key=lambda t: (-t[0], -t[1]))],
+        }
+
+
+@profiling.timed()
+def aggregate_hits(lines: Iterable[str], phage_ids: Optional[Set[str]] = None,
+                   evalue_max: Optional[float] = None, min_qcov: Optional[float] = None,
+                   min_tcov: Optional[float] = None, store=None) -> Dict[str, PhageAccumulator]:
+    """Single pass over hit lines; memory scales with the number of phages, not hits.
+
+    Every parsed row is also appended to `store` (a pm.hit_store.HitStoreWriter) when given,
+    before any phage/e-value/coverage filtering. When profiling, time is split between parsing
+    (reading, splitting and converting a line) and aggregation (store, filters, accumulators).
+    """
+    acc: Dict[str, PhageAccumulator] = {}
+    timing = profiling.enabled()
+    clock = time.perf_counter
+    parse_s = aggregate_s = 0.0
+    seq = -1
+    t = clock() if timing else 0.0
+    for seq, (query, target, evalue, bitscore, qcov, tcov) in enumerate(iter_hits(lines)):
+        pid = infer_phage_id(target)
+        e, b, qc, tc = safe_float(evalue), safe_float(bitscore), safe_float(qcov), safe_float(tcov)
+        if timing:
+            t1 = clock()
+            parse_s += t1 - t
+            t = t1
+        try:
+            if store is not None:
+                store.add(query, target, pid, e, b, qc, tc)
+            if phage_ids is not None and pid not in phage_ids:
+                continue
+            if evalue_max is not None and (e is None or not e <= evalue_max):
+                continue
+            if min_qcov is not None and (qc is None or not qc >= min_qcov):
+                continue
+            if min_tcov is not None and (tc is None or not tc >= min_tcov):
+                continue
+            a = acc.get(pid)
+            if a is None:
+                a = acc[pid] = PhageAccumulator()
+            a.add(seq, query, target, e, b, qc, tc)
+        finally:
+            if timing:
+                t1 = clock()
+                aggregate_s += t1 - t
+                t = t1
+    if timing:
+        parse_s += clock() - t
+        profiling.record("parse", parse_s, seq + 1)
+        profiling.record("aggregate", aggregate_s, seq + 1)
+        profiling.count("hits_read", seq + 1)
+        for a in acc.values():
+            profiling.observe("hits_per_phage", a.hit_count)
+    return acc
+
+
+@profiling.timed()
+def write_outputs(host_id: str, phage_ids: List[str], payloads: Dict[str, Dict[str, object]],
+                  out_dir: Optional[Path], store_dir: Optional[Path]) -> None:
+    """Per-pair JSON files in `out_dir`, or one binary feature store (pm.feature_store) in `store_dir`."""
+    if store_dir is not None:
+        from pm.feature_store import FeatureStoreWriter
+
+        writer = FeatureStoreWriter("structural", host_id, phage_ids)
+        for pid in phage_ids:
+            writer.add(payloads[pid])
+        writer.save(store_dir)
+        return
+    for pid in phage_ids:
+        (out_dir / f"{pid}.json").write_text(json.dumps(payloads[pid], indent=2))
+
+
+def mock_payload(host_id: str, phage_id: str) -> Dict[str, object]:
+    # Deterministic plausible mock
+    base = stable_float_0_1(f"structural::{host_id}::{phage_id}")
+    hit_count = int(base * 6)  # 0..5
+    best_evalue = 10 ** (-(2 + int(base * 6))) if hit_count > 0 else None
+    return {
+        "host_id": host_id,
+        "phage_id": phage_id,
+        "hit_count": hit_count,
+        "best_evalue": best_evalue,
+        "best_bitscore": 50.0 + 200.0 * base if hit_count > 0 else None,
+        "qcov_mean": 0.1 + 0.8 * base if hit_count > 0 else None,
+        "tcov_mean": 0.1 + 0.8 * base if hit_count > 0 else None,
+        "top_targets": [],
+        "tool": "mock",
+        "tool_version": None,
+        "status": "mocked",
+        "reason": None,
+    }
+
+
+def summary_payloads(host_id: str, phage_ids: List[str], summaries: Dict[str, Dict[str, object]],
+                     tool_version: Optional[str]) -> Dict[str, Dict[str, object]]:
+    payloads = {}
+    for pid in phage_ids:
+        payloads[pid] = {
+            "host_id": host_id,
+            "phage_id": pid,
+            **summaries[pid],
+            "tool": "foldseek",
+            "tool_version": tool_version,
+            "status": "ok",
+            "reason": None,
+        }
+    return payloads
+
+
+def unavailable_payloads(host_id: str, phage_ids: List[str], tool_version: Optional[str],
+                         reason: str) -> Dict[str, Dict[str, object]]:
+    payloads = {}
+    for pid in phage_ids:
+        payloads[pid] = {
+            "host_id": host_id,
+            "phage_id": pid,
+            "hit_count": 0,
+            "best_evalue": None,
+            "best_bitscore": None,
+            "qcov_mean": None,
+            "tcov_mean": None,
+            "top_targets": [],
+            "tool": "foldseek",
+            "tool_version": tool_version,
+            "status": "unavailable",
+            "reason": reason,
+        }
+    return payloads
+
+
+def structural_cache(host_id: str, phage_ids: List[str], hits_path: Optional[Path], filters: Dict[str, object],
+                     tool_version: Optional[str]) -> CachedPayloads:
+    """Feature-cache keys (pm.cas) per pair: hits file (TSV or hit store) hash, filters, foldseek version.
+
+    Streamed hits (stdin) have no file to hash and are not cached.
+    """
+    cache = open_cache() if hits_path is not None else None
+    cached = CachedPayloads(cache, "structural", code_version(*CODE_SOURCES) if cache else "", filters,
+                            {"foldseek": tool_version})
+    if cache is None:
+        return cached
+    try:
+        hits_sha: Optional[str] = sha256_file(hits_path)
+    except OSError:
+        return cached
+    for pid in phage_ids:
+        cached.add(pid, {"host_id": host_id, "phage_id": pid}, {"hits": hits_sha})
+    return cached
+
+
+def build_store(hits_tsv: Optional[str], store_path: str) -> None:
+    """Convert hits (TSV file, or stdin when hits_tsv is None) into a columnar store only."""
+    from pm.hit_store import HitStoreWriter
+
+    store = HitStoreWriter()
+    if hits_tsv:
+        with Path(hits_tsv).open() as f:
+            aggregate_hits(f, set(), store=store)
+    else:
+        aggregate_hits(sys.stdin, set(), store=store)
+    store.save(store_path)
+
+
+@profiling.traced("foldseek_summarise")
 def main() -> None:
     p = argparse.ArgumentParser(description="Summarise Foldseek hits into per host×phage structural.json features.")
     p.add_argument("--host-id", required=True)
-    p.add_argument("--phage-ids", required=True, help="Comma-separated list of phage_ids to emit.")
+    p.add_argument("--phage-ids", default=None, help="Comma-separated list of phage_ids to emit.")
+    p.add_argument("--manifest", default=None, help="Emit every phage in this manifest instead of --phage-ids.")
     p.add_argument("--hits-tsv", required=False, help="Foldseek hits TSV (query\ttarget\tevalue\tbitscore[\tqcov\ttcov...])")
-    p.add_argument("--out-dir", required=True)
+    p.add_argument("--stdin", action="store_true",
+                   help="Read hits from stdin (e.g. piped from `foldseek convertalis`) instead of --hits-tsv.")
+    p.add_argument("--hit-store", default=None,
+                   help="Also write all ingested hits to this columnar .npz store.")
+    p.add_argument("--from-store", default=None,
+                   help="Summarise from a columnar .npz hit store (vectorized) instead of TSV/stdin.")
+    p.add_argument("--evalue-max", type=float, default=None, help="Only count hits with evalue <= this.")
+    p.add_argument("--min-qcov", type=float, default=None)
+    p.add_argument("--min-tcov", type=float, default=None)
+    p.add_argument("--out-dir", required=False, default=None,
+                   help="Directory for <phage_id>.json (optional when only building --hit-store).")
+    p.add_argument("--store-dir", default=None,
+                   help="Write one binary feature store (pm.feature_store) here instead of <phage_id>.json files.")
     p.add_argument("--tool-version", default=None)
     p.add_argument("--mock", action="store_true")
     args = p.parse_args()
 
-    out_dir = ensure_dir(args.out_dir)
-    phage_ids = [p.strip() for p in args.phage_ids.split(",") if p.strip()]
+    if not args.phage_ids and not args.manifest:
+        raise SystemExit("--phage-ids or --manifest is required.")
+    phage_ids = select_phage_ids(args.phage_ids, args.manifest)
+    profiling.label(host_id=args.host_id)
+    profiling.count("phages", len(phage_ids))
+    filters = {"evalue_max": args.evalue_max, "min_qcov": args.min_qcov, "min_tcov": args.min_tcov}
 
-    if args.mock or not args.hits_tsv:
-        for pid in phage_ids:
-            # Deterministic plausible mock
-            base = stable_float_0_1(f"structural::{args.host_id}::{pid}")
-            hit_count = int(base * 6)  # 0..5
-            best_evalue = 10 ** (-(2 + int(base * 6))) if hit_count > 0 else None
-            payload = {
-                "host_id": args.host_id,
-                "phage_id": pid,
-                "hit_count": hit_count,
-                "best_evalue": best_evalue,
-                "best_bitscore": 50.0 + 200.0 * base if hit_count > 0 else None,
-                "qcov_mean": 0.1 + 0.8 * base if hit_count > 0 else None,
-                "tcov_mean": 0.1 + 0.8 * base if hit_count > 0 else None,
-                "top_targets": [],
-                "tool": "mock",
-                "tool_version": None,
-                "status": "mocked",
-                "reason": None,
-            }
-            (out_dir / f"{pid}.json").write_text(json.dumps(payload, indent=2))
+    if args.out_dir is None and args.store_dir is None:
+        if not args.hit_store or not (args.hits_tsv or args.stdin):
+            raise SystemExit("--out-dir (or --store-dir) is required unless building a --hit-store from --hits-tsv/--stdin.")
+        build_store(args.hits_tsv, args.hit_store)
         return
 
-    tsv = Path(args.hits_tsv)
-    if not tsv.exists():
-        for pid in phage_ids:
-            payload = {
-                "host_id": args.host_id,
-                "phage_id": pid,
-                "hit_count": 0,
-                "best_evalue": None,
-                "best_bitscore": None,
-                "qcov_mean": None,
-                "tcov_mean": None,
-                "top_targets": [],
-                "tool": "foldseek",
-                "tool_version": args.tool_version,
-                "status": "unavailable",
-                "reason": f"missing hits file: {tsv}",
-            }
-            (out_dir / f"{pid}.json").write_text(json.dumps(payload, indent=2))
+    out_dir = ensure_dir(args.out_dir) if args.out_dir else None
+    store_dir = Path(args.store_dir) if args.store_dir else None
+
+    if args.mock or not (args.hits_tsv or args.stdin or args.from_store):
+        payloads = {pid: mock_payload(args.host_id, pid) for pid in phage_ids}
+        write_outputs(args.host_id, phage_ids, payloads, out_dir, store_dir)
         return
 
-    hits = parse_hits(tsv)
+    if args.from_store:
+        store_path = Path(args.from_store)
+        if not store_path.exists():
+            write_outputs(args.host_id, phage_ids, unavailable_payloads(
+                args.host_id, phage_ids, args.tool_version, f"missing hit store: {store_path}"), out_dir, store_dir)
+            return
+        from pm.hit_store import HitStore
 
-    grouped: Dict[str, List[Dict[str, str]]] = {}
-    for row in hits:
-        pid = infer_phage_id(row["target"])
-        grouped.setdefault(pid, []).append(row)
+        with profiling.span("feature_cache"):
+            cached = structural_cache(args.host_id, phage_ids, store_path, filters, args.tool_version)
+            payloads = cached.lookup()
+        todo = cached.missing(phage_ids)
+        profiling.count("phages_computed", len(todo))
+        if todo:
+            with profiling.span("hit_store_summarise"):
+                summaries = HitStore(store_path).summarise(todo, **filters)
+            fresh = summary_payloads(args.host_id, todo, summaries, args.tool_version)
+            cached.store(fresh)
+            payloads.update(fresh)
+        write_outputs(args.host_id, phage_ids, payloads, out_dir, store_dir)
+        return
 
-    for pid in phage_ids:
-        rows = grouped.get(pid, [])
-        evalues = [safe_float(r["evalue"]) for r in rows]
-        bits = [safe_float(r["bitscore"]) for r in rows]
-        qcovs = [safe_float(r.get("qcov")) for r in rows]
-        tcovs = [safe_float(r.get("tcov")) for r in rows]
-
-        evalues_f = [v for v in evalues if v is not None]
-        bits_f = [v for v in bits if v is not None]
-        qcovs_f = [v for v in qcovs if v is not None]
-        tcovs_f = [v for v in tcovs if v is not None]
-
-        # Sort by best evalue
-        top = []
-        for r in sorted(rows, key=lambda r: safe_float(r["evalue"]) if safe_float(r["evalue"]) is not None else 1e9)[:5]:
-            top.append({
-                "query": r["query"],
-                "target": r["target"],
-                "evalue": safe_float(r["evalue"]),
-                "bitscore": safe_float(r["bitscore"]),
-                "qcov": safe_float(r.get("qcov")),
-                "tcov": safe_float(r.get("tcov")),
-            })
+    store = None
+    if args.hit_store:
+        from pm.hit_store import HitStoreWriter
 
-        payload = {
-            "host_id": args.host_id,
-            "phage_id": pid,
-            "hit_count": len(rows),
-            "best_evalue": min(evalues_f) if evalues_f else None,
-            "best_bitscore": max(bits_f) if bits_f else None,
-            "qcov_mean": sum(qcovs_f) / len(qcovs_f) if qcovs_f else None,
-            "tcov_mean": sum(tcovs_f) / len(tcovs_f) if tcovs_f else None,
-            "top_targets": top,
-            "tool": "foldseek",
-            "tool_version": args.tool_version,
-            "status": "ok",
-            "reason": None,
-        }
-        (out_dir / f"{pid}.json").write_text(json.dumps(payload, indent=2))
+        store = HitStoreWriter()
+
+    # A hit store being built needs every hit, so the cache is only consulted without one.
+    with profiling.span("feature_cache"):
+        cached = structural_cache(args.host_id, phage_ids,
+                                  None if args.stdin or store is not None else Path(args.hits_tsv),
+                                  filters, args.tool_version)
+        payloads = cached.lookup()
+    todo = cached.missing(phage_ids)
+    profiling.count("phages_computed", len(todo))
+    if args.stdin:
+        acc = aggregate_hits(sys.stdin, set(todo), store=store, **filters)
+    elif todo:
+        tsv = Path(args.hits_tsv)
+        if not tsv.exists():
+            write_outputs(args.host_id, phage_ids, unavailable_payloads(
+                args.host_id, phage_ids, args.tool_version, f"missing hits file: {tsv}"), out_dir, store_dir)
+            return
+        with tsv.open() as f:
+            acc = aggregate_hits(f, set(todo), store=store, **filters)
+    else:
+        acc = {}
+
+    if store is not None:
+        with profiling.span("hit_store_save"):
+            store.save(args.hit_store)
+    summaries = {pid: (acc.get(pid) or PhageAccumulator()).summary() for pid in todo}
+    fresh = summary_payloads(args.host_id, todo, summaries, args.tool_version)
+    cached.store(fresh)
+    payloads.update(fresh)
+    write_outputs(args.host_id, phage_ids, payloads, out_dir, store_dir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+from pathlib import Path
+
+from pm import profiling
+from pm.sketching import sketch_many, write_signature
+from pm.manifest import load_manifest
+
+
+def parse_ksizes(value: str) -> list[int]:
+    return sorted({int(k) for k in value.split(",") if k.strip()})
+
+
+@profiling.traced("fracminhash_sketch")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Native multi-k FracMinHash sketcher (sourmash-compatible .sig output).")
+    p.add_argument("--fasta", default=None, help="Sketch a single genome FASTA.")
+    p.add_argument("--out", default=None, help="Output .sig for --fasta.")
+    p.add_argument("--manifest", default=None, help="Sketch every row of a manifest TSV instead.")
+    p.add_argument("--id-col", default="phage_id")
+    p.add_argument("--fasta-col", default="fasta")
+    p.add_argument("--out-dir", default=None, help="Output directory for <id>.sig (manifest mode).")
+    p.add_argument("--ksizes", required=True, help="Comma-separated ksizes, e.g. 21,31,51.")
+    p.add_argument("--scaled", type=int, required=True)
+    p.add_argument("--workers", type=int, default=1, help="Process pool size (manifest mode).")
+    args = p.parse_args()
+
+    ksizes = parse_ksizes(args.ksizes)
+
+    if args.manifest:
+        if not args.out_dir:
+            raise SystemExit("--out-dir is required with --manifest.")
+        rows = load_manifest(args.manifest, args.id_col, (args.fasta_col,)).rows
+        out_dir = Path(args.out_dir)
+        jobs = [(r[args.fasta_col], out_dir / f"{r[args.id_col]}.sig") for r in rows]
+        with profiling.span("sketch_many"):
+            done = sketch_many(jobs, ksizes, args.scaled, workers=args.workers)
+        profiling.count("genomes", len(done))
+        print(f"sketched {len(done)} genomes (k={','.join(map(str, ksizes))}, scaled={args.scaled})")
+        return
+
+    if not args.fasta or not args.out:
+        raise SystemExit("--fasta and --out are required unless --manifest is set.")
+    profiling.label(genome=Path(args.out).stem)
+    with profiling.span("write_signature"):
+        write_signature(args.fasta, args.out, ksizes, args.scaled)
+
+
+if __name__ == "__main__":
+    main()
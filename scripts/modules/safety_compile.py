@@ -14,115 +14,261 @@ if _REPO_ROOT:
 
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List
+from typing import Any, Dict, List, Optional
 
-from pm.utils import ensure_dir, stable_float_0_1
+import yaml
+
+from pm import profiling
+from pm.cas import CachedPayloads, code_version, open_cache
+from pm.markers import MarkerScanner, load_scanner
+from pm.manifest import load_phages
+from pm.utils import ensure_dir, sha256_file, sha256_files, stable_float_0_1
+
+CODE_SOURCES = (Path(__file__), Path(__file__).resolve().parents[2] / "pm" / "markers.py")
 
 
 def count_abricate_hits(tsv: Path) -> int:
     if not tsv.exists():
         return 0
-    lines = [l for l in tsv.read_text().splitlines() if l.strip()]
-    if not lines:
-        return 0
     # Abricate TSV usually starts with a header line beginning with '#FILE' or 'FILE'
-    data = [l for l in lines if not l.startswith("#") and not l.lower().startswith("file\t")]
-    return len(data)
+    n = 0
+    with tsv.open() as f:
+        for line in f:
+            if not line.strip() or line.startswith("#") or line.lower().startswith("file\t"):
+                continue
+            n += 1
+    return n
 
 
-def parse_gff_for_flags(gff: Path) -> tuple[Optional[int], bool]:
+def scan_gff_markers(gff: Path, scanner: MarkerScanner) -> Optional[Dict[str, Any]]:
     if not gff or not gff.exists():
-        return None, False
-    trna = 0
-    integrase_like = False
-    for line in gff.read_text().splitlines():
-        if not line.strip() or line.startswith("#"):
-            continue
-        parts = line.split("\t")
-        if len(parts) < 9:
-            continue
-        ftype = parts[2]
-        attrs = parts[8].lower()
-        if ftype.lower() == "trna":
-            trna += 1
-        # conservative keyword scan
-        if "integrase" in attrs or "site-specific recombinase" in attrs:
-            integrase_like = True
-    return trna, integrase_like
-
+        return None
+    return scanner.scan_gff_file(gff)
 
-def main() -> None:
-    p = argparse.ArgumentParser(description="Compile safety feature (abricate + lysogeny flags) for a phage.")
-    p.add_argument("--phage-id", required=True)
-    p.add_argument("--out", required=True)
-    p.add_argument("--abricate-tsv", default=None)
-    p.add_argument("--gff", default=None)
-    p.add_argument("--abricate-version", default=None)
-    p.add_argument("--mock", action="store_true")
-    args = p.parse_args()
 
-    out = Path(args.out)
-    ensure_dir(out.parent)
+def mock_payload(phage_id: str) -> Dict[str, Any]:
+    base = stable_float_0_1(f"safety::{phage_id}")
+    vfdb_hits = int(base * 3)  # 0..2
+    integrase_like = base > 0.6
+    trna_count = int(base * 2)  # 0..1
+    flags: List[str] = []
+    if vfdb_hits > 0:
+        flags.append("vfdb_hit")
+    if integrase_like:
+        flags.append("possible_temperate")
+    return {
+        "phage_id": phage_id,
+        "vfdb_hits": vfdb_hits,
+        "integrase_like": integrase_like,
+        "tRNA_count": trna_count,
+        "flags": flags,
+        "tool": "mock",
+        "tool_version": None,
+        "status": "mocked",
+        "reason": None,
+    }
 
-    if args.mock:
-        base = stable_float_0_1(f"safety::{args.phage_id}")
-        vfdb_hits = int(base * 3)  # 0..2
-        integrase_like = base > 0.6
-        trna_count = int(base * 2)  # 0..1
-        flags: List[str] = []
-        if vfdb_hits > 0:
-            flags.append("vfdb_hit")
-        if integrase_like:
-            flags.append("possible_temperate")
-        payload = {
-            "phage_id": args.phage_id,
-            "vfdb_hits": vfdb_hits,
-            "integrase_like": integrase_like,
-            "tRNA_count": trna_count,
-            "flags": flags,
-            "tool": "mock",
-            "tool_version": None,
-            "status": "mocked",
-            "reason": None,
-        }
-        out.write_text(json.dumps(payload, indent=2))
-        return
 
+@profiling.timed()
+def safety_payload(phage_id: str, abricate_tsv: Optional[Path], gff: Optional[Path],
+                   abricate_version: Optional[str] = None,
+                   scanner: Optional[MarkerScanner] = None) -> Dict[str, Any]:
+    scanner = scanner or load_scanner()
     vfdb_hits = 0
-    trna_count: Optional[int] = None
-    integrase_like = False
+    scan: Optional[Dict[str, Any]] = None
     reason: Optional[str] = None
     status = "ok"
 
     try:
-        if args.abricate_tsv:
-            vfdb_hits = count_abricate_hits(Path(args.abricate_tsv))
-        if args.gff:
-            trna_count, integrase_like = parse_gff_for_flags(Path(args.gff))
+        if abricate_tsv:
+            vfdb_hits = count_abricate_hits(abricate_tsv)
+        if gff:
+            scan = scan_gff_markers(gff, scanner)
     except Exception as e:
         status = "unavailable"
         reason = f"safety parsing failed: {e}"
 
+    markers = scan["markers"] if scan else {}
+    counts = {name: m["count"] for name, m in markers.items()}
+    integrase_like = counts.get("integrase", 0) > 0
     flags: List[str] = []
     if vfdb_hits > 0:
         flags.append("vfdb_hit")
-    if integrase_like:
+    if scanner.temperate(counts):
         flags.append("possible_temperate")
 
-    payload = {
-        "phage_id": args.phage_id,
+    return {
+        "phage_id": phage_id,
         "vfdb_hits": vfdb_hits,
         "integrase_like": integrase_like,
-        "tRNA_count": trna_count,
+        "tRNA_count": scan["tRNA_count"] if scan else None,
+        "lysogeny_markers": markers,
         "flags": flags,
         "tool": "abricate/prokka",
-        "tool_version": args.abricate_version,
+        "tool_version": abricate_version,
         "status": status,
         "reason": reason,
     }
+
+
+def write_payload(out: Path, payload: Dict[str, Any]) -> None:
     out.write_text(json.dumps(payload, indent=2))
 
 
+def sha256_or_none(path: Path) -> Optional[str]:
+    return sha256_file(path) if path.exists() else None
+
+
+@profiling.timed()
+def safety_meta(rows: List[Dict[str, str]], manifest: Path, abricate_dir: Path, gff_dir: Path,
+                mock: bool, tool_version: Optional[str]) -> Dict[str, Any]:
+    """Same document the workflow's safety_meta rule writes for per-phage runs."""
+    paths = [(r["phage_id"], r["fasta"], str(abricate_dir / f"{r['phage_id']}.tsv"),
+              str(gff_dir / r["phage_id"] / f"{r['phage_id']}.gff")) for r in rows]
+    # One memoized pass (cold files hashed in parallel) instead of a full read per file.
+    hashes = sha256_files(p for entry in paths for p in entry[1:])
+    phage_inputs = []
+    for pid, fasta, abricate, gff in paths:
+        phage_inputs.append({
+            "phage_id": pid,
+            "fasta": {"path": fasta, "sha256": hashes[fasta]},
+            "abricate_tsv": {"path": abricate, "sha256": hashes[abricate]},
+            "gff": {"path": gff, "sha256": hashes[gff]},
+        })
+    return {
+        "module": "safety",
+        "generated_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z"),
+        "test_mode": mock,
+        "tool": "mock" if mock else "abricate/prokka",
+        "tool_version": tool_version,
+        "params": {},
+        "inputs": {
+            "phages": phage_inputs,
+        },
+        "manifest_hashes": {
+            manifest.name: sha256_or_none(manifest),
+        },
+    }
+
+
+@profiling.timed("feature_cache")
+def safety_cache(phage_ids: List[str], abricate_dir: Path, gff_dir: Path, abricate_version: Optional[str],
+                 scanner: MarkerScanner) -> CachedPayloads:
+    """Feature-cache keys (pm.cas) per phage: abricate report and GFF hashes, marker rules, abricate version."""
+    cache = open_cache()
+    cached = CachedPayloads(cache, "safety", code_version(*CODE_SOURCES) if cache else "",
+                            {"markers": scanner.markers, "temperate_rules": scanner.temperate_rules},
+                            {"abricate": abricate_version})
+    if cache is None:
+        return cached
+    paths = {pid: (str(abricate_dir / f"{pid}.tsv"), str(gff_dir / pid / f"{pid}.gff")) for pid in phage_ids}
+    hashes = sha256_files(p for pair in paths.values() for p in pair)
+    for pid, (abricate, gff) in paths.items():
+        cached.add(pid, {"phage_id": pid}, {"abricate_tsv": hashes[abricate], "gff": hashes[gff]})
+    return cached
+
+
+@profiling.timed()
+def run_batch(manifest: Path, out_dir: Path, abricate_dir: Path, gff_dir: Path, workers: int, mock: bool,
+              abricate_version: Optional[str], meta_out: Optional[Path], meta_tool_version: Optional[str],
+              scanner: Optional[MarkerScanner] = None) -> int:
+    """Compile every phage of the manifest in one process; returns the number of phages written.
+
+    Phages whose inputs are unchanged in the feature cache (pm.cas) are written from it.
+    """
+    ensure_dir(out_dir)
+    rows = load_phages(manifest).rows
+    phage_ids = [r["phage_id"] for r in rows]
+    scanner = scanner or load_scanner()
+    cached = None if mock else safety_cache(phage_ids, abricate_dir, gff_dir, abricate_version, scanner)
+    hits = cached.lookup() if cached is not None else {}
+
+    profiling.count("phages_computed", len(phage_ids) - len(hits))
+
+    def compile_one(pid: str) -> Dict[str, Any]:
+        with profiling.capture(phage_id=pid):
+            if mock:
+                payload = mock_payload(pid)
+            else:
+                payload = hits.get(pid) or safety_payload(pid, abricate_dir / f"{pid}.tsv",
+                                                          gff_dir / pid / f"{pid}.gff", abricate_version, scanner)
+            with profiling.span("write_payload"):
+                write_payload(out_dir / f"{pid}.json", payload)
+        return payload
+
+    # Per-phage work is file I/O plus a little parsing, so threads overlap the reads.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        payloads = dict(zip(phage_ids, pool.map(compile_one, phage_ids)))
+    if cached is not None:
+        cached.store(payloads)
+
+    if meta_out:
+        ensure_dir(meta_out.parent)
+        meta = safety_meta(rows, manifest, abricate_dir, gff_dir, mock, meta_tool_version)
+        meta_out.write_text(json.dumps(meta, indent=2))
+    return len(rows)
+
+
+@profiling.traced("safety_compile")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compile safety feature (abricate + lysogeny flags) for a phage.")
+    p.add_argument("--phage-id", default=None)
+    p.add_argument("--out", default=None)
+    p.add_argument("--abricate-tsv", default=None)
+    p.add_argument("--gff", default=None)
+    p.add_argument("--abricate-version", default=None)
+    p.add_argument("--mock", action="store_true")
+    p.add_argument("--config", default=None, help="config.yaml with optional `lysogeny_markers` overrides.")
+    p.add_argument("--markers", default=None,
+                   help="`lysogeny_markers` block as JSON (takes precedence over --config; the workflow passes "
+                        "the markers resolved from its merged config).")
+    p.add_argument("--batch", action="store_true", help="Compile every phage in --manifest in one process.")
+    p.add_argument("--manifest", default=None, help="Phage manifest TSV (batch mode).")
+    p.add_argument("--out-dir", default=None, help="Per-phage <phage_id>.json output directory (batch mode).")
+    p.add_argument("--abricate-dir", default=None, help="Directory of <phage_id>.tsv abricate reports (batch mode).")
+    p.add_argument("--gff-dir", default=None, help="Prokka annotations, <gff-dir>/<phage_id>/<phage_id>.gff (batch mode).")
+    p.add_argument("--workers", type=int, default=4, help="I/O threads (batch mode).")
+    p.add_argument("--meta-out", default=None, help="Also write the module meta.json here (batch mode).")
+    p.add_argument("--meta-tool-version", default=None, help="tool_version recorded in meta.json (batch mode).")
+    args = p.parse_args()
+    profiling.label(phage_id=args.phage_id)
+    if args.markers:
+        scanner = load_scanner({"lysogeny_markers": json.loads(args.markers)})
+    else:
+        scanner = load_scanner(yaml.safe_load(Path(args.config).read_text()) if args.config else None)
+
+    if args.batch:
+        if not args.manifest or not args.out_dir:
+            raise SystemExit("--manifest and --out-dir are required with --batch.")
+        if not args.mock and (not args.abricate_dir or not args.gff_dir):
+            raise SystemExit("--abricate-dir and --gff-dir are required with --batch unless --mock is set.")
+        n = run_batch(Path(args.manifest), Path(args.out_dir), Path(args.abricate_dir or "."),
+                      Path(args.gff_dir or "."), args.workers, args.mock, args.abricate_version,
+                      Path(args.meta_out) if args.meta_out else None, args.meta_tool_version, scanner)
+        print(f"safety compiled for {n} phages")
+        return
+
+    if not args.phage_id or not args.out:
+        raise SystemExit("--phage-id and --out are required unless --batch is set.")
+    out = Path(args.out)
+    ensure_dir(out.parent)
+
+    if args.mock:
+        write_payload(out, mock_payload(args.phage_id))
+        return
+
+    payload = safety_payload(
+        args.phage_id,
+        Path(args.abricate_tsv) if args.abricate_tsv else None,
+        Path(args.gff) if args.gff else None,
+        args.abricate_version,
+        scanner,
+    )
+    write_payload(out, payload)
+
+
 if __name__ == "__main__":
     main()
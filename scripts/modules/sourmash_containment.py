@@ -14,97 +14,238 @@ if _REPO_ROOT:
 
 import argparse
 import json
-import subprocess
 from pathlib import Path
-from typing import Optional
-
-from pm.utils import ensure_dir, stable_float_0_1
-
-
-def run_compare(host_sig: Path, phage_sig: Path, tmp_csv: Path) -> float:
-    cmd = [
-        "sourmash", "compare",
-        "--containment",
-        str(host_sig),
-        str(phage_sig),
-        "--csv", str(tmp_csv),
-    ]
-    subprocess.run(cmd, check=True)
-    lines = tmp_csv.read_text().strip().splitlines()
-    if len(lines) < 3:
-        raise RuntimeError(f"Unexpected sourmash CSV format: {tmp_csv}")
-    row1 = lines[1].split(",")
-    row2 = lines[2].split(",")
-    vals = []
-    for row in (row1, row2):
-        for cell in row[1:]:
-            try:
-                vals.append(float(cell))
-            except ValueError:
-                pass
-    return max(vals) if vals else 0.0
+from typing import Dict, List, Optional
 
+from pm import profiling
+from pm.cas import CachedPayloads, code_version, open_cache
+from pm.manifest import select_phage_ids
+from pm.utils import ensure_dir, sha256_file, sha256_files, stable_float_0_1
 
-def main() -> None:
-    p = argparse.ArgumentParser(description="Compute sourmash containment similarity feature (per host×phage).")
-    p.add_argument("--host-id", required=True)
-    p.add_argument("--phage-id", required=True)
-    p.add_argument("--host-sig", required=False, default=None)
-    p.add_argument("--phage-sig", required=False, default=None)
-    p.add_argument("--out", required=True)
-    p.add_argument("--tool-version", default=None)
-    p.add_argument("--mock", action="store_true")
-    args = p.parse_args()
+CODE_SOURCES = (Path(__file__), Path(__file__).resolve().parents[2] / "pm" / "signatures.py",
+                Path(__file__).resolve().parents[2] / "pm" / "sketch_index.py")
 
-    out = Path(args.out)
-    ensure_dir(out.parent)
-
-    if args.mock:
-        value = stable_float_0_1(f"similarity::{args.host_id}::{args.phage_id}")
-        payload = {
-            "host_id": args.host_id,
-            "phage_id": args.phage_id,
-            "metric": "mock_containment",
-            "value": round(value, 4),
-            "tool": "mock",
-            "tool_version": None,
-            "status": "mocked",
-            "reason": None,
-        }
-        out.write_text(json.dumps(payload, indent=2))
-        return
 
-    if not args.host_sig or not args.phage_sig:
-        raise SystemExit("--host-sig and --phage-sig are required unless --mock is set.")
+def mock_payload(host_id: str, phage_id: str) -> dict:
+    value = stable_float_0_1(f"similarity::{host_id}::{phage_id}")
+    return {
+        "host_id": host_id,
+        "phage_id": phage_id,
+        "metric": "mock_containment",
+        "value": round(value, 4),
+        "tool": "mock",
+        "tool_version": None,
+        "status": "mocked",
+        "reason": None,
+    }
 
-    host_sig = Path(args.host_sig)
-    phage_sig = Path(args.phage_sig)
-    tmp_csv = out.with_suffix(".tmp.csv")
 
-    try:
-        value = run_compare(host_sig, phage_sig, tmp_csv)
-        status = "ok"
-        reason: Optional[str] = None
-    except Exception as e:
-        value = 0.0
-        status = "unavailable"
-        reason = f"sourmash compare failed: {e}"
-    finally:
-        if tmp_csv.exists():
-            tmp_csv.unlink()
-
-    payload = {
-        "host_id": args.host_id,
-        "phage_id": args.phage_id,
+def containment_payload(host_id: str, phage_id: str, value: float, tool_version: Optional[str],
+                        status: str = "ok", reason: Optional[str] = None) -> dict:
+    return {
+        "host_id": host_id,
+        "phage_id": phage_id,
         "metric": "containment",
         "value": float(value),
         "tool": "sourmash",
-        "tool_version": args.tool_version,
+        "tool_version": tool_version,
         "status": status,
         "reason": reason,
     }
-    out.write_text(json.dumps(payload, indent=2))
 
 
+@profiling.timed()
+def write_outputs(host_id: str, phage_ids: List[str], payloads: Dict[str, dict], out_dir: Optional[Path],
+                  store_dir: Optional[Path]) -> None:
+    """Per-pair JSON files in `out_dir`, or one binary feature store (pm.feature_store) in `store_dir`."""
+    if store_dir is not None:
+        from pm.feature_store import FeatureStoreWriter
+
+        writer = FeatureStoreWriter("similarity", host_id, phage_ids)
+        for pid in phage_ids:
+            writer.add(payloads[pid])
+        writer.save(store_dir)
+        return
+    ensure_dir(out_dir)
+    for pid in phage_ids:
+        (out_dir / f"{pid}.json").write_text(json.dumps(payloads[pid], indent=2))
+
+
+@profiling.timed("feature_cache")
+def similarity_cache(host_id: str, host_sig: Optional[Path], phage_sig_dir: Optional[Path], phage_ids: List[str],
+                     ksize: Optional[int], tool_version: Optional[str],
+                     index_dir: Optional[Path] = None, scaled: Optional[int] = None) -> CachedPayloads:
+    """Feature-cache keys (pm.cas) for a batch: host and phage signature hashes, ksize, the scaled
+    pairs are compared at, sourmash version.
+
+    With an index the phage signature hashes come from its catalog and pairs are compared at the
+    index's scaled, so indexed and per-signature runs over the same sketches share entries.
+    Per-signature batches are compared at the coarsest scaled in the batch; they are only cached
+    at an expected `scaled` (see run_batch), so without one nothing is looked up.
+    """
+    cache = open_cache()
+    if index_dir is not None:
+        from pm.sketch_index import catalog_scaled
+
+        scaled = catalog_scaled(index_dir)
+    if scaled is None:
+        cache = None
+    cached = CachedPayloads(cache, "similarity", code_version(*CODE_SOURCES) if cache else "",
+                            {"ksize": ksize, "scaled": scaled}, {"sourmash": tool_version})
+    if cache is None or host_sig is None:
+        return cached
+    try:
+        host_sha: Optional[str] = sha256_file(host_sig)
+    except OSError:
+        return cached
+    if index_dir is not None:
+        from pm.sketch_index import catalog_sig_hashes
+
+        phage_shas = catalog_sig_hashes(index_dir)
+    else:
+        by_path = sha256_files(phage_sig_dir / f"{pid}.sig" for pid in phage_ids)
+        phage_shas = {pid: by_path[str(phage_sig_dir / f"{pid}.sig")] for pid in phage_ids}
+    for pid in phage_ids:
+        cached.add(pid, {"host_id": host_id, "phage_id": pid},
+                   {"host_sig": host_sha, "phage_sig": phage_shas.get(pid)})
+    return cached
+
+
+@profiling.timed()
+def run_batch(host_id: str, host_sig: Optional[Path], phage_sig_dir: Optional[Path], phage_ids: List[str],
+              out_dir: Optional[Path], ksize: Optional[int], tool_version: Optional[str], mock: bool,
+              index_dir: Optional[Path] = None, scaled: Optional[int] = None,
+              store_dir: Optional[Path] = None) -> None:
+    """Emit every host×phage similarity feature for one host from a single process.
+
+    Signatures are parsed in-process (no `sourmash compare` subprocesses, no temp CSVs) and all
+    containments are computed in one vectorized pass over the concatenated library hashes.
+    With `index_dir`, the library side comes from the persistent inverted index instead.
+    Pairs already in the feature cache (pm.cas, when $PM_FEATURE_CACHE is set) are not recomputed.
+    """
+    if mock:
+        write_outputs(host_id, phage_ids, {pid: mock_payload(host_id, pid) for pid in phage_ids}, out_dir, store_dir)
+        return
+
+    # numpy is only needed for real sketches; keep mock runs dependency-free.
+    from pm.signatures import downsample, load_hashes, max_containment_batch
+
+    cached = similarity_cache(host_id, host_sig, phage_sig_dir, phage_ids, ksize, tool_version, index_dir, scaled)
+    payloads = cached.lookup()
+    requested, phage_ids = phage_ids, cached.missing(phage_ids)
+    profiling.count("pairs_computed", len(phage_ids))
+    if not phage_ids:
+        write_outputs(host_id, requested, payloads, out_dir, store_dir)
+        return
+    try:
+        with profiling.span("load_host_sig"):
+            host_hashes, host_scaled = load_hashes(host_sig, ksize)
+    except Exception as e:
+        for pid in phage_ids:
+            payloads[pid] = containment_payload(host_id, pid, 0.0, tool_version, "unavailable",
+                                                f"host signature unreadable: {e}")
+        host_hashes = None
+
+    if host_hashes is not None and index_dir is not None:
+        from pm.sketch_index import SketchIndex
+
+        with profiling.span("open_index"):
+            index = SketchIndex(index_dir, ksize=ksize, scaled=scaled)
+        with profiling.span("containment"):
+            try:
+                values = index.max_containment(host_hashes, host_scaled, phage_ids)
+            except ValueError as e:
+                # Host sketched at a coarser scaled than the index: no common hash space.
+                values, host_error = {}, f"host signature incompatible with library index: {e}"
+            else:
+                host_error = None
+        for pid in phage_ids:
+            if host_error is not None:
+                payloads[pid] = containment_payload(host_id, pid, 0.0, tool_version, "unavailable", host_error)
+            elif pid in values:
+                payloads[pid] = containment_payload(host_id, pid, values[pid], tool_version)
+            else:
+                payloads[pid] = containment_payload(host_id, pid, 0.0, tool_version, "unavailable",
+                                                    f"phage not in library index: {index_dir}")
+    elif host_hashes is not None:
+        def load(ids: List[str]) -> Dict[str, tuple]:
+            loaded = {}
+            with profiling.span("load_phage_sigs"):
+                for pid in ids:
+                    try:
+                        loaded[pid] = load_hashes(phage_sig_dir / f"{pid}.sig", ksize)
+                    except Exception as e:
+                        payloads[pid] = containment_payload(host_id, pid, 0.0, tool_version, "unavailable",
+                                                            f"phage signature unreadable: {e}")
+            return loaded
+
+        loaded = load(phage_ids)
+        # Compare at the coarsest scaled present (and at least `scaled`) so every pair is on a
+        # common hash space.
+        common = max([scaled or 0, host_scaled] + [sc for _, sc in loaded.values()])
+        if common != scaled and cached.hits:
+            # Cached pairs were compared at `scaled`; a coarser sketch in this batch moves every
+            # pair to another hash space, so the hits are recomputed too.
+            loaded.update(load(list(cached.hits)))
+            common = max([common] + [sc for _, sc in loaded.values()])
+        host_ds = downsample(host_hashes, common)
+        ids = list(loaded)
+        with profiling.span("containment"):
+            values = max_containment_batch(host_ds, [downsample(loaded[pid][0], common) for pid in ids])
+        for pid, value in zip(ids, values):
+            payloads[pid] = containment_payload(host_id, pid, value, tool_version)
+        if common != scaled:
+            # Not the hash space the keys name.
+            phage_ids = []
+
+    cached.store({pid: payloads[pid] for pid in phage_ids})
+    write_outputs(host_id, requested, payloads, out_dir, store_dir)
+
+
+@profiling.traced("sourmash_containment")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compute sourmash containment similarity features for one host.")
+    p.add_argument("--host-id", required=True)
+    p.add_argument("--host-sig", required=False, default=None)
+    p.add_argument("--batch", action="store_true",
+                   help="Accepted for existing command lines; every run emits all phages for --host-id "
+                        "(requires --phage-ids or --manifest, and --out-dir or --store-dir).")
+    p.add_argument("--phage-ids", default=None, help="Comma-separated list of phage_ids.")
+    p.add_argument("--manifest", default=None, help="Phage manifest TSV instead of --phage-ids.")
+    p.add_argument("--rows", default=None, help="With --manifest: only manifest rows START:STOP (one chunk).")
+    p.add_argument("--phage-sig-dir", default=None, help="Directory of <phage_id>.sig files.")
+    p.add_argument("--out-dir", default=None, help="Directory for <phage_id>.json outputs.")
+    p.add_argument("--store-dir", default=None,
+                   help="Write one binary feature store (pm.feature_store) here instead of JSONs.")
+    p.add_argument("--index", default=None, help="Library sketch index dir (replaces --phage-sig-dir).")
+    p.add_argument("--ksize", type=int, default=None, help="Select this ksize from multi-k signatures.")
+    p.add_argument("--scaled", type=int, default=None,
+                   help="Expected index scaled (stale indexes are rejected); with --phage-sig-dir, the finest "
+                        "scaled pairs are compared at, which per-signature batches need to use the feature cache.")
+    p.add_argument("--tool-version", default=None)
+    p.add_argument("--mock", action="store_true")
+    args = p.parse_args()
+    profiling.label(host_id=args.host_id)
+
+    if not (args.phage_ids or args.manifest) or not (args.out_dir or args.store_dir):
+        raise SystemExit("--phage-ids (or --manifest) and --out-dir or --store-dir are required.")
+    if not args.mock and (not args.host_sig or not (args.phage_sig_dir or args.index)):
+        raise SystemExit("--host-sig and --phage-sig-dir (or --index) are required unless --mock is set.")
+    phage_ids = select_phage_ids(args.phage_ids, args.manifest, args.rows)
+    profiling.count("pairs", len(phage_ids))
+    run_batch(
+        args.host_id,
+        Path(args.host_sig) if args.host_sig else None,
+        Path(args.phage_sig_dir) if args.phage_sig_dir else None,
+        phage_ids,
+        Path(args.out_dir) if args.out_dir else None,
+        args.ksize,
+        args.tool_version,
+        args.mock,
+        Path(args.index) if args.index else None,
+        args.scaled,
+        Path(args.store_dir) if args.store_dir else None,
+    )
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+import argparse
+from pathlib import Path
+
+from pm import profiling
+from pm.manifest import select_phage_ids
+from pm.sketch_index import build_index
+
+
+@profiling.traced("sourmash_index")
+def main() -> None:
+    p = argparse.ArgumentParser(description="Build or extend the inverted hash index over phage library sketches.")
+    p.add_argument("--sig-dir", required=True, help="Directory of <phage_id>.sig files.")
+    p.add_argument("--phage-ids", default=None, help="Comma-separated list of phage_ids to index.")
+    p.add_argument("--manifest", default=None, help="Index every phage in this manifest instead of --phage-ids.")
+    p.add_argument("--out-dir", required=True, help="Index directory (created if missing).")
+    p.add_argument("--ksize", type=int, required=True)
+    p.add_argument("--scaled", type=int, required=True)
+    p.add_argument("--rebuild", action="store_true", help="Ignore any existing index and rebuild from scratch.")
+    args = p.parse_args()
+
+    if not args.phage_ids and not args.manifest:
+        raise SystemExit("--phage-ids or --manifest is required.")
+    sig_dir = Path(args.sig_dir)
+    phage_ids = select_phage_ids(args.phage_ids, args.manifest)
+    sig_paths = {pid: sig_dir / f"{pid}.sig" for pid in phage_ids}
+    with profiling.span("build_index"):
+        stats = build_index(args.out_dir, sig_paths, args.ksize, args.scaled, append=not args.rebuild)
+    profiling.count("phages_added", stats["added"])
+    profiling.count("phages_kept", stats["kept"])
+    print(f"sketch index {args.out_dir}: added={stats['added']} kept={stats['kept']} rebuilt={bool(stats['rebuilt'])}")
+
+
+if __name__ == "__main__":
+    main()
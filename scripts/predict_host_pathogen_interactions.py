@@ -3,7 +3,19 @@
 Predicts interactions between a single phage proteome and a single host proteome
 using MMseqs2/Foldseek for structural prediction and search.
 """
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+
 import os
+import json
 import argparse
 import subprocess
 import pandas as pd
@@ -20,11 +32,56 @@ def run_command(cmd, step_name=""):
         print(f"STDERR:\n{e.stderr}")
         raise
 
+def fold_with_cache(cache, fasta_paths, struct_dirs, out_dir):
+    """
+    Folds only the proteins whose normalized sequence is not cached yet, then assembles
+    each structure directory from the cache. Identical proteins across (and within) the
+    inputs are folded once.
+    """
+    from pm.structure_cache import read_fasta, sequence_key
+
+    proteomes = []
+    sequences = {}
+    for path in fasta_paths:
+        entries = {}
+        for name, seq in read_fasta(path):
+            key = sequence_key(seq)
+            entries[name] = key
+            sequences.setdefault(key, seq)
+        proteomes.append(entries)
+
+    _, missing = cache.partition(key for entries in proteomes for key in entries.values())
+    print(f"--- Structure cache: {cache.hits} hits, {cache.misses} misses ---")
+    if missing:
+        # Records are named by key, so predicted structures map straight back to cache entries.
+        miss_faa = os.path.join(out_dir, "cache_misses.faa")
+        with open(miss_faa, "w") as f:
+            for key in missing:
+                f.write(f">{key}\n{sequences[key]}\n")
+        miss_struct_dir = os.path.join(out_dir, "cache_miss_structures")
+        run_command(['mmseqs', 'easy-fold', miss_faa, miss_struct_dir, os.path.join(out_dir, 'tmp_fold')], step_name="Protein Folding (cache misses)")
+        for key in missing:
+            predicted = os.path.join(miss_struct_dir, f"{key}.pdb")
+            if os.path.exists(predicted):
+                cache.put(key, predicted)
+            else:
+                print(f"[WARN] No structure predicted for sequence {key[:12]}")
+
+    for entries, struct_dir in zip(proteomes, struct_dirs):
+        cache.materialize(entries, struct_dir)
+    evicted = cache.evict(keep=sequences)
+    stats = cache.record_stats(evicted=evicted)
+    with open(os.path.join(out_dir, "structure_cache_stats.json"), "w") as f:
+        json.dump(stats, f, indent=2)
+
+
 def main():
     p = argparse.ArgumentParser(description="Phage-Host PPI via MMseqs2/Foldseek")
     p.add_argument("--phage-faa", required=True, help="Path to the phage proteome FASTA file (from Prokka)")
     p.add_argument("--host-faa", required=True, help="Path to the host proteome FASTA file")
     p.add_argument("--out-dir", required=True, help="Output directory for all files for this run")
+    p.add_argument("--structure-cache", default=None, help="Content-addressed structure cache directory shared across runs (optional)")
+    p.add_argument("--cache-max-gb", type=float, default=None, help="LRU-evict the structure cache down to this size after the run")
     args = p.parse_args()
 
     os.makedirs(args.out_dir, exist_ok=True)
@@ -39,8 +96,14 @@ def main():
     try:
         # --- STEP 1: Predict 3D structures for phage and host proteins ---
         # CORRECTED: Use 'mmseqs easy-fold' for structure prediction
-        run_command(['mmseqs', 'easy-fold', args.phage_faa, phage_struct_dir, os.path.join(args.out_dir, 'tmp_phage')], step_name="Phage Protein Folding")
-        run_command(['mmseqs', 'easy-fold', args.host_faa, host_struct_dir, os.path.join(args.out_dir, 'tmp_host')], step_name="Host Protein Folding")
+        if args.structure_cache:
+            from pm.structure_cache import StructureCache
+            max_bytes = int(args.cache_max_gb * 1e9) if args.cache_max_gb is not None else None
+            cache = StructureCache(args.structure_cache, max_bytes=max_bytes)
+            fold_with_cache(cache, [args.phage_faa, args.host_faa], [phage_struct_dir, host_struct_dir], args.out_dir)
+        else:
+            run_command(['mmseqs', 'easy-fold', args.phage_faa, phage_struct_dir, os.path.join(args.out_dir, 'tmp_phage')], step_name="Phage Protein Folding")
+            run_command(['mmseqs', 'easy-fold', args.host_faa, host_struct_dir, os.path.join(args.out_dir, 'tmp_host')], step_name="Host Protein Folding")
 
         # --- STEP 2: Create a database from the host structures ---
         run_command(['foldseek', 'createdb', host_struct_dir, host_db_path], step_name="Create Host Structure DB")
@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Resident ranking service: the phage library is loaded once and each new host is ranked against it.
+
+A cold pipeline run for one new isolate re-reads the manifests, every phage sketch, phageDB
+and every safety JSON before doing any host work. The daemon keeps that library side in
+memory instead:
+
+- phage manifest, config (scoring params, versions, profile) and their hashes
+- similarity: the memory-mapped sketch index (pm.sketch_index), or every phage sketch
+  downsampled once to a common `scaled`
+- safety: every safety JSON and the scoring columns built from them (safety is host-independent)
+- structural: the checked phageDB prefix and the tier's search arguments. Foldseek has no server
+  mode, so each host search is still one `foldseek` run against that DB (kept warm by the page cache)
+
+Per request only the host-specific work runs: sketch the host genome in-process, query the
+library, search the host structures (if given), score with pm.scoring and write the same
+`ranking.csv` + `evidence_bundle.json` as `assemble_decision_bundle.py` under the daemon's own
+`--out-dir` (default `results/daemon/<host_id>/`, apart from the pipeline's rankings, which it would
+otherwise overwrite). Test mode uses the module mocks, as the pipeline does.
+
+Requests are JSON over HTTP/1.1 on a Unix socket (`--socket`) or a local TCP port:
+
+    GET  /health   library generation, phage count, queue depth
+    POST /rank     {"host_id": "H042", "genome_fna": "/path/H042.fna",
+                    "structures_dir": "/path/structures/H042" (optional),
+                    "out_dir": "batch7" (optional, relative to --out-dir)}
+    POST /reload   reload the library now
+
+Requests go into a bounded queue (`--queue-size`) served by `--workers` threads; when it is
+full, /rank answers 503 with Retry-After instead of queueing more. A client that closes its
+connection while its request is queued cancels it; one already running finishes unanswered.
+The config, phage manifest, sketch index catalog, phageDB marker and safety directory are
+polled every `--reload-interval` seconds. Once a change has settled for one interval, a new
+library is loaded next to the old one and swapped in; requests already running finish on the
+library they started with.
+
+Usage:
+  python scripts/ranking_daemon.py serve --config config.yaml --socket results/pm.sock --workers 2
+  python scripts/ranking_daemon.py rank --socket results/pm.sock --host-id H042 --genome data/H042.fna
+  curl --unix-socket results/pm.sock -d '{"host_id": "H042", "genome_fna": "data/H042.fna"}' http://pm/rank
+"""
+from __future__ import annotations
+
+# Ensure repo root is on sys.path when running as a script (python path/to/script.py)
+import sys
+from pathlib import Path
+_REPO_ROOT = None
+for _p in Path(__file__).resolve().parents:
+    if (_p / "config.yaml").exists() and (_p / "contracts").exists():
+        _REPO_ROOT = _p
+        break
+if _REPO_ROOT:
+    sys.path.insert(0, str(_REPO_ROOT))
+# Sibling scripts whose payload builders and scoring the service reuses.
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent / "modules"))
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+import assemble_decision_bundle as assembler  # noqa: E402
+import foldseek_batch_search  # noqa: E402
+import foldseek_summarise  # noqa: E402
+import sourmash_containment  # noqa: E402
+from pm import scoring
+from pm.foldseek_tiers import resolve_tier, search_args as foldseek_tier_args
+from pm.manifest import load_phages
+from pm.utils import ensure_dir, sha256_file, sha256_files
+
+MAX_BODY = 1 << 20
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class RequestError(ValueError):
+    """A request the service rejects (answered with 400)."""
+
+
+class ClientDisconnected(Exception):
+    """The client closed the connection before its ranking was ready (nothing is answered)."""
+
+
+def _stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class Library:
+    """Library-side state shared read-only by every request; replaced whole on reload."""
+
+    def __init__(self, config_path: Path, pipeline_version: str, generation: int) -> None:
+        self.config_path = config_path
+        self.generation = generation
+        cfg = yaml.safe_load(config_path.read_text()) or {}
+        modules_cfg = cfg.get("modules", {}) or {}
+        params = dict(cfg.get("params", {}) or {})
+        cache_dir = Path((cfg.get("directories", {}) or {}).get("cache", "cache"))
+        self.phage_manifest = Path((cfg.get("manifests", {}) or {}).get("phages", "manifests/phages.tsv"))
+        self.test_mode = bool(modules_cfg.get("test_mode", False))
+        self.enable_similarity = bool(modules_cfg.get("enable_sourmash", False))
+        self.enable_structural = bool(modules_cfg.get("enable_structural_ppi", False))
+        self.phage_ids: List[str] = load_phages(self.phage_manifest).ids
+        self.top_n = int(params.get("top_n", 10))
+
+        # Same locations as the Snakefile.
+        self.safety_dir = cache_dir / "features" / "safety"
+        self.sig_dir = cache_dir / "sourmash" / "phages"
+        self.index_dir = cache_dir / "sourmash" / "index"
+        self.phage_db = cache_dir / "foldseek" / "db" / "phageDB"
+        self.watched = [config_path, self.phage_manifest, self.index_dir / "index.json",
+                        self.phage_db.with_name("phageDB.ready"), self.safety_dir]
+        self.signature = self.current_signature()
+
+        self.safety_docs = {pid: scoring.load_json(self.safety_dir / f"{pid}.json") for pid in self.phage_ids}
+        self.safety_columns = scoring.FeatureColumns(self.phage_ids)
+        for i, pid in enumerate(self.phage_ids):
+            self.safety_columns.set_safety(i, self.safety_docs[pid])
+
+        self.ksize = int(params.get("sourmash_k", 21))
+        self.scaled = int(params.get("sourmash_scaled") or 0)
+        self.index = None
+        self.phage_hashes: Dict[str, Any] = {}
+        self.sig_errors: Dict[str, str] = {}
+        if self.enable_similarity and not self.test_mode:
+            self._load_sketches(bool(params.get("sourmash_index", False)))
+
+        self.search_args: List[str] = []
+        # YAML reads `1e-3` as a string; the pipeline passes it through --evalue-max as a float.
+        evalue_max = params.get("foldseek_evalue_max")
+        self.evalue_max = float(evalue_max) if evalue_max is not None else None
+        if self.enable_structural and not self.test_mode:
+            tier = params.get("foldseek_tier") or "default"
+            params["foldseek_tier"] = tier
+            params["foldseek_tier_settings"] = resolve_tier(cfg, tier)
+            self.search_args = foldseek_tier_args(params["foldseek_tier_settings"])
+
+        # The fields assemble_decision_bundle.evidence_document reads from its shared inputs.
+        self.shared: Dict[str, Any] = {
+            "test_mode": self.test_mode,
+            "enable_similarity": self.enable_similarity,
+            "enable_structural": self.enable_structural,
+            "enable_safety": bool(modules_cfg.get("enable_safety", False)),
+            "profile": cfg.get("profile", "custom"),
+            "phage_ids": self.phage_ids,
+            "pipeline_version": pipeline_version + ("-mock" if self.test_mode else ""),
+            "config_sha": sha256_file(config_path),
+            "manifest_hashes": {self.phage_manifest.name: sha256_file(self.phage_manifest)},
+            "sample_safety": [self.safety_docs[self.phage_ids[0]]] if self.phage_ids else [],
+            "params": params,
+            "versions": cfg.get("versions", {}) or {},
+        }
+        self.loaded_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+    def current_signature(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        return tuple(_stat(p) for p in self.watched)
+
+    def _load_sketches(self, use_index: bool) -> None:
+        from pm.signatures import downsample, load_hashes
+        from pm.sketch_index import SketchIndex
+
+        if use_index and (self.index_dir / "index.json").exists():
+            self.index = SketchIndex(self.index_dir, ksize=self.ksize, scaled=self.scaled)
+            return
+        loaded = {}
+        for pid in self.phage_ids:
+            try:
+                loaded[pid] = load_hashes(self.sig_dir / f"{pid}.sig", self.ksize)
+            except Exception as e:
+                self.sig_errors[pid] = f"phage signature unreadable: {e}"
+        # Compare at the coarsest scaled present so every pair is on a common hash space.
+        self.scaled = max([self.scaled] + [sc for _, sc in loaded.values()])
+        self.phage_hashes = {pid: downsample(hashes, self.scaled) for pid, (hashes, _) in loaded.items()}
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "loaded_at": self.loaded_at,
+            "phages": len(self.phage_ids),
+            "manifest_hashes": self.shared["manifest_hashes"],
+            "config_sha256": self.shared["config_sha"],
+            "test_mode": self.test_mode,
+            "similarity": ("mock" if self.test_mode else "index" if self.index is not None
+                           else f"{len(self.phage_hashes)} sketches"),
+        }
+
+    def similarity_payloads(self, host_id: str, genome: Optional[Path]) -> Dict[str, dict]:
+        if self.test_mode:
+            return {pid: sourmash_containment.mock_payload(host_id, pid) for pid in self.phage_ids}
+        from pm.signatures import downsample, max_containment_batch
+        from pm.sketching import sketch_file
+
+        payloads = {}
+        try:
+            host_hashes = sketch_file(genome, [self.ksize], self.scaled)[self.ksize]
+        except Exception as e:
+            return {pid: sourmash_containment.containment_payload(host_id, pid, 0.0, None, "unavailable",
+                                                                   f"host genome unreadable: {e}")
+                    for pid in self.phage_ids}
+        if self.index is not None:
+            try:
+                values = self.index.max_containment(host_hashes, self.scaled, self.phage_ids)
+            except ValueError as e:
+                return {pid: sourmash_containment.containment_payload(
+                            host_id, pid, 0.0, None, "unavailable", f"host sketch incompatible with library index: {e}")
+                        for pid in self.phage_ids}
+            missing = f"phage not in library index: {self.index_dir}"
+        else:
+            ids = list(self.phage_hashes)
+            values = dict(zip(ids, max_containment_batch(downsample(host_hashes, self.scaled),
+                                                         [self.phage_hashes[pid] for pid in ids])))
+            missing = f"phage signature missing: {self.sig_dir}"
+        for pid in self.phage_ids:
+            if pid in values:
+                payloads[pid] = sourmash_containment.containment_payload(host_id, pid, values[pid], None)
+            else:
+                payloads[pid] = sourmash_containment.containment_payload(
+                    host_id, pid, 0.0, None, "unavailable", self.sig_errors.get(pid, missing))
+        return payloads
+
+    def structural_payloads(self, host_id: str, structures_dir: Optional[Path], work_dir: Path,
+                            threads: int) -> Dict[str, dict]:
+        if self.test_mode:
+            return {pid: foldseek_summarise.mock_payload(host_id, pid) for pid in self.phage_ids}
+        if not self.phage_db.with_name("phageDB.ready").exists():
+            return foldseek_summarise.unavailable_payloads(host_id, self.phage_ids, None,
+                                                           f"phage library DB not built: {self.phage_db}")
+        if structures_dir is None:
+            return foldseek_summarise.unavailable_payloads(host_id, self.phage_ids, None,
+                                                           "no host structures in request")
+        hits = work_dir / "hits.tsv"
+        foldseek_batch_search.run_batch_search({host_id: structures_dir}, self.phage_db, work_dir,
+                                               {host_id: hits}, threads, self.search_args)
+        with hits.open() as f:
+            acc = foldseek_summarise.aggregate_hits(f, set(self.phage_ids), self.evalue_max)
+        summaries = {pid: (acc.get(pid) or foldseek_summarise.PhageAccumulator()).summary()
+                     for pid in self.phage_ids}
+        return foldseek_summarise.summary_payloads(host_id, self.phage_ids, summaries, None)
+
+
+def resolve_out_dir(out_root: Path, requested: Optional[str]) -> Path:
+    """A request's output directory: `out_root` itself, or a directory below it (never outside)."""
+    root = out_root.resolve()
+    if not requested:
+        return root
+    out_dir = (root / str(requested)).resolve()
+    if out_dir != root and root not in out_dir.parents:
+        raise RequestError(f"out_dir must be inside the daemon output root {root}: {requested!r}")
+    return out_dir
+
+
+def parse_rank_request(body: bytes, out_root: Path) -> Dict[str, Any]:
+    try:
+        req = json.loads(body or b"{}")
+    except ValueError as e:
+        raise RequestError(f"invalid JSON: {e}")
+    if not isinstance(req, dict):
+        raise RequestError("request body must be a JSON object")
+    host_id = str(req.get("host_id") or "").strip()
+    # Same rule as manifest IDs: the host_id becomes a path component.
+    if not host_id or "/" in host_id or host_id in (".", "..") or any(ch.isspace() for ch in host_id):
+        raise RequestError(f"invalid host_id {host_id!r}")
+    parsed: Dict[str, Any] = {"host_id": host_id, "genome_fna": None, "structures_dir": None,
+                              "out_dir": resolve_out_dir(out_root, req.get("out_dir"))}
+    if req.get("genome_fna"):
+        parsed["genome_fna"] = Path(req["genome_fna"])
+        if not parsed["genome_fna"].is_file():
+            raise RequestError(f"genome_fna not found: {parsed['genome_fna']}")
+    if req.get("structures_dir"):
+        parsed["structures_dir"] = Path(req["structures_dir"])
+        if not parsed["structures_dir"].is_dir():
+            raise RequestError(f"structures_dir not found: {parsed['structures_dir']}")
+    return parsed
+
+
+def host_inputs(req: Dict[str, Any]) -> Dict[str, Any]:
+    """Provenance of a request's host files: the genome's SHA-256 and one digest over the structures.
+
+    The structures digest is the SHA-256 of `<relative path>\t<file SHA-256>` lines in path order,
+    so renaming, adding or changing any structure changes it.
+    """
+    genome, structures = req["genome_fna"], req["structures_dir"]
+    out: Dict[str, Any] = {"genome_fna": None, "structures_dir": None}
+    if genome is not None:
+        out["genome_fna"] = {"path": str(genome), "sha256": sha256_file(genome)}
+    if structures is not None:
+        files = sorted(p for p in structures.rglob("*") if p.is_file())
+        hashes = sha256_files(files)
+        digest = hashlib.sha256()
+        for p in files:
+            digest.update(f"{p.relative_to(structures).as_posix()}\t{hashes[str(p)]}\n".encode())
+        out["structures_dir"] = {"path": str(structures), "files": len(files), "sha256": digest.hexdigest()}
+    return out
+
+
+def rank_host(library: Library, req: Dict[str, Any], work_root: Path, foldseek_threads: int) -> Dict[str, Any]:
+    """Host-specific work for one request; writes and returns ranking.csv and evidence_bundle.json."""
+    host_id = req["host_id"]
+    timings: Dict[str, float] = {}
+    t = time.perf_counter()
+    if library.enable_similarity and req["genome_fna"] is None and not library.test_mode:
+        raise RequestError("genome_fna is required (similarity module enabled)")
+    # Hashed before the host work, so the bundle records the files that were ranked.
+    inputs = host_inputs(req)
+
+    sim = library.similarity_payloads(host_id, req["genome_fna"]) if library.enable_similarity else {}
+    timings["similarity_s"] = time.perf_counter() - t
+    t = time.perf_counter()
+    work_dir = Path(tempfile.mkdtemp(prefix=f"{host_id}.", dir=ensure_dir(work_root)))
+    try:
+        struct = (library.structural_payloads(host_id, req["structures_dir"], work_dir, foldseek_threads)
+                  if library.enable_structural else {})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    timings["structural_s"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    cols = scoring.FeatureColumns(library.phage_ids)
+    cols.share_safety(library.safety_columns)
+    for i, pid in enumerate(library.phage_ids):
+        cols.set_similarity(i, sim.get(pid))
+        cols.set_structural(i, struct.get(pid))
+    ranked, shortlist = assembler.rank_columns(host_id, cols, library.top_n, lambda pid: (
+        sim.get(pid), struct.get(pid), library.safety_docs.get(pid)))
+    first = library.phage_ids[0] if library.phage_ids else None
+    bundle = assembler.evidence_document(host_id, library.shared, shortlist,
+                                         [sim.get(first)] if first else [], [struct.get(first)] if first else [])
+    bundle["host_inputs"] = inputs
+
+    # Written under temporary names and renamed, so concurrent requests for one host never interleave.
+    out_dir = ensure_dir(req["out_dir"] / host_id)
+    tag = f".{os.getpid()}.{time.monotonic_ns()}.tmp"
+    ranking_path, evidence_path = out_dir / "ranking.csv", out_dir / "evidence_bundle.json"
+    assembler.write_ranking(ranking_path.with_name(ranking_path.name + tag), host_id, ranked)
+    evidence_path.with_name(evidence_path.name + tag).write_text(json.dumps(bundle, indent=2))
+    ranking_csv = ranking_path.with_name(ranking_path.name + tag).read_text()
+    os.replace(ranking_path.with_name(ranking_path.name + tag), ranking_path)
+    os.replace(evidence_path.with_name(evidence_path.name + tag), evidence_path)
+    timings["scoring_s"] = time.perf_counter() - t
+
+    return {
+        "host_id": host_id,
+        "library": {"generation": library.generation, "manifest_hashes": library.shared["manifest_hashes"]},
+        "ranking_path": str(ranking_path),
+        "evidence_path": str(evidence_path),
+        "ranking_csv": ranking_csv,
+        "evidence_bundle": bundle,
+        "timings": {k: round(v, 4) for k, v in timings.items()},
+    }
+
+
+class RankingService:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.config_path = Path(args.config)
+        self.pipeline_version = args.pipeline_version
+        self.out_root = Path(args.out_dir)
+        self.work_root = Path(args.work_dir)
+        self.workers = max(1, args.workers)
+        self.foldseek_threads = args.foldseek_threads
+        self.reload_interval = args.reload_interval
+        self.library = Library(self.config_path, self.pipeline_version, 1)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, args.queue_size))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rank")
+        self.reload_lock = asyncio.Lock()
+        self.in_flight = 0
+        self.served = 0
+        self.rejected = 0
+        self.cancelled = 0
+
+    def log(self, msg: str) -> None:
+        print(f"[ranking_daemon] {msg}", file=sys.stderr, flush=True)
+
+    async def reload(self, reason: str) -> Library:
+        async with self.reload_lock:
+            generation = self.library.generation + 1
+            t = time.perf_counter()
+            library = await asyncio.get_running_loop().run_in_executor(
+                None, Library, self.config_path, self.pipeline_version, generation)
+            self.library = library
+            self.log(f"library generation {generation} loaded in {time.perf_counter() - t:.2f}s "
+                     f"({len(library.phage_ids)} phages; {reason})")
+            return library
+
+    async def watch(self) -> None:
+        """Reload once a change to the watched library files has been stable for one interval."""
+        pending = None
+        failed = None
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            sig = self.library.current_signature()
+            if sig == self.library.signature or sig == failed:
+                pending = None
+                continue
+            if sig != pending:
+                pending = sig
+                continue
+            try:
+                await self.reload("library files changed")
+            except Exception as e:
+                # Keep serving the previous library until the files change again.
+                failed = sig
+                self.log(f"reload failed, keeping generation {self.library.generation}: {e}")
+            pending = None
+
+    async def worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            req, future, queued_at = await self.queue.get()
+            if future.cancelled():
+                # The client disconnected while the request was queued.
+                self.cancelled += 1
+                self.queue.task_done()
+                continue
+            self.in_flight += 1
+            try:
+                started = time.perf_counter()
+                result = await loop.run_in_executor(self.executor, rank_host, self.library, req, self.work_root,
+                                                    self.foldseek_threads)
+                result["timings"]["queued_s"] = round(started - queued_at, 4)
+                result["timings"]["total_s"] = round(time.perf_counter() - queued_at, 4)
+                self.served += 1
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    async def dispatch(self, method: str, path: str, body: bytes,
+                       reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "use GET"}, {}
+            return 200, {"status": "ok", "library": self.library.describe(),
+                         "queue": {"depth": self.queue.qsize(), "max": self.queue.maxsize, "workers": self.workers,
+                                   "in_flight": self.in_flight},
+                         "served": self.served, "rejected": self.rejected, "cancelled": self.cancelled}, {}
+        if path == "/reload":
+            if method != "POST":
+                return 405, {"error": "use POST"}, {}
+            library = await self.reload("requested")
+            return 200, {"status": "ok", "library": library.describe()}, {}
+        if path == "/rank":
+            if method != "POST":
+                return 405, {"error": "use POST"}, {}
+            req = parse_rank_request(body, self.out_root)
+            future = asyncio.get_running_loop().create_future()
+            try:
+                self.queue.put_nowait((req, future, time.perf_counter()))
+            except asyncio.QueueFull:
+                self.rejected += 1
+                return 503, {"error": f"queue full ({self.queue.maxsize} waiting)"}, {"Retry-After": "1"}
+            return 200, await self.result_or_disconnect(future, reader), {}
+        return 404, {"error": f"unknown path {path}"}, {}
+
+    async def result_or_disconnect(self, future: asyncio.Future, reader: asyncio.StreamReader) -> Dict[str, Any]:
+        """The request's result, or ClientDisconnected (and the request cancelled) if the client goes first.
+
+        Clients send one request and then only read, so the connection reaching EOF (or a reset)
+        while the ranking is pending means the client is gone.
+        """
+        closed = asyncio.ensure_future(reader.read(1))
+        try:
+            await asyncio.wait({future, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not future.done() and (closed.exception() is not None or closed.result() == b""):
+                future.cancel()
+                raise ClientDisconnected()
+            return await future
+        finally:
+            closed.cancel()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """One HTTP/1.1 request per connection."""
+        extra: Dict[str, str] = {}
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) != 3:
+                raise RequestError("malformed request line")
+            method, target = request_line[0].upper(), request_line[1].split("?", 1)[0]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                raise RequestError(f"invalid Content-Length {headers['content-length']!r}")
+            if length > MAX_BODY:
+                status, payload = 413, {"error": f"body larger than {MAX_BODY} bytes"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, payload, extra = await self.dispatch(method, target, body, reader)
+        except ClientDisconnected:
+            writer.close()
+            return
+        except (RequestError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            self.log(f"request failed: {type(e).__name__}: {e}")
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        data = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", "Connection: close"] + [f"{k}: {v}" for k, v in extra.items()]
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + data)
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+    async def serve(self, socket_path: Optional[str], host: str, port: int) -> None:
+        if socket_path:
+            if Path(socket_path).exists():
+                Path(socket_path).unlink()
+            ensure_dir(Path(socket_path).parent)
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            where = socket_path
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+            where = f"http://{host}:{port}"
+        tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        if self.reload_interval > 0:
+            tasks.append(asyncio.create_task(self.watch()))
+        self.log(f"serving on {where}: {len(self.library.phage_ids)} phages, {self.workers} workers, "
+                 f"queue {self.queue.maxsize}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.executor.shutdown(wait=False)
+            if socket_path and Path(socket_path).exists():
+                Path(socket_path).unlink()
+
+
+async def call(socket_path: Optional[str], host: str, port: int, method: str, path: str,
+               payload: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+    """Minimal client: one request, returns (status, decoded JSON body)."""
+    if socket_path:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: pm\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data or b"{}")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Resident ranking service: rank new hosts against a library loaded once.")
+    sub = p.add_subparsers(dest="command", required=True)
+    for name in ("serve", "rank", "health", "reload"):
+        sp = sub.add_parser(name)
+        sp.add_argument("--socket", default=None, help="Unix socket path (default: TCP on --host/--port).")
+        sp.add_argument("--host", default="127.0.0.1")
+        sp.add_argument("--port", type=int, default=8765)
+    serve = sub.choices["serve"]
+    serve.add_argument("--config", default="config.yaml")
+    serve.add_argument("--out-dir", default="results/daemon",
+                       help="Write <out-dir>/<host_id>/ranking.csv + evidence_bundle.json; a request's out_dir "
+                            "must be inside it.")
+    serve.add_argument("--work-dir", default="results/tmp/ranking_daemon", help="Scratch space for host searches.")
+    serve.add_argument("--workers", type=int, default=2, help="Requests ranked concurrently.")
+    serve.add_argument("--queue-size", type=int, default=8, help="Requests waiting beyond the workers; more get 503.")
+    serve.add_argument("--foldseek-threads", type=int, default=4)
+    serve.add_argument("--reload-interval", type=float, default=5.0,
+                       help="Seconds between library change checks (0: reload only on POST /reload).")
+    serve.add_argument("--pipeline-version", default="0.1.0")
+    rank = sub.choices["rank"]
+    rank.add_argument("--host-id", required=True)
+    rank.add_argument("--genome", default=None, help="Host genome FASTA.")
+    rank.add_argument("--structures", default=None, help="Folder of host structures for the Foldseek search.")
+    rank.add_argument("--out-dir", default=None, help="Subdirectory of the daemon's --out-dir.")
+    args = p.parse_args()
+
+    if args.command == "serve":
+        try:
+            service = RankingService(args)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"cannot load library: {e}")
+        try:
+            asyncio.run(service.serve(args.socket, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.command == "rank":
+        payload = {"host_id": args.host_id}
+        for key, value in (("genome_fna", args.genome), ("structures_dir", args.structures)):
+            if value:
+                payload[key] = str(Path(value).resolve())
+        if args.out_dir:
+            payload["out_dir"] = args.out_dir
+        status, body = asyncio.run(call(args.socket, args.host, args.port, "POST", "/rank", payload))
+        if status == 200:
+            body = {k: body[k] for k in ("host_id", "library", "ranking_path", "evidence_path", "timings")}
+    else:
+        status, body = asyncio.run(call(args.socket, args.host, args.port,
+                                        "GET" if args.command == "health" else "POST", f"/{args.command}"))
+    print(json.dumps(body, indent=2))
+    if status != 200:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Tests import pm.* and the scripts as modules, as the scripts do when run from the repo root.
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
@@ -0,0 +1,46 @@
+"""Split-back of the batched abricate and Foldseek runs when IDs or names contain the tag separator."""
+import io
+import subprocess
+from pathlib import Path
+
+from modules import abricate_batch, foldseek_batch_search
+
+
+def test_abricate_split_back_with_separator_in_ids(tmp_path: Path, monkeypatch):
+    fastas = []
+    for pid in ["P__1", "P", "Q"]:
+        fa = tmp_path / f"{pid}.fna"
+        fa.write_text(">c__1 desc\nACGT\n")
+        fastas.append((pid, str(fa)))
+
+    def fake_abricate(cmd, **kwargs):
+        # One hit per contig, SEQUENCE = first word of the header, as abricate reports it.
+        seqs = [line[1:].split()[0] for line in Path(cmd[-1]).read_text().splitlines() if line.startswith(">")]
+        out = abricate_batch.DEFAULT_HEADER + "".join(f"{cmd[-1]}\t{s}\t1\t4\n" for s in seqs)
+        return subprocess.CompletedProcess(cmd, 0, stdout=out, stderr="")
+
+    monkeypatch.setattr(abricate_batch.subprocess, "run", fake_abricate)
+    header, rows = abricate_batch.run_chunk(fastas, "vfdb", tmp_path)
+
+    assert header == abricate_batch.DEFAULT_HEADER
+    for pid, fasta in fastas:
+        assert rows[pid] == [f"{fasta}\tc__1\t1\t4\n"]
+
+
+def test_foldseek_demultiplex_with_separator_in_names(tmp_path: Path):
+    host_dirs = {}
+    for host_id in ["H__1", "H"]:
+        d = tmp_path / "structures" / host_id
+        d.mkdir(parents=True)
+        (d / "rbp__a.pdb").write_text("")
+        host_dirs[host_id] = d
+    tags = foldseek_batch_search.stage_queries(host_dirs, tmp_path / "stage")
+    staged = sorted(f.stem for f in (tmp_path / "stage").iterdir())
+    hits = "".join(f"{name}\tP001__p1\t1e-10\t200\t0.8\t0.7\n" for name in staged)
+
+    out_paths = {host_id: tmp_path / "out" / f"{host_id}.tsv" for host_id in host_dirs}
+    counts = foldseek_batch_search.demultiplex(io.StringIO(hits), tags, out_paths)
+
+    assert counts == {"H__1": 1, "H": 1}
+    for path in out_paths.values():
+        assert path.read_text() == "rbp__a\tP001__p1\t1e-10\t200\t0.8\t0.7\n"
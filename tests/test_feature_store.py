@@ -0,0 +1,76 @@
+"""pm.feature_store round trips and scores the same as the per-pair JSON documents."""
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+from pm import scoring
+from pm.feature_store import FeatureStore, FeatureStoreWriter
+
+NAN = float("nan")
+SIM_VALUES = [0.42, 1, NAN, None, "0.5", "nan", "n/a", True, -0.5, 1.5]
+STRUCT_VALUES = [
+    (1e-6, 4), (NAN, 1), (None, 3), ("bad", 2), ("1e-9", "5"), (0.0, NAN), (1e-300, None), (-1.0, 0),
+]
+
+
+def similarity_doc(pid, value, status="ok"):
+    return {"host_id": "H1", "phage_id": pid, "metric": "containment", "value": value, "tool": "sourmash",
+            "tool_version": "4", "status": status, "reason": None}
+
+
+def structural_doc(pid, best_evalue, hit_count):
+    return {"host_id": "H1", "phage_id": pid, "hit_count": hit_count, "best_evalue": best_evalue,
+            "best_bitscore": None, "qcov_mean": None, "tcov_mean": None, "top_targets": [], "tool": "foldseek",
+            "tool_version": "9", "status": "ok", "reason": None}
+
+
+def write_store(tmp_path: Path, module: str, docs) -> FeatureStore:
+    writer = FeatureStoreWriter(module, "H1", [d["phage_id"] for d in docs])
+    for d in docs:
+        writer.add(d)
+    return FeatureStore(writer.save(tmp_path / module / "H1"))
+
+
+def same(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b and type(a) is type(b)
+
+
+def test_payloads_round_trip_every_value_kind(tmp_path: Path):
+    docs = [similarity_doc(f"P{i}", v, "unavailable" if v is None else "ok") for i, v in enumerate(SIM_VALUES)]
+    store = write_store(tmp_path, "similarity", docs)
+    for doc in docs:
+        back = store.payload(doc["phage_id"])
+        assert list(back) == list(doc)
+        assert all(same(back[k], doc[k]) for k in doc), (doc, back)
+    # The mapped files keep the kinds; the index only holds the non-number values.
+    assert json.loads((store.path / "index.json").read_text())["raw"] == {
+        "P1": {"value": 1}, "P4": {"value": "0.5"}, "P5": {"value": "nan"}, "P6": {"value": "n/a"},
+        "P7": {"value": True}}
+
+
+def test_store_scores_like_the_documents(tmp_path: Path):
+    sims = [similarity_doc(f"P{i}", v) for i, v in enumerate(SIM_VALUES)]
+    structs = [structural_doc(f"P{i}", e, h) for i, (e, h) in enumerate(STRUCT_VALUES)]
+    structs += [structural_doc(f"P{i}", 1e-3, 0) for i in range(len(STRUCT_VALUES), len(sims))]
+    phage_ids = [d["phage_id"] for d in sims] + ["P_absent"]
+    sim_store = write_store(tmp_path, "similarity", sims)
+    struct_store = write_store(tmp_path, "structural", structs)
+
+    from_store = scoring.load_feature_columns("H1", phage_ids, None, None, None,
+                                              sim_store=sim_store, struct_store=struct_store)
+    from_docs = scoring.FeatureColumns(phage_ids)
+    for i, pid in enumerate(phage_ids):
+        from_docs.set_similarity(i, sim_store.payload(pid))
+        from_docs.set_structural(i, struct_store.payload(pid))
+
+    for name in ("sim_valid", "struct_valid"):
+        assert getattr(from_store, name).tolist() == getattr(from_docs, name).tolist(), name
+    a, b = scoring.score(from_store), scoring.score(from_docs)
+    for key in ("similarity", "structural", "confidence"):
+        np.testing.assert_array_equal(a[key], b[key])
+    # NaN similarity is present (clamped to 1.0), not missing.
+    assert a["similarity"][SIM_VALUES.index(NAN, 2)] == 1.0
@@ -0,0 +1,49 @@
+"""Lysogeny marker matching and temperate rules (pm.markers)."""
+from pm.markers import load_scanner
+
+GFF_HEADER = "##gff-version 3\n"
+
+
+def gff(*products):
+    return GFF_HEADER + "".join(f"c1\tProdigal\tCDS\t{10 * i + 1}\t{10 * i + 9}\t.\t+\t0\tID=g{i};product={p}\n"
+                                for i, p in enumerate(products))
+
+
+def test_overlapping_markers_are_all_reported():
+    scanner = load_scanner({"lysogeny_markers": {"markers": {"recombinase": ["recombinase"],
+                                                             "repressor": ["repressor"]}}})
+    assert scanner.match("product=site-specific recombinase") == ["integrase", "recombinase"]
+    assert scanner.match("product=cI repressor") == ["ci_repressor", "repressor"]
+    assert scanner.match("product=hypothetical protein") == []
+
+
+def test_rules_on_overlapping_override_markers_fire():
+    scanner = load_scanner({"lysogeny_markers": {"markers": {"recombinase": ["recombinase"]},
+                                                 "temperate_rules": [["recombinase"]]}})
+    scan = scanner.scan_gff(gff("site-specific recombinase").splitlines(True))
+    counts = {name: m["count"] for name, m in scan["markers"].items()}
+    assert counts["recombinase"] == 1 and counts["integrase"] == 1
+    assert scanner.temperate(counts)
+
+
+def test_default_temperate_rules():
+    scanner = load_scanner()
+
+    def temperate(*products):
+        scan = scanner.scan_gff(gff(*products).splitlines(True))
+        return scanner.temperate({name: m["count"] for name, m in scan["markers"].items()})
+
+    assert temperate("Integrase")
+    assert temperate("cI repressor", "Xis protein")
+    assert temperate("phage repressor", "ParA partition protein")
+    assert temperate("lambda repressor", "transposase")
+    assert not temperate("cI repressor")
+    assert not temperate("Xis protein", "transposase")
+    assert not temperate("hypothetical protein", "parallel beta-helix")
+
+
+def test_scan_reports_coordinates_and_trnas():
+    text = gff("Integrase") + "c1\tAragorn\ttRNA\t100\t170\t.\t-\t.\tproduct=tRNA-Leu\n##FASTA\n>c1\nACGT\n"
+    scan = load_scanner().scan_gff(text.splitlines(True))
+    assert scan["tRNA_count"] == 1
+    assert scan["markers"]["integrase"] == {"count": 1, "features": [{"seqid": "c1", "start": 1, "end": 9, "strand": "+"}]}
@@ -0,0 +1,51 @@
+"""Incremental re-ranking (pm.rank_state) after the feature writers rerun for a library update."""
+import json
+from pathlib import Path
+
+from modules import foldseek_summarise, sourmash_containment
+from pm.rank_state import build_state, update_state
+
+HOST = "H001"
+
+
+def write_features(root: Path, phage_ids):
+    """What similarity_feature_batch and structural_features do: rewrite every JSON of the host."""
+    sim_dir, struct_dir = root / "similarity", root / "structural"
+    sourmash_containment.run_batch(HOST, None, None, phage_ids, sim_dir / HOST, None, None, mock=True)
+    (struct_dir / HOST).mkdir(parents=True, exist_ok=True)
+    foldseek_summarise.write_outputs(HOST, phage_ids, {pid: foldseek_summarise.mock_payload(HOST, pid)
+                                                       for pid in phage_ids}, struct_dir / HOST, None)
+    return sim_dir, struct_dir
+
+
+def full_ranking(phage_ids, sim_dir, struct_dir):
+    return build_state(HOST, phage_ids, sim_dir, struct_dir, None).ranked()
+
+
+def test_only_new_and_changed_phages_are_rescored(tmp_path: Path):
+    phage_ids = ["P001", "P002", "P003"]
+    sim_dir, struct_dir = write_features(tmp_path, phage_ids)
+    state = build_state(HOST, phage_ids, sim_dir, struct_dir, None)
+
+    # Library update: one phage added, every JSON rewritten with identical content.
+    phage_ids = phage_ids + ["P004"]
+    write_features(tmp_path, phage_ids)
+    state, rescored = update_state(state, phage_ids, sim_dir, struct_dir, None)
+    assert rescored == 1
+    assert state.ranked() == full_ranking(phage_ids, sim_dir, struct_dir)
+
+    # One phage's evidence changes.
+    path = sim_dir / HOST / "P002.json"
+    doc = json.loads(path.read_text())
+    doc["value"] = 0.999
+    path.write_text(json.dumps(doc, indent=2))
+    write_features(tmp_path, [pid for pid in phage_ids if pid != "P002"])
+    state, rescored = update_state(state, phage_ids, sim_dir, struct_dir, None)
+    assert rescored == 1
+    assert state.ranked() == full_ranking(phage_ids, sim_dir, struct_dir)
+
+    # A rerun with nothing changed rescores nothing.
+    write_features(tmp_path, phage_ids)
+    path.write_text(json.dumps(doc, indent=2))
+    _, rescored = update_state(state, phage_ids, sim_dir, struct_dir, None)
+    assert rescored == 0
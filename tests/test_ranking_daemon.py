@@ -0,0 +1,190 @@
+"""scripts/ranking_daemon.py over a Unix socket, on a test-mode (mocked) library."""
+import argparse
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+import pytest
+import yaml
+
+import ranking_daemon
+
+PHAGES = ["P001", "P002", "P003"]
+
+
+def write_library(root: Path, phage_ids, top_n: int = 10) -> Path:
+    (root / "manifests").mkdir(exist_ok=True)
+    rows = ["phage_id\tfasta"] + [f"{pid}\tdata/{pid}.fna" for pid in phage_ids]
+    (root / "manifests" / "phages.tsv").write_text("\n".join(rows) + "\n")
+    config = {
+        "manifests": {"phages": "manifests/phages.tsv"},
+        "directories": {"cache": "cache", "rankings": "rankings"},
+        "modules": {"test_mode": True, "enable_sourmash": True, "enable_structural_ppi": True,
+                    "enable_safety": False},
+        "params": {"top_n": top_n},
+    }
+    (root / "config.yaml").write_text(yaml.safe_dump(config))
+    return root / "config.yaml"
+
+
+def make_service(root: Path, workers: int = 1, queue_size: int = 4) -> ranking_daemon.RankingService:
+    args = argparse.Namespace(config=str(root / "config.yaml"), pipeline_version="0.1.0",
+                              out_dir=str(root / "out"), work_dir=str(root / "work"), workers=workers,
+                              queue_size=queue_size, foldseek_threads=1, reload_interval=0)
+    return ranking_daemon.RankingService(args)
+
+
+def run_with_service(service, scenario):
+    """Serve on a socket, run `scenario(sock)` against it, then shut the server down."""
+    sock = str(Path(service.work_root).parent / "pm.sock")
+
+    async def main():
+        server = asyncio.create_task(service.serve(sock, "127.0.0.1", 0))
+        while not Path(sock).exists():
+            await asyncio.sleep(0.01)
+        try:
+            return await scenario(sock)
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+    return asyncio.run(main())
+
+
+def call(sock, method, path, payload=None):
+    return ranking_daemon.call(sock, "127.0.0.1", 0, method, path, payload)
+
+
+@pytest.fixture
+def library_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_library(tmp_path, PHAGES)
+    return tmp_path
+
+
+def test_rank_writes_bundle_with_host_inputs(library_root):
+    genome = library_root / "H042.fna"
+    genome.write_text(">c1\nACGTACGT\n")
+
+    async def scenario(sock):
+        return await call(sock, "POST", "/rank", {"host_id": "H042", "genome_fna": str(genome)})
+
+    status, body = run_with_service(make_service(library_root), scenario)
+    assert status == 200
+    out = library_root / "out" / "H042"
+    assert body["ranking_path"] == str(out / "ranking.csv")
+    assert (out / "ranking.csv").read_text() == body["ranking_csv"]
+    bundle = json.loads((out / "evidence_bundle.json").read_text())
+    assert [c["phage_id"] for c in bundle["shortlist"]] == [c["phage_id"] for c in body["evidence_bundle"]["shortlist"]]
+    assert len(bundle["shortlist"]) == len(PHAGES)
+    assert bundle["host_inputs"]["genome_fna"]["path"] == str(genome)
+    assert len(bundle["host_inputs"]["genome_fna"]["sha256"]) == 64
+    assert bundle["host_inputs"]["structures_dir"] is None
+
+
+@pytest.mark.parametrize("out_dir", ["../elsewhere", "/tmp", "sub/../../x"])
+def test_rank_rejects_out_dir_outside_root(library_root, out_dir):
+    async def scenario(sock):
+        return await call(sock, "POST", "/rank", {"host_id": "H042", "out_dir": out_dir})
+
+    status, body = run_with_service(make_service(library_root), scenario)
+    assert status == 400
+    assert "out_dir" in body["error"]
+
+
+def test_rank_rejects_bad_requests(library_root):
+    async def scenario(sock):
+        return [await call(sock, "POST", "/rank", {"host_id": "../H1"}),
+                await call(sock, "POST", "/rank", {"host_id": "H1", "genome_fna": "missing.fna"}),
+                await call(sock, "GET", "/rank")]
+
+    (s1, _), (s2, b2), (s3, _) = run_with_service(make_service(library_root), scenario)
+    assert (s1, s2, s3) == (400, 400, 405)
+    assert "genome_fna not found" in b2["error"]
+
+
+class BlockingRank:
+    """Stands in for rank_host: records hosts and blocks until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.hosts = []
+
+    def __call__(self, library, req, work_root, foldseek_threads):
+        self.hosts.append(req["host_id"])
+        self.started.set()
+        self.release.wait(10)
+        return {"host_id": req["host_id"], "timings": {}}
+
+
+def test_full_queue_answers_503(library_root, monkeypatch):
+    blocker = BlockingRank()
+    monkeypatch.setattr(ranking_daemon, "rank_host", blocker)
+    service = make_service(library_root, workers=1, queue_size=1)
+
+    async def scenario(sock):
+        running = asyncio.create_task(call(sock, "POST", "/rank", {"host_id": "H1"}))
+        await asyncio.get_running_loop().run_in_executor(None, blocker.started.wait, 10)
+        queued = asyncio.create_task(call(sock, "POST", "/rank", {"host_id": "H2"}))
+        while service.queue.qsize() < 1:
+            await asyncio.sleep(0.01)
+        rejected = await call(sock, "POST", "/rank", {"host_id": "H3"})
+        health = await call(sock, "GET", "/health")
+        blocker.release.set()
+        return rejected, health, await running, await queued
+
+    (status, body), (_, health), (s1, _), (s2, _) = run_with_service(service, scenario)
+    assert status == 503
+    assert "queue full" in body["error"]
+    assert health["rejected"] == 1
+    assert (s1, s2) == (200, 200)
+    assert blocker.hosts == ["H1", "H2"]
+
+
+def test_disconnect_cancels_queued_request(library_root, monkeypatch):
+    blocker = BlockingRank()
+    monkeypatch.setattr(ranking_daemon, "rank_host", blocker)
+    service = make_service(library_root, workers=1, queue_size=2)
+
+    async def scenario(sock):
+        running = asyncio.create_task(call(sock, "POST", "/rank", {"host_id": "H1"}))
+        await asyncio.get_running_loop().run_in_executor(None, blocker.started.wait, 10)
+        # A client that queues a request and hangs up before it runs.
+        reader, writer = await asyncio.open_unix_connection(sock)
+        body = json.dumps({"host_id": "H2"}).encode()
+        writer.write(f"POST /rank HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        while service.queue.qsize() < 1:
+            await asyncio.sleep(0.01)
+        writer.close()
+        await writer.wait_closed()
+        await asyncio.sleep(0.1)
+        blocker.release.set()
+        await running
+        await service.queue.join()
+        return (await call(sock, "GET", "/health"))[1]
+
+    health = run_with_service(service, scenario)
+    assert blocker.hosts == ["H1"]
+    assert health["cancelled"] == 1
+    assert health["served"] == 1
+
+
+def test_reload_picks_up_library_changes(library_root):
+    service = make_service(library_root)
+
+    async def scenario(sock):
+        before = await call(sock, "GET", "/health")
+        write_library(library_root, PHAGES + ["P004"], top_n=2)
+        reloaded = await call(sock, "POST", "/reload")
+        ranked = await call(sock, "POST", "/rank", {"host_id": "H042"})
+        return before, reloaded, ranked
+
+    (_, before), (status, reloaded), (_, ranked) = run_with_service(service, scenario)
+    assert before["library"]["generation"] == 1 and before["library"]["phages"] == 3
+    assert status == 200
+    assert reloaded["library"]["generation"] == 2 and reloaded["library"]["phages"] == 4
+    assert ranked["library"]["generation"] == 2
+    assert len(ranked["evidence_bundle"]["shortlist"]) == 2
@@ -0,0 +1,96 @@
+"""pm.receptors: keyword matching and the receptor-focused structure selection."""
+import pytest
+
+from pm.receptors import (
+    HOST_SURFACE_KEYWORDS,
+    PHAGE_RECEPTOR_KEYWORDS,
+    fasta_surface_ids,
+    gff_receptor_ids,
+    keyword_pattern,
+    select_structures,
+)
+
+HOST = keyword_pattern(HOST_SURFACE_KEYWORDS)
+PHAGE = keyword_pattern(PHAGE_RECEPTOR_KEYWORDS)
+
+
+@pytest.mark.parametrize("product", [
+    "Maltoporin LamB",
+    "Outer membrane protein C",
+    "Outer membrane porin OmpF",
+    "LPS-assembly protein LptD",
+    "Capsular polysaccharide export protein",
+    "Flagellin",
+    "Type 1 fimbrial major subunit FimA",
+    "Type IV pilin PilA",
+    "TonB-dependent receptor BtuB",
+    "Ferrichrome receptor FhuA",
+    "Cell surface protein",
+    "O-antigen ligase",
+])
+def test_host_surface_products_match(product):
+    assert HOST.search(product.lower())
+
+
+@pytest.mark.parametrize("product", [
+    "Phage lambda integrase",
+    "Lambda repressor-like DNA-binding protein",
+    "LPS export ABC transporter permease LptF",
+    "Methyl-accepting chemotaxis receptor",
+    "Sensor histidine kinase receptor",
+    "Surface tension regulator",
+    "Hypothetical protein",
+    "Transcriptional regulator, LysR family",
+])
+def test_host_non_surface_products_do_not_match(product):
+    assert not HOST.search(product.lower())
+
+
+@pytest.mark.parametrize("product,expected", [
+    ("Tail fiber protein", True),
+    ("Long tail fibre", True),
+    ("Tailspike protein", True),
+    ("Tail-spike", True),
+    ("Receptor-binding protein", True),
+    ("Baseplate wedge protein", True),
+    ("Endosialidase depolymerase", True),
+    ("Major capsid protein", False),
+    ("Portal protein", False),
+    ("Terminase large subunit", False),
+    ("Tail protein I-like", True),
+    ("Tail tube protein", False),
+])
+def test_phage_receptor_products(product, expected):
+    assert bool(PHAGE.search(product.lower())) is expected
+
+
+def test_gff_and_fasta_ids(tmp_path):
+    gff = tmp_path / "P1.gff"
+    gff.write_text(
+        "##gff-version 3\n"
+        "c1\tProkka\tCDS\t1\t90\t.\t+\t0\tID=P1_00001;locus_tag=P1_00001;product=Tail fiber protein\n"
+        "c1\tProkka\tCDS\t100\t190\t.\t+\t0\tID=P1_00002;product=Phage lambda repressor\n"
+        "c1\tProkka\tgene\t1\t90\t.\t+\t.\tID=P1_00001_gene;product=Tail fiber protein\n"
+        "##FASTA\n>c1\nACGT\n"
+    )
+    assert gff_receptor_ids(gff, PHAGE) == {"P1_00001"}
+
+    faa = tmp_path / "H1.faa"
+    faa.write_text(">H1_00001 Maltoporin LamB\nMKK\n>H1_00002 lambda prophage protein\nMKK\n"
+                   ">H1_00003\nMKK\n>H1_00004 Outer membrane protein A\nMKK\n")
+    assert fasta_surface_ids(faa, HOST) == {"H1_00001", "H1_00004"}
+    assert gff_receptor_ids(tmp_path / "missing.gff", PHAGE) == set()
+
+
+def test_select_structures_keeps_flagged_or_falls_back(tmp_path):
+    d = tmp_path / "P1"
+    d.mkdir()
+    for name in ("P1__P1_00001.pdb", "P1__P1_00002.pdb.gz", "P1_00003.cif"):
+        (d / name).write_text("x")
+    picked = select_structures(d, {"P1_00001", "P1_00003"})
+    assert [p.name for p in picked["kept"]] == ["P1_00003.cif", "P1__P1_00001.pdb"]
+    assert [p.name for p in picked["excluded"]] == ["P1__P1_00002.pdb.gz"]
+    assert not picked["fallback"]
+
+    none = select_structures(d, set())
+    assert none["fallback"] and len(none["kept"]) == 3 and none["excluded"] == []
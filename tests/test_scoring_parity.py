@@ -0,0 +1,83 @@
+"""pm.scoring (vectorized) against the scalar reference functions in assemble_decision_bundle.py."""
+import math
+
+import numpy as np
+import pytest
+
+import assemble_decision_bundle as scalar
+from benchmarks import scoring_parity
+from pm import scoring
+
+NAN = float("nan")
+SIMILARITY = [
+    None,
+    {},
+    {"value": None, "status": "unavailable"},
+    {"value": "n/a"},
+    {"value": NAN},
+    {"value": -0.5},
+    {"value": 1.5},
+    {"value": 0.42, "status": "ok"},
+]
+STRUCTURAL = [
+    None,
+    {},
+    {"best_evalue": None, "hit_count": 3, "status": "unavailable"},
+    {"best_evalue": "bad"},
+    {"best_evalue": NAN, "hit_count": 1},
+    {"best_evalue": 0.0, "hit_count": 2},
+    {"best_evalue": -1.0},
+    {"best_evalue": 1e-300, "hit_count": None},
+    {"best_evalue": 1e-6, "hit_count": 4, "status": "ok"},
+]
+SAFETY = [None, {"flags": [], "status": "unavailable"}, {"flags": ["vfdb_hit", "possible_temperate"]}]
+
+
+def edge_rows():
+    return [(sim, struct, safety) for sim in SIMILARITY for struct in STRUCTURAL for safety in SAFETY]
+
+
+def test_edge_cases_match_scalar_path():
+    rows = edge_rows()
+    phage_ids = [f"P{i:04d}" for i in range(len(rows))]
+    cols = scoring.FeatureColumns(phage_ids)
+    for i, (sim, struct, safety) in enumerate(rows):
+        cols.set_similarity(i, sim)
+        cols.set_structural(i, struct)
+        cols.set_safety(i, safety)
+    vec = scoring.score(cols)
+
+    for i, (sim, struct, safety) in enumerate(rows):
+        sim_ref = scalar.similarity_to_score(sim)
+        struct_ref = scalar.structural_to_score(struct)
+        conf_ref = scalar.clamp01(0.6 * struct_ref + 0.4 * sim_ref - scalar.safety_penalty(safety))
+        assert vec["similarity"][i] == pytest.approx(sim_ref, abs=1e-12), (sim, struct)
+        assert vec["structural"][i] == pytest.approx(struct_ref, abs=1e-12), (sim, struct)
+        assert vec["confidence"][i] == pytest.approx(conf_ref, abs=1e-12), (sim, struct, safety)
+        assert vec["reason"][i] == scalar.pick_primary_reason(struct_ref, sim_ref, [])
+
+
+def test_nan_similarity_clamps_to_one_in_both_paths():
+    cols = scoring.FeatureColumns(["P1"])
+    cols.set_similarity(0, {"value": NAN})
+    assert scoring.score(cols)["similarity"][0] == scalar.similarity_to_score({"value": NAN}) == 1.0
+    assert not math.isnan(scalar.clamp01(NAN))
+
+
+def test_random_rows_match_scalar_path():
+    report = scoring_parity.row_parity(n_rows=2000, top_n=10, tolerance=1e-12, seed=7)
+    assert all(diff <= report["tolerance"] for diff in report["max_abs_diff"].values()), report
+    assert report["reasons_equal"] and report["order_equal"]
+    assert report["top_n_equal"] and report["tied_top_n_equal"]
+
+
+def test_ranking_order_breaks_ties_by_phage_id():
+    confidence = np.array([0.5, 0.9, 0.5, 0.0])
+    phage_ids = np.array(["P3", "P2", "P1", "P0"])
+    assert scoring.rank_order(confidence, phage_ids).tolist() == [1, 2, 0, 3]
+    assert scoring.top_n_indices(confidence, phage_ids, 2).tolist() == [1, 2]
+
+
+def test_end_to_end_scalar_and_vectorized_bundles_match():
+    report = scoring_parity.end_to_end(n_phages=200, top_n=10, seed=7)
+    assert report["ranking_identical"] and report["evidence_identical"], report
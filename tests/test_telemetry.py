@@ -0,0 +1,45 @@
+"""Run report aggregation (pm.telemetry) over Snakemake benchmark files."""
+import os
+from pathlib import Path
+
+from pm.telemetry import benchmark_path, collect, default_rule_units, run_report
+
+HEADER = "s\th:m:s\tmax_rss\tmax_vms\tmax_uss\tmax_pss\tio_in\tio_out\tmean_load\tcpu_time\n"
+
+
+def write_benchmark(root: Path, rule: str, wall_s: float, mtime: float, **wildcards: str) -> None:
+    path = Path(benchmark_path(root, rule, list(wildcards)).format(**wildcards))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(HEADER + f"{wall_s}\t0:00:01\t50.0\t0\t0\t0\t1.0\t2.0\t0\t{wall_s}\n")
+    os.utime(path, (mtime, mtime))
+
+
+def test_throughput_counts_only_the_jobs_of_this_run(tmp_path: Path):
+    n_phages = 1000
+    # An earlier full run: every host's similarity batch and one safety job per phage.
+    for host_id in ("H1", "H2"):
+        write_benchmark(tmp_path, "similarity_feature_batch", 10.0, 100.0, host_id=host_id)
+    for i in range(n_phages):
+        write_benchmark(tmp_path, "safety_feature", 0.1, 100.0, phage_id=f"P{i}")
+    # This run: one new phage's safety feature, one host's last similarity chunk and its meta.
+    write_benchmark(tmp_path, "safety_feature", 0.5, 200.0, phage_id="P1000")
+    write_benchmark(tmp_path, "similarity_feature_chunk_3", 2.0, 200.0, host_id="H1")
+    write_benchmark(tmp_path, "similarity_meta", 1.0, 200.0, host_id="H1")
+
+    units = {**default_rule_units(n_phages + 1), "similarity_feature_chunk_3": 1}
+    report = run_report(collect(tmp_path, since=150.0), 2, n_phages + 1, rule_units=units)
+
+    assert report["modules"]["safety"]["units"] == 1
+    assert report["modules"]["safety"]["units_per_s"] == 2.0
+    assert report["modules"]["similarity"]["jobs"] == 2
+    assert report["modules"]["similarity"]["units"] == 1
+    assert report["modules"]["similarity"]["units_per_s"] == round(1 / 3.0, 2)
+
+
+def test_default_units_cover_host_wide_rules(tmp_path: Path):
+    for host_id in ("H1", "H2"):
+        write_benchmark(tmp_path, "structural_features", 4.0, 100.0, host_id=host_id)
+        write_benchmark(tmp_path, "foldseek_createdb_host", 4.0, 100.0, host_id=host_id)
+    report = run_report(collect(tmp_path), 2, 50)
+    assert report["modules"]["structural"]["units"] == 100
+    assert report["modules"]["structural"]["units_per_s"] == round(100 / 16.0, 2)